@@ -1,4 +1,6 @@
 import subprocess
+import sys
+from pathlib import Path
 from azure.storage.blob import BlobServiceClient, BlobClient
 import os
 from openai import AzureOpenAI
@@ -7,6 +9,10 @@ from dotenv import load_dotenv
 import tempfile
 import wave
 
+# Add the project root directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from Instrumentation.metrics import inc, span
+
 load_dotenv()
 
 # Azure Blob setup
@@ -66,11 +72,12 @@ if audio_size > 25 * 1024 * 1024:
 
     # Get audio duration using ffprobe
     try:
-        result = subprocess.run([
-            'ffprobe', '-v', 'error', '-show_entries',
-            'format=duration', '-of',
-            'default=noprint_wrappers=1:nokey=1', audio_file_path
-        ], capture_output=True, text=True, check=True)
+        with span("ffprobe_duration"):
+            result = subprocess.run([
+                'ffprobe', '-v', 'error', '-show_entries',
+                'format=duration', '-of',
+                'default=noprint_wrappers=1:nokey=1', audio_file_path
+            ], capture_output=True, text=True, check=True)
 
         total_duration = float(result.stdout.strip())
         chunk_duration_seconds = int(total_duration / num_chunks)
@@ -88,14 +95,15 @@ if audio_size > 25 * 1024 * 1024:
         chunk_filename = os.path.join(chunks_dir, f"chunk_{i + 1}.mp3")
 
         try:
-            subprocess.run([
-                'ffmpeg', '-i', audio_file_path,
-                '-ss', str(start_time),
-                '-t', str(chunk_duration_seconds),
-                '-acodec', 'copy',
-                chunk_filename,
-                '-y'
-            ], check=True, capture_output=True)
+            with span("ffmpeg_split", chunk=i + 1):
+                subprocess.run([
+                    'ffmpeg', '-i', audio_file_path,
+                    '-ss', str(start_time),
+                    '-t', str(chunk_duration_seconds),
+                    '-acodec', 'copy',
+                    chunk_filename,
+                    '-y'
+                ], check=True, capture_output=True)
             print(f"Saved {chunk_filename}")
         except subprocess.CalledProcessError as e:
             print(f"Error creating chunk {i + 1}: {e}")
@@ -112,12 +120,14 @@ if audio_size > 25 * 1024 * 1024:
             try:
                 with open(chunk_filename, 'rb') as chunk_file:
                     print(f"Transcribing chunk {i + 1}/{num_chunks}...")
-                    transcription = client.audio.transcriptions.create(
-                        model=whisper_deployment,
-                        file=chunk_file,
-                        language="de",
-                        response_format="json"
-                    )
+                    with span("whisper_transcription", chunk=i + 1):
+                        transcription = client.audio.transcriptions.create(
+                            model=whisper_deployment,
+                            file=chunk_file,
+                            language="de",
+                            response_format="json"
+                        )
+                    inc("audio_bytes_transcribed_total", os.path.getsize(chunk_filename))
                     full_transcription.append(transcription.text)
                     print(f"Chunk {i + 1} transcribed successfully")
             except Exception as e:
@@ -133,12 +143,14 @@ else:
         # Read the audio file and send to Whisper
         with open(audio_file_path, 'rb') as audio:
             print("Sending to Whisper for transcription...")
-            transcription = client.audio.transcriptions.create(
-                model=whisper_deployment,
-                file=audio,
-                language="de",
-                response_format="json"
-            )
+            with span("whisper_transcription", chunk=1):
+                transcription = client.audio.transcriptions.create(
+                    model=whisper_deployment,
+                    file=audio,
+                    language="de",
+                    response_format="json"
+                )
+            inc("audio_bytes_transcribed_total", audio_size)
 
         print("\n=== Transcription ===")
         print(transcription.text)
@@ -1,10 +1,16 @@
 import subprocess
+import sys
+from pathlib import Path
 from azure.storage.blob import BlobServiceClient, BlobClient
 import os
 from openai import AzureOpenAI
 import io
 from dotenv import load_dotenv
 
+# Add the project root directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from Instrumentation.metrics import span
+
 load_dotenv()
 
 # Azure Blob setup
@@ -37,13 +43,14 @@ audio_output_path = os.path.join("audio", "match_audio.mp3")
 
 try:
     print("Extracting audio from video using ffmpeg...")
-    subprocess.run([
-        'ffmpeg', '-i', local_video_path,
-        '-vn', '-acodec', 'libmp3lame',
-        '-ar', '16000', '-ac', '1',
-        '-b:a', '128k', audio_output_path,
-        '-y'
-    ], check=True, capture_output=True)
+    with span("ffmpeg_extract_audio"):
+        subprocess.run([
+            'ffmpeg', '-i', local_video_path,
+            '-vn', '-acodec', 'libmp3lame',
+            '-ar', '16000', '-ac', '1',
+            '-b:a', '128k', audio_output_path,
+            '-y'
+        ], check=True, capture_output=True)
     print(f"Audio successfully saved to: {audio_output_path}")
 
 except subprocess.CalledProcessError as e:
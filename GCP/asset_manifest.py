@@ -0,0 +1,187 @@
+import base64
+import hashlib
+import json
+import mmap
+import os
+from contextlib import contextmanager
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+MANIFEST_NAME = ".asset_manifest.json"
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    """sha256 of a file, read in blocks so large images are never held in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AssetHandle:
+    """
+    Lazy reference to one file of a term folder. Nothing is read until
+    the bytes are asked for; os.fspath()/str() give the path, so a handle
+    can be passed wherever an image path is expected (st.image, open).
+    """
+
+    __slots__ = ("path", "name", "size", "mtime_ns", "sha256")
+
+    def __init__(self, path, name, size, mtime_ns, sha256):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.sha256 = sha256
+
+    def __fspath__(self):
+        return self.path
+
+    def __str__(self):
+        return self.path
+
+    def __repr__(self):
+        return f"AssetHandle({self.path!r}, size={self.size})"
+
+    def read_bytes(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    @contextmanager
+    def mapped(self):
+        """Read-only memory map of the file, closed when the block exits."""
+        with open(self.path, "rb") as f:
+            if self.size == 0:
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                yield view
+
+    def base64(self):
+        """Base64 text of the file, encoded on demand and not cached."""
+        with self.mapped() as view:
+            return base64.b64encode(view).decode("utf-8")
+
+    def read_text(self):
+        with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+
+class TermFolder:
+    """Images and prompt file of one output/<term> folder."""
+
+    def __init__(self, name, images, prompt):
+        self.name = name
+        self.images = images
+        self.prompt = prompt
+
+    def prompt_text(self):
+        """Stripped prompt text, or "" if the folder has no prompt file."""
+        return self.prompt.read_text().strip() if self.prompt else ""
+
+
+class AssetManifest:
+    """
+    Persistent manifest of the term folders under `base_dir` (images and
+    prompt files with size, mtime and sha256), stored as JSON next to them.
+
+    Folders are rescanned with one os.scandir each; a file is hashed again
+    only when its size or mtime changed, so refreshing a warm manifest costs
+    a few stat calls and no reads.
+    """
+
+    def __init__(self, base_dir="output", manifest_path=None):
+        self.base_dir = str(base_dir)
+        self.manifest_path = manifest_path or os.path.join(self.base_dir, MANIFEST_NAME)
+        self.entries = {}
+        self._dirty = False
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("folders", {})
+            except (OSError, json.JSONDecodeError):
+                print(f"⚠️ Unreadable asset manifest {self.manifest_path}, rebuilding")
+
+    def _scan_folder(self, name):
+        """Refreshes the entry of one folder; returns False if it is gone."""
+        folder_path = os.path.join(self.base_dir, name)
+        if not os.path.isdir(folder_path):
+            if self.entries.pop(name, None) is not None:
+                self._dirty = True
+            return False
+
+        old_files = self.entries.get(name, {}).get("files", {})
+        files = {}
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                ext = os.path.splitext(entry.name)[1].lower()
+                if ext not in IMAGE_EXTS and entry.name != f"{name}_prompt.txt":
+                    continue
+                stat = entry.stat()
+                old = old_files.get(entry.name)
+                if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+                    files[entry.name] = old
+                    continue
+                files[entry.name] = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": file_digest(entry.path),
+                }
+                self._dirty = True
+
+        if files.keys() != old_files.keys():
+            self._dirty = True
+        self.entries[name] = {"files": files}
+        return True
+
+    def refresh(self):
+        """Rescans every folder under base_dir and saves the manifest if anything changed."""
+        if not os.path.isdir(self.base_dir):
+            return self
+        with os.scandir(self.base_dir) as it:
+            names = {entry.name for entry in it if entry.is_dir()}
+        for name in list(self.entries):
+            if name not in names:
+                del self.entries[name]
+                self._dirty = True
+        for name in sorted(names):
+            self._scan_folder(name)
+        self.save()
+        return self
+
+    def folder_names(self):
+        return sorted(self.entries)
+
+    def folder(self, name, refresh=True):
+        """TermFolder with lazy handles for `name`, or None if the folder does not exist."""
+        if refresh:
+            found = self._scan_folder(name)
+            self.save()
+            if not found:
+                return None
+        elif name not in self.entries:
+            return None
+
+        folder_path = os.path.join(self.base_dir, name)
+        images, prompt = [], None
+        for file_name, meta in sorted(self.entries[name]["files"].items()):
+            handle = AssetHandle(os.path.join(folder_path, file_name), file_name,
+                                 meta["size"], meta["mtime_ns"], meta["sha256"])
+            if file_name == f"{name}_prompt.txt":
+                prompt = handle
+            else:
+                images.append(handle)
+        return TermFolder(name, images, prompt)
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"folders": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+        self._dirty = False
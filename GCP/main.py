@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import sys
 from dotenv import load_dotenv
 from google import genai
 import vertexai
@@ -7,7 +8,10 @@ from vertexai.preview.vision_models import ImageGenerationModel
 from pathlib import Path
 from typing import List, Tuple, Optional
 
-IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+# Add the project root directory to the Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from GCP.asset_manifest import AssetManifest
+from Instrumentation.metrics import record_usage, span
 
 OUTPUT_FILENAME = ""
 OUTPUT_FOLDER = "outputs"
@@ -19,25 +23,29 @@ from pathlib import Path
 BASE_DIR = Path(OUTPUT_FOLDER)
 
 
+@st.cache_resource
+def get_asset_manifest():
+    """One AssetManifest per server process, kept across Streamlit reruns."""
+    return AssetManifest(BASE_DIR)
+
+
 def load_outputs(folder_name):
     """
     Returns (images, text_content) from /outputs/<folder_name>.
 
-    - images: list[Path] of image files directly under the folder (sorted)
+    - images: list of lazy AssetHandles (sorted); str(handle) is the image path
     - text_content: contents of "<folder_name>_prompt.txt" or None if missing
-    """
-    base = BASE_DIR / folder_name
-    if not base.exists() or not base.is_dir():
-        raise FileNotFoundError(f"Folder not found: {base}")
 
-    # Collect images at top level
-    images = sorted([p for p in base.iterdir() if p.is_file() and p.suffix.lower() in IMAGE_EXTS])
+    Only this folder is re-stat'ed on a rerun; files are hashed again only if they changed.
+    """
+    with span("load_outputs", folder=folder_name):
+        assets = get_asset_manifest().folder(folder_name)
+    if assets is None:
+        raise FileNotFoundError(f"Folder not found: {BASE_DIR / folder_name}")
 
-    # Read the specific prompt file if present
-    prompt_path = base / f"{folder_name}_prompt.txt"
-    text_content = prompt_path.read_text(encoding="utf-8", errors="replace") if prompt_path.is_file() else None
+    text_content = assets.prompt.read_text() if assets.prompt else None
 
-    return images, text_content
+    return assets.images, text_content
 
 
 def get_vertex_ai_content(prompt, key):
@@ -49,17 +57,18 @@ def get_vertex_ai_content(prompt, key):
 
     try:
         print(f" '{prompt}'")
-        images = model.generate_images(
-            prompt=prompt,
-            number_of_images=3,  # You can request more images (up to 4 typically)
-            language="en",
-            # Optional: Control image properties
-            aspect_ratio="4:3",  # Common aspect ratios: "1:1", "16:9", "4:3", etc.
-            # safety_filter_level="block_some", # Adjust safety filter level if needed
-            person_generation="dont_allow", # Control generation of people
-            seed=100,                 # Use a seed for reproducible results (cannot be used with watermark)
-            add_watermark=False       # Watermark is added by default and often cannot be disabled
-        )
+        with span("vertex_generate_images", key=key):
+            images = model.generate_images(
+                prompt=prompt,
+                number_of_images=3,  # You can request more images (up to 4 typically)
+                language="en",
+                # Optional: Control image properties
+                aspect_ratio="4:3",  # Common aspect ratios: "1:1", "16:9", "4:3", etc.
+                # safety_filter_level="block_some", # Adjust safety filter level if needed
+                person_generation="dont_allow", # Control generation of people
+                seed=100,                 # Use a seed for reproducible results (cannot be used with watermark)
+                add_watermark=False       # Watermark is added by default and often cannot be disabled
+            )
 
         # --- Save the Generated Image ---
         if images:
@@ -107,10 +116,12 @@ def get_gemini_client(text):
     # Initialize the client with the actual API key variable
     client = genai.Client(api_key=api_key)
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash", contents=text
-        # model="google-cloud-aiplatform", contents=text
-    )
+    with span("llm_request", model="gemini-2.5-flash", stage="gemini"):
+        response = client.models.generate_content(
+            model="gemini-2.5-flash", contents=text
+            # model="google-cloud-aiplatform", contents=text
+        )
+    record_usage(response, stage="gemini", model="gemini-2.5-flash")
     print(response.text)
     return response.text
 
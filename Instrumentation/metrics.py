@@ -0,0 +1,301 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# PIPELINE_METRICS=1 turns recording on; PIPELINE_METRICS_DIR=<dir> also turns it on
+# and writes metrics.prom + trace.json there when the process exits
+METRICS_ENV = "PIPELINE_METRICS"
+METRICS_DIR_ENV = "PIPELINE_METRICS_DIR"
+
+# Prometheus' default latency buckets plus a few for slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+MAX_TRACE_EVENTS = 100000
+# Label value recorded when a caller passes None (e.g. an error without HTTP status)
+MISSING_LABEL = "unknown"
+
+
+def escape_label_value(value):
+    """Label value escaped for the Prometheus text format: backslash, double quote and newline."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _NoopSpan:
+    """Shared do-nothing span handed out while recording is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **labels):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("registry", "name", "labels", "started")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.labels["error"] = exc_type.__name__
+        self.registry._finish_span(self.name, self.labels, self.started, seconds)
+        return False
+
+    def set(self, **labels):
+        """Adds labels known only once the work is done (status, rows, ...)."""
+        self.labels.update(labels)
+
+
+class MetricsRegistry:
+    """
+    Counters, histograms and a span trace for one process.
+
+    span() times a block: the duration goes into the
+    'pipeline_stage_seconds{stage=...}' histogram and, as a Chrome trace
+    event, into the trace. When the registry is disabled every call returns
+    right away, so instrumented code costs one attribute check.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.trace = []
+            self.dropped_events = 0
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, MISSING_LABEL if v is None else str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name, labels)
+
+    def _finish_span(self, name, labels, started, seconds):
+        self.observe("pipeline_stage_seconds", seconds, stage=name)
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": round((started - self._origin) * 1e6, 1),
+            "dur": round(seconds * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {k: str(v) for k, v in labels.items()},
+        }
+        with self._lock:
+            if len(self.trace) < MAX_TRACE_EVENTS:
+                self.trace.append(event)
+            else:
+                self.dropped_events += 1
+
+    def record_usage(self, response, stage="llm", model=None):
+        """
+        Token counters from a chat response: OpenAI 'usage' (prompt/completion
+        tokens) or Gemini 'usage_metadata'. Cached responses are counted apart.
+        """
+        if not self.enabled or response is None:
+            return
+        model = model or getattr(response, "model", None) or "unknown"
+        cached = bool(getattr(response, "cached", False))
+        self.inc("llm_requests_total", stage=stage, model=model, cached=cached)
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            prompt = getattr(usage, "prompt_tokens", 0) or 0
+            completion = getattr(usage, "completion_tokens", 0) or 0
+        else:
+            usage = getattr(response, "usage_metadata", None)
+            prompt = getattr(usage, "prompt_token_count", 0) or 0
+            completion = getattr(usage, "candidates_token_count", 0) or 0
+        self.inc("llm_prompt_tokens_total", prompt, stage=stage, model=model, cached=cached)
+        self.inc("llm_completion_tokens_total", completion, stage=stage, model=model, cached=cached)
+
+    def snapshot(self):
+        """Picklable copy of everything recorded, for merging across processes."""
+        with self._lock:
+            return {
+                "counters": list(self.counters.items()),
+                "histograms": [(key, h.counts, h.sum, h.count) for key, h in self.histograms.items()],
+                "trace": list(self.trace),
+                "dropped_events": self.dropped_events,
+            }
+
+    def merge(self, snapshot):
+        if not self.enabled or not snapshot:
+            return
+        with self._lock:
+            for key, value in snapshot["counters"]:
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, counts, total, count in snapshot["histograms"]:
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram()
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+            room = MAX_TRACE_EVENTS - len(self.trace)
+            self.trace.extend(snapshot["trace"][:room])
+            self.dropped_events += snapshot["dropped_events"] + max(0, len(snapshot["trace"]) - room)
+
+    def prometheus_text(self):
+        """All counters and histograms in the Prometheus text exposition format."""
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{escape_label_value(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{fmt(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{fmt(labels)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{fmt(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+
+    def write_trace(self, path):
+        """Span trace in the Chrome trace-event format (chrome://tracing, Perfetto)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            payload = {"traceEvents": list(self.trace), "otherData": {"dropped_events": self.dropped_events}}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    def export(self, directory):
+        """Writes metrics.prom and trace.json into `directory`."""
+        self.write_prometheus(os.path.join(directory, "metrics.prom"))
+        self.write_trace(os.path.join(directory, "trace.json"))
+        print(f"📈 Metrics exported to {directory}")
+
+
+METRICS = MetricsRegistry(
+    enabled=os.getenv(METRICS_ENV, "").lower() in ("1", "true", "yes") or bool(os.getenv(METRICS_DIR_ENV))
+)
+
+if os.getenv(METRICS_DIR_ENV):
+    atexit.register(METRICS.export, os.getenv(METRICS_DIR_ENV))
+
+
+def span(name, **labels):
+    """Times a block as stage `name` on the process-wide registry."""
+    return METRICS.span(name, **labels)
+
+
+def inc(name, value=1, **labels):
+    METRICS.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    METRICS.observe(name, value, **labels)
+
+
+def record_usage(response, stage="llm", model=None):
+    METRICS.record_usage(response, stage, model)
+
+
+def timed(name=None):
+    """Decorator form of span(); the stage defaults to the function name."""
+    def decorator(func):
+        stage = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            with METRICS.span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def enabled(export_dir=None):
+    """Turns recording on for a block, optionally exporting when it ends."""
+    previous = METRICS.enabled
+    METRICS.enabled = True
+    try:
+        yield METRICS
+    finally:
+        if export_dir:
+            METRICS.export(export_dir)
+        METRICS.enabled = previous
@@ -1,26 +1,56 @@
 import os
 import sys
+import time
 from pathlib import Path
 # Add the project root directory to the Python path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 from typing import List
 from dotenv import load_dotenv
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 import weaviate
-from weaviate.classes.query import Filter
 from datetime import datetime
+from itertools import islice
 import json
 import re
 
 from GCP.sports_terms import football_terms, basketball_terms, f1_terms
+from GCP.asset_manifest import AssetManifest
+from Instrumentation.metrics import inc, record_usage, span
+from SubtitleRules.stl_parser import format_cue, iter_stl_cues
+from SubtitleRules.ebu_stl import is_ebu_stl, iter_ebu_cues
+from SubtitleRules.chunker import chunk_cues, DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_CUES
+from SubtitleRules.extraction import build_extraction_prompt, run_async_extraction, EXTRACTION_MODEL
+from SubtitleRules.llm_cache import LLMCache, CachedChatClient, CachedAsyncChatClient
+from SubtitleRules.event_store import append_events, iter_events, read_events, write_events
+from SubtitleRules.checkpoint import RunCheckpoint, chunk_hash, checkpoint_path
+from SubtitleRules.json_extract import EVENT_RESPONSE_FORMAT, events_from_record, parse_llm_content
+from SubtitleRules.relevance import filter_chunks
+from SubtitleRules.ad_segmenter import FingerprintTable, strip_ads
+from SubtitleRules.dedup import EventDedupIndex, dedup_events
+from SubtitleRules.taxonomy import canonical_id, display_name
+from SubtitleRules.explanation_library import WARM_ENV, ExplanationLibrary, warm_enabled
+from Weaviate_db.insert import commentary_properties, ingest_objects
+from Weaviate_db.query import event_type_filter, stream_objects
+from Weaviate_db.schema import inverted_index_config
 
 
 # -------------------- Step 1: Read and Chunk STL File --------------------
 def read_stl_file(file_path):
+    if is_ebu_stl(file_path):
+        # Binary EBU STL: render the cues in the text format
+        return "\n".join(format_cue(cue) for cue in iter_ebu_cues(file_path)) + "\n"
     with open(file_path, "r", encoding="utf-8") as f:
         return f.read()
 
+
+def read_stl_cues(file_path):
+    """
+    Streams the cues of an .stl file as Cue(start, end, text) records,
+    with start/end as integer frames (see SubtitleRules/stl_parser.py).
+    """
+    return iter_stl_cues(file_path)
+
 def chunk_text(text, chunk_size=500):
     words = text.split()
     return [" ".join(words[i:i+chunk_size]) for i in range(0, len(words), chunk_size)]
@@ -47,140 +77,69 @@ def create_football_term_folders(terms_dict, base_dir="Conciseinfo"):
 
         print(f"✅ Created folder and file: {file_path}")
 
-def save_llm_output_to_json(response, output_file):
+def save_llm_output_to_json(response, output_file, extra_fields=None, dedup_index=None, merged_into=None):
     """
-    Extracts, cleans, parses, and saves JSON output from LLM response to file.
+    Extracts, cleans and parses JSON output from an LLM response and appends
+    it to the JSONL event log `output_file` (see SubtitleRules/event_store.py).
+    `extra_fields` (e.g. the chunk hash) are added to every saved record.
+    Events already in `dedup_index` (an EventDedupIndex) are merged instead
+    of being saved again; the chunk hashes of the events they were merged
+    into are added to the `merged_into` set. Returns the number of records saved.
     """
-
-    # 1️⃣ Extract content string
-    content = response.choices[0].message.content.strip()
-
-    # 2️⃣ Remove Markdown-style code fences (```json ... ```)
-    content = re.sub(r"^```json\s*|\s*```$", "", content.strip(), flags=re.DOTALL)
-
-    # 3️⃣ Try parsing JSON output
-    try:
-        parsed = json.loads(content)
-        if isinstance(parsed, dict):
-            parsed = [parsed]
-    except json.JSONDecodeError:
+    # Structured output parses directly, anything else goes through the JSON scanner
+    parsed = parse_llm_content(response.choices[0].message.content)
+    if len(parsed) == 1 and "raw_text" in parsed[0]:
         print("⚠️ LLM did not return valid JSON. Saving raw text instead.")
-        parsed = [{"raw_text": content}]
-
-    # 4️⃣ If file exists, load old data and merge
-    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-        with open(output_file, "r", encoding="utf-8") as f:
-            try:
-                existing_data = json.load(f)
-                if not isinstance(existing_data, list):
-                    existing_data = [existing_data]
-            except json.JSONDecodeError:
-                existing_data = []
-    else:
-        existing_data = []
-
-    # 5️⃣ Extend and save
-    existing_data.extend(parsed)
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, indent=2, ensure_ascii=False)
+    if extra_fields:
+        parsed = [{**item, **extra_fields} if isinstance(item, dict) else item for item in parsed]
+    for item in parsed:
+        if "event_type" in item:
+            item["canonical_type"] = canonical_id(item["event_type"])
+    if dedup_index is not None:
+        new_items = []
+        for item in parsed:
+            if "event_type" in item:
+                stored, is_new = dedup_index.add(item)
+                if not is_new:
+                    if merged_into is not None:
+                        merged_into.add(stored.get("chunk_hash"))
+                    continue
+            new_items.append(item)
+        parsed = new_items
 
-    print(f"✅ Saved {len(parsed)} events to {output_file}")
+    # Append only the new records instead of rewriting the whole file
+    saved = append_events(output_file, parsed)
+    print(f"✅ Saved {saved} events to {output_file}")
+    return saved
 
 
 def extract_all_json_objects(json_file):
     """
-    Reads the file and extracts only valid JSON arrays or objects,
-    ignoring any raw text or explanation text.
-    Returns a flat list of all parsed JSON entries.
+    Reads the event log and returns a flat list of all events, including
+    those embedded as JSON inside raw_text records.
     """
-    with open(json_file, "r", encoding="utf-8") as f:
-        raw = f.read()
-
-    # Find all potential JSON-like lists or dicts (even inside text)
-    json_blocks = re.findall(r"\[\s*{.*?}\s*\]", raw, flags=re.DOTALL)
-
-    all_events = []
-
-    for block in json_blocks:
-        try:
-            data = json.loads(block)
-            # Ensure it’s a list of dicts
-            if isinstance(data, list):
-                all_events.extend([
-                    item for item in data if isinstance(item, dict)
-                ])
-        except json.JSONDecodeError:
-            continue
-
-    return all_events
+    return [event for record in iter_events(json_file) for event in events_from_record(record)]
 
 
 def read_event_types_from_json(json_file):
     """Reads only 'event_type' from valid JSON parts of the file."""
-    all_events = extract_all_json_objects(json_file)
-    event_types = [
-        e["event_type"]
-        for e in all_events
-        if isinstance(e, dict) and "event_type" in e
-    ]
-    return event_types
-
-
-def read_event_types_from_json(json_file):
-    """
-    Reads all event types from saved JSON, including those embedded as text in raw_text fields.
-    """
-    with open(json_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    event_types = []
-
-    def extract_from_item(item):
-        """Recursive helper to extract event types from dicts/lists/text."""
-        if isinstance(item, dict):
-            # If dict has event_type directly
-            if "event_type" in item:
-                event_types.append(item["event_type"])
-            # If dict has raw_text that contains JSON — extract JSON inside text
-            elif "raw_text" in item and isinstance(item["raw_text"], str):
-                match = re.search(r"\[.*\]", item["raw_text"], flags=re.DOTALL)
-                if match:
-                    try:
-                        embedded = json.loads(match.group(0))
-                        extract_from_item(embedded)
-                    except Exception:
-                        pass
-            else:
-                # Recurse through all dict values
-                for v in item.values():
-                    extract_from_item(v)
-        elif isinstance(item, list):
-            for sub in item:
-                extract_from_item(sub)
-
-    extract_from_item(data)
-    return event_types
-
+    event_types = {e["event_type"] for e in extract_all_json_objects(json_file)}
+    return list(event_types)  # remove duplicates
 
 
 # -------------------- Step 2: Extract Events via LLM --------------------
 def extract_events(client, chunk, llm_output_filename):
-    prompt = f"""
-    Extract football match events from the following commentary text:
-    {chunk}
-
-    Return a list of JSON objects with the following keys:
-    - timestamp (if mentioned)
-    - event_type (e.g. goal, foul, penalty, substitution, offside, free kick, yellow/red card, corner, injury)
-    - player (if mentioned)
-    - team (if mentioned)
-    """
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0
-    )
+    # Accepts a plain text chunk or a Chunk from chunk_cues
+    prompt = build_extraction_prompt(getattr(chunk, "text", chunk))
+    with span("llm_request", model=EXTRACTION_MODEL):
+        response = client.chat.completions.create(
+            model=EXTRACTION_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            response_format=EVENT_RESPONSE_FORMAT
+        )
+    record_usage(response, stage="extraction", model=EXTRACTION_MODEL)
 
     save_llm_output_to_json(response, llm_output_filename)
     #
@@ -219,6 +178,8 @@ def normalize_name(name: str) -> str:
 def read_event_folders(event_types, base_dir="output", new_base_dir="Image_prompts"):
     """
     Reads images and prompt text from folders matching event_types.
+    - Images are returned as lazy AssetHandles from the output/ manifest
+      (path, size, sha256); call .base64() only where the encoded form is needed.
     - Folder search is case-insensitive and ignores special characters.
     - Always creates a folder for each event_type under new_base_dir (no duplicates).
     - Also creates a file named <event_type>.txt inside each new folder.
@@ -229,11 +190,17 @@ def read_event_folders(event_types, base_dir="output", new_base_dir="Image_promp
     os.makedirs(base_dir, exist_ok=True)
     os.makedirs(new_base_dir, exist_ok=True)
 
-    # List all existing folders in base_dir
-    all_folders = [f for f in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, f))]
+    # List all existing folders in base_dir, refreshing the manifest for changed files only
+    manifest = AssetManifest(base_dir).refresh()
+    all_folders = manifest.folder_names()
+
+    # Index folders by canonical event type once, instead of normalizing every folder per event
+    folders_by_type = {}
+    for folder in all_folders:
+        folders_by_type.setdefault(canonical_id(folder), []).append(folder)
 
     for event_type in event_types:
-        normalized_search = normalize_name(event_type)
+        event_id = canonical_id(event_type)
 
         # Always create folder in Image_prompts
         new_folder_name = event_type.replace(" ", "_")
@@ -250,38 +217,31 @@ def read_event_folders(event_types, base_dir="output", new_base_dir="Image_promp
         else:
             print(f"ℹ️ File already exists: {file_path}")
 
-        # Find matching folders in base_dir (case-insensitive, partial)
-        matching_folders = [f for f in all_folders if normalized_search in normalize_name(f)]
+        # Find matching folders in base_dir: same canonical type, otherwise
+        # fall back to case-insensitive partial matching for unknown types
+        if event_id:
+            matching_folders = folders_by_type.get(event_id, [])
+        else:
+            normalized_search = normalize_name(event_type)
+            matching_folders = [f for f in all_folders if normalized_search in normalize_name(f)]
 
         if not matching_folders:
             print(f"⚠️ No folder matching '{event_type}' found in '{base_dir}'. Created new empty one.")
             continue
 
-        # Otherwise, read images and prompt
+        # Otherwise, hand out prompt text and lazy image handles
         for folder in matching_folders:
-            event_dir = os.path.join(base_dir, folder)
-
-            # Read prompt text if exists
-            prompt_file = os.path.join(event_dir, f"{folder}_prompt.txt")
-            prompt_text = ""
-            if os.path.exists(prompt_file):
-                with open(prompt_file, "r", encoding="utf-8") as f:
-                    prompt_text = f.read().strip()
-
-            # Read all images in folder
-            for file in os.listdir(event_dir):
-                if file.lower().endswith((".png", ".jpg", ".jpeg")):
-                    image_path = os.path.join(event_dir, file)
-                    with open(image_path, "rb") as img_f:
-                        image_bytes = img_f.read()
-                        image_base64 = base64.b64encode(image_bytes).decode("utf-8")
-
-                        events_data.append({
-                            "event_type": folder,
-                            "prompt_text": prompt_text,
-                            "image": image_base64,
-                            "image_name": file
-                        })
+            assets = manifest.folder(folder, refresh=False)
+            prompt_text = assets.prompt_text()
+
+            for image in assets.images:
+                events_data.append({
+                    "event_type": folder,
+                    "prompt_text": prompt_text,
+                    "image": image,
+                    "image_name": image.name,
+                    "image_sha256": image.sha256,
+                })
 
     return events_data
 
@@ -305,10 +265,14 @@ def read_event_folders(event_types, base_dir="output", new_base_dir="Image_promp
 
 # -------------------- Step 4: Insert to Weaviate --------------------
 
-def insert_to_weaviate(wv_client, data):
+def insert_to_weaviate(wv_client, data, match_id="", **batch_options):
     """
     Ensures 'Commentary' collection exists once,
-    then inserts parsed event data every time this function is called.
+    then upserts parsed event data every time this function is called.
+    Events are sent through the batch API (see Weaviate_db/insert.py)
+    under ids derived from match, event type, timecode and player, so
+    rerunning a match does not add duplicates. `batch_options` are passed
+    on to ingest_objects.
     """
 
     # 1️⃣ Check existing collections
@@ -318,103 +282,59 @@ def insert_to_weaviate(wv_client, data):
     if "Commentary" not in existing_collections:
         wv_client.collections.create(
             name="Commentary",
+            inverted_index_config=inverted_index_config(),
             properties=[
                 {"name": "event_type", "dataType": "string"},
                 {"name": "player", "dataType": "string"},
                 {"name": "team", "dataType": "string"},
+                {"name": "match_id", "dataType": "string"},
+                {"name": "timestamp", "dataType": "string"},
+                {"name": "minute", "dataType": "int"},
             ]
         )
         print("✅ Created 'Commentary' collection.")
     else:
         print("✅ 'Commentary' collection already exists.")
 
-    # 3️⃣ Get the collection reference
-    collection = wv_client.collections.get("Commentary")
-
-    inserted_count = 0
     skipped_count = 0
 
-    # 4️⃣ Parse and insert events
+    # 3️⃣ Parse events
+    events = []
     for item in data:
-        raw_text = item.get("raw_text", "")
-
-        try:
-            # Extract JSON content if in ```json blocks
-            json_str = re.search(r'```json\n(.*?)```', raw_text, re.DOTALL)
-            if json_str:
-                parsed_events = json.loads(json_str.group(1))
-            else:
-                parsed_events = json.loads(raw_text)
-        except Exception as e:
-            print(f"⚠️ Skipping item due to parsing error: {e}")
+        # Structured records are events themselves, raw_text records are scanned for embedded JSON
+        parsed_events = events_from_record(item)
+        if not parsed_events:
+            print(f"⚠️ Skipping item without events: {str(item)[:80]}")
             skipped_count += 1
             continue
+        events.extend(parsed_events)
+
+    # 4️⃣ Merge duplicates from overlapping chunks, then batch-insert
+    properties = (commentary_properties(event, match_id) for event in dedup_events(events))
+    report = ingest_objects("Commentary", properties, wv_client=wv_client, **batch_options)
+    inc("weaviate_objects_total", skipped_count, collection="Commentary", status="skipped")
 
-        print(parsed_events)
-
-        if isinstance(parsed_events, list):
-            for event in parsed_events:
-                event_type = event.get("event_type")
-                player = event.get("player")
-                team = event.get("team")
-
-                # Normalize potential None/list values
-                event_type_str = str(event_type or "")
-                player_str = str(player[0] if isinstance(player, list) and player else player or "")
-                team_str = str(team[0] if isinstance(team, list) and team else team or "")
-
-                try:
-                    collection.data.insert({
-                        "event_type": event_type_str,
-                        "player": player_str,
-                        "team": team_str,
-                        "inserted_at": datetime.now(),
-                    })
-                    inserted_count += 1
-                except Exception as e:
-                    print(f"⚠️ Failed to insert event: {e}")
-                    skipped_count += 1
-            else:
-                print(f"⚠️ Unexpected format: {type(parsed_events)}")
-                skipped_count += 1
-
-    print(f"Insert summary: {inserted_count} inserted, {skipped_count} skipped.")
+    print(f"Insert summary: {report['inserted']} inserted, {report['failed']} failed, {skipped_count} skipped.")
+    return report
 
 # -------------------- Query and Explanation --------------------
 def query(wv_client, limit=20, event_type=None):
     """
     Query events from Weaviate with optional filtering by event_type.
-    Returns most recent events first (sorted by inserted_at descending).
+    Returns most recent events first (sorted by inserted_at descending on the server).
     """
-    collection = wv_client.collections.get("Commentary")
-
-    # Build the query with optional filter
-    if event_type:
-        results = collection.query.fetch_objects(
-            filters=Filter.by_property("event_type").equal(event_type),
-            limit=limit
-        )
-    else:
-        results = collection.query.fetch_objects(
-            limit=limit
-        )
-
-    # Extract and sort results manually by inserted_at if needed
-    output = []
-    for obj in results.objects:
-        output.append({
-            "event_type": obj.properties.get("event_type"),
-            "player": obj.properties.get("player"),
-            "team": obj.properties.get("team"),
-            "inserted_at": obj.properties.get("inserted_at")
-        })
-
-    # Sort by inserted_at descending (most recent first)
-    output.sort(key=lambda x: x.get("inserted_at") or "", reverse=True)
-
-    # Remove inserted_at from output for cleaner results
-    for item in output:
-        item.pop("inserted_at", None)
+    # Match every spelling of the canonical type
+    events = stream_objects(
+        "Commentary",
+        filters=event_type_filter(event_type) if event_type else None,
+        sort_by="inserted_at",
+        ascending=False,
+        properties=["event_type", "player", "team"],
+        page_size=limit,
+        wv_client=wv_client,
+    )
+    output = [{"event_type": event.get("event_type"), "player": event.get("player"), "team": event.get("team")}
+              for event in islice(events, limit)]
 
     print(output)
     return output
@@ -422,93 +342,74 @@ def query(wv_client, limit=20, event_type=None):
 
 def parse_events_from_json(json_data):
     """
-    Parses the event_extraction_output.json and extracts structured events.
+    Parses the event log (a path, streamed via iter_events) or an already
+    loaded list of records and extracts structured events.
     Returns a list of event dictionaries with event_type, player, and team.
     """
+    if isinstance(json_data, (str, os.PathLike)):
+        json_data = iter_events(json_data)
+
     parsed_events = []
 
     for item in json_data:
-        raw_text = item.get("raw_text", "")
-
-        if not raw_text:
-            continue
-
-        try:
-            # Extract JSON content if wrapped in ```json blocks
-            json_str = re.search(r'```json\n(.*?)```', raw_text, re.DOTALL)
-            if json_str:
-                events = json.loads(json_str.group(1))
-            else:
-                events = json.loads(raw_text)
-        except Exception as e:
-            print(f"⚠️ Skipping item due to parsing error: {e}")
-            continue
-
-        # Normalize to list
-        if isinstance(events, dict):
-            events = [events]
-
-        if isinstance(events, list):
-            for event in events:
-                event_type = event.get("event_type", "")
-                player = event.get("player", "")
-                team = event.get("team", "")
-                timestamp = event.get("timestamp", "")
-
-                # Normalize list values
-                if isinstance(player, list):
-                    player = player[0] if player else ""
-                if isinstance(team, list):
-                    team = team[0] if team else ""
-
-                parsed_events.append({
-                    "timestamp": str(timestamp),
-                    "event_type": str(event_type),
-                    "player": str(player),
-                    "team": str(team)
-                })
+        # Structured records are events themselves, raw_text records are scanned for embedded JSON
+        for event in events_from_record(item):
+            event_type = event.get("event_type", "")
+            player = event.get("player", "")
+            team = event.get("team", "")
+            timestamp = event.get("timestamp", "")
+
+            # Normalize list values
+            if isinstance(player, list):
+                player = player[0] if player else ""
+            if isinstance(team, list):
+                team = team[0] if team else ""
+
+            parsed_events.append({
+                "timestamp": str(timestamp),
+                "event_type": str(event_type),
+                "player": str(player),
+                "team": str(team)
+            })
 
     print(f"✅ Parsed {len(parsed_events)} events from JSON")
     return parsed_events
 
 
-def event_type_explanation(client, events, dir_path, filename):
-    formatted = []
+def event_type_explanation(client, events, dir_path, filename, library=None):
+    """
+    Writes rule explanations for the event types in `events` to dir_path/filename.
+    Explanations come from the persistent ExplanationLibrary; the model is only
+    asked about event types the library has never seen.
+    """
+    if library is None:
+        library = ExplanationLibrary()
+
+    event_types = []
     for i, event in enumerate(events, 1):
         # Skip events without event_type
         if not event.get("event_type"):
             print(f"Warning: Event {i} missing 'event_type' field, skipping...")
             continue
-
-        parts = []
-        if event.get("player"):
-            parts.append(f"Player: {event['player']}")
-        if event.get("team"):
-            parts.append(f"Team: {event['team']}")
-        parts.append(f"Event: {event['event_type']}")
-        formatted.append(f"{len(formatted) + 1}. {' | '.join(parts)}")
+        event_types.append(event["event_type"])
 
     # Check if we have any valid events to process
-    if not formatted:
+    if not event_types:
         print("No valid events with 'event_type' found.")
         return None
 
-    prompt = (
-        "You are a football commentator explaining live match events to beginners. "
-        "For each event (goal, foul, offside, penalty, etc.), explain briefly what it means, "
-        "the rule behind it, and how it affects the match flow — in simple, clear terms. "
-        "Avoid repeating rule explanations for the same event type. "
-        "Focus on clarity, impact, and next actions.\n\n"
-        f"Here are the match events:\n{chr(10).join(formatted)}"
-    )
+    library.warm(client, event_types)
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.5
-    )
+    # One section per event type, in the format append_explanation_to_json reads
+    sections = {}
+    for event_type in event_types:
+        text = library.get(event_type)
+        if text:
+            event_id = canonical_id(event_type)
+            name = display_name(event_id) if event_id else event_type
+            sections.setdefault(name, f"**{name}**\n{text}")
 
-    explanation_text = response.choices[0].message.content
+    explanation_text = "\n---\n".join(sections.values())
     os.makedirs(dir_path, exist_ok=True)
     file_path = os.path.join(dir_path, filename)
 
@@ -519,92 +420,115 @@ def event_type_explanation(client, events, dir_path, filename):
     return explanation_text
 
 
-def save_llm_output_to_json(response, output_file):
-    """Extracts JSON from LLM response and appends to output JSON file."""
-    content = response.choices[0].message.content.strip()
-    content = re.sub(r"^```json\s*|\s*```$", "", content.strip(), flags=re.DOTALL)
-
-    try:
-        parsed = json.loads(content)
-        if isinstance(parsed, dict):
-            parsed = [parsed]
-    except json.JSONDecodeError:
-        print("⚠️ Could not parse JSON, saving raw text.")
-        parsed = [{"raw_text": content}]
-
-    # Append to existing file if it exists
-    try:
-        with open(output_file, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        existing = []
-
-    existing.extend(parsed)
-
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(existing, f, indent=2, ensure_ascii=False)
-
-
-def extract_all_json_objects(file_path):
-    """Reads all valid JSON objects from file."""
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        if isinstance(data, dict):
-            data = [data]
-    return data
-
-
-def read_event_types_from_json(json_file):
-    """Reads only 'event_type' from valid JSON parts of the file."""
-    all_events = extract_all_json_objects(json_file)
-    event_types = [
-        e["event_type"]
-        for e in all_events
-        if isinstance(e, dict) and "event_type" in e
-    ]
-    return list(set(event_types))  # remove duplicates
-
-
-def read_stl_file(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        return f.read()
-
-
-def chunk_text(text, chunk_size=500):
-    words = text.split()
-    return [" ".join(words[i:i+chunk_size]) for i in range(0, len(words), chunk_size)]
-
-
-def subtitle_to_event_types(stl_file: str, client, llm_output_filename: str) -> List[str]:
+def subtitle_to_event_types(stl_file: str, client, llm_output_filename: str,
+                            max_tokens: int = DEFAULT_MAX_TOKENS,
+                            overlap_cues: int = DEFAULT_OVERLAP_CUES,
+                            async_client=None, concurrency: int = 8,
+                            resume: bool = True, prefilter: bool = True,
+                            remove_ads: bool = True, router=None) -> List[str]:
     """
     Reads a subtitle (.stl) file, extracts football events via LLM,
     saves parsed events JSON, and returns the list of unique event types.
+    Cues are packed into chunks of at most `max_tokens` estimated tokens.
+    If `async_client` (AsyncAzureOpenAI) is given, chunks are sent
+    concurrently with at most `concurrency` requests in flight.
+    With `resume`, chunks already recorded in the run's checkpoint manifest
+    are skipped, so a crashed or revised run only processes what is left.
+    With `prefilter`, chunks without match action (ads, pre-match talk) are
+    dropped locally; the report is saved as <output>.prefilter.json.
+    With `remove_ads`, advert / jingle blocks are cut from the cues before
+    chunking (see SubtitleRules/ad_segmenter.py).
+    With a `router` (SubtitleRules/routing.ChunkRouter), sparse chunks go to
+    a cheaper deployment; per-route stats are saved as <output>.routing.json.
     """
-    text = read_stl_file(stl_file)
-    chunks = chunk_text(text)
-
-    print(f"Processing {len(chunks)} text chunks from {stl_file}...")
-
-    for i, chunk in enumerate(chunks, 1):
-        print(f"→ Sending chunk {i}/{len(chunks)} to LLM...")
-        prompt = f"""
-        Extract football match events from the following commentary text:
-        {chunk}
-
-        Return a list of JSON objects with the following keys:
-        - timestamp (if mentioned)
-        - event_type (e.g. goal, foul, penalty, substitution, offside, free kick, yellow/red card, corner, injury)
-        - player (if mentioned)
-        - team (if mentioned)
-        """
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
+    with span("read_stl"):
+        cues = list(read_stl_cues(stl_file))
+    if remove_ads:
+        with span("ad_filter"):
+            cues, _ = strip_ads(cues, FingerprintTable())
+    with span("chunk"):
+        chunks = list(chunk_cues(cues, max_tokens=max_tokens, overlap_cues=overlap_cues))
+    inc("chunks_total", len(chunks))
+
+    if prefilter:
+        with span("prefilter"):
+            kept, report = filter_chunks(chunks)
+        inc("chunks_skipped_total", len(report["skipped"]), reason="prefilter")
+        os.makedirs(os.path.dirname(llm_output_filename) or ".", exist_ok=True)
+        with open(f"{llm_output_filename}.prefilter.json", "w", encoding="utf-8") as f:
+            json.dump({"stl_file": str(stl_file), **report}, f, indent=2)
+        chunks = kept
+
+    checkpoint = None
+    pending = chunks
+    if resume:
+        # A chunk counts as done when it was extracted by any deployment it may be routed to;
+        # the route can change between runs as the player roster grows
+        models = router.models if router is not None else (EXTRACTION_MODEL,)
+        hashes = [[chunk_hash(chunk, model) for model in models] for chunk in chunks]
+        checkpoint = RunCheckpoint(checkpoint_path(llm_output_filename), stl_file)
+        checkpoint.prune(llm_output_filename, [h for chunk_hashes in hashes for h in chunk_hashes])
+        pending = [chunk for chunk, chunk_hashes in zip(chunks, hashes)
+                   if not any(checkpoint.is_done(h) for h in chunk_hashes)]
+        if len(pending) < len(chunks):
+            print(f"⏭️ Skipping {len(chunks) - len(pending)} chunks completed in a previous run")
+
+    print(f"Processing {len(pending)} of {len(chunks)} text chunks from {stl_file}...")
+
+    # Events already saved (earlier chunks or runs) are merged, not saved again
+    dedup_index = EventDedupIndex()
+    for event in extract_all_json_objects(llm_output_filename):
+        dedup_index.add(event)
+    if router is not None:
+        # Players named in earlier chunks make the chunks mentioning them denser
+        router.add_players(event.get("player") for event in dedup_index.events())
+
+    def save(chunk, response):
+        # Hash under the deployment the chunk was sent to (the roster does not change during the run)
+        h = chunk_hash(chunk, router.decide(chunk).model if router is not None else EXTRACTION_MODEL)
+        merged_into = set()
+        with span("save_events"):
+            # The chunk's span and file let the dedup index merge only what overlapping chunks both saw
+            extra_fields = {"chunk_hash": h, "chunk_span": [chunk.start, chunk.end], "stl_file": Path(stl_file).name}
+            saved = save_llm_output_to_json(response, llm_output_filename, extra_fields, dedup_index, merged_into)
+            if checkpoint is not None:
+                checkpoint.mark_done(h, chunk, saved, merged_into)
+        inc("events_saved_total", saved)
+
+    if async_client is not None:
+        # Results are saved in chunk order while later chunks are still in flight
+        run_async_extraction(
+            async_client, pending, concurrency=concurrency,
+            on_result=lambda position, response: save(pending[position], response),
+            router=router,
         )
-
-        save_llm_output_to_json(response, llm_output_filename)
-
+    else:
+        for i, chunk in enumerate(pending, 1):
+            route = router.route(chunk) if router is not None else None
+            model = route.model if route is not None else EXTRACTION_MODEL
+            print(f"→ Sending chunk {i}/{len(pending)} ({chunk.tokens} tokens) to {model}...")
+            started = time.perf_counter()
+            with span("llm_request", model=model):
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": build_extraction_prompt(chunk.text)}],
+                    temperature=0,
+                    response_format=EVENT_RESPONSE_FORMAT
+                )
+            record_usage(response, stage="extraction", model=model)
+            if route is not None:
+                router.record(route, time.perf_counter() - started, response)
+
+            save(chunk, response)
+
+    if router is not None:
+        report = router.report()
+        with open(f"{llm_output_filename}.routing.json", "w", encoding="utf-8") as f:
+            json.dump({"stl_file": str(stl_file), **report}, f, indent=2)
+        print(f"🔀 Routing: {report['dense']['chunks']} chunks to {report['dense']['model']}, "
+              f"{report['cheap']['chunks']} to {report['cheap']['model']}")
+    if dedup_index.duplicates:
+        print(f"🧬 Merged {dedup_index.duplicates} duplicate events across chunks")
     event_types = read_event_types_from_json(llm_output_filename)
     print(f"Extracted event types: {event_types}")
     return event_types
@@ -614,12 +538,24 @@ import json
 import os
 import re
 
-def append_explanation_to_json(json_file, explanation_file):
+def append_explanation_to_json(json_file, explanation_file=None, library=None):
     """
     Reads a formatted explanation text file and appends the matching explanations
     to each event in the given JSON file based on event_type.
+    With an ExplanationLibrary, explanations are looked up by canonical type
+    directly and the text file is not parsed at all.
     """
 
+    if library is not None:
+        if not os.path.exists(json_file):
+            print(f"⚠️ JSON file not found: {json_file}")
+            return
+        data = read_events(json_file)
+        explained = library.explain(data)
+        write_events(json_file, data)
+        print(f"✅ Explanations from library appended to {explained} events in {json_file}")
+        return
+
     # Step 1: Read and parse the explanation text
     if not os.path.exists(explanation_file):
         print(f"⚠️ Explanation file not found: {explanation_file}")
@@ -633,8 +569,9 @@ def append_explanation_to_json(json_file, explanation_file):
     pattern = r"\*\*(.*?)\*\*.*?(?=\n---|\Z)"
     matches = re.findall(pattern, text, flags=re.DOTALL)
 
-    # Create mapping of event_type → explanation text
+    # Create mapping of event_type → explanation text, also keyed by canonical type
     explanations = {}
+    explanations_by_type = {}
     sections = re.split(r"\n---\n", text)
 
     for section in sections:
@@ -642,6 +579,9 @@ def append_explanation_to_json(json_file, explanation_file):
         if event_match:
             event_name = event_match.group(1).strip().lower()
             explanations[event_name] = section.strip()
+            event_id = canonical_id(event_name)
+            if event_id:
+                explanations_by_type.setdefault(event_id, section.strip())
 
     print(f"✅ Extracted {len(explanations)} event explanations from text file.")
 
@@ -650,32 +590,25 @@ def append_explanation_to_json(json_file, explanation_file):
         print(f"⚠️ JSON file not found: {json_file}")
         return
 
-    with open(json_file, "r", encoding="utf-8") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            print("⚠️ Invalid JSON file format.")
-            return
-
-    if isinstance(data, dict):
-        data = [data]
+    data = read_events(json_file)
 
     # Step 3: Append matching explanations
     for event in data:
         if isinstance(event, dict) and "event_type" in event:
             etype = event["event_type"].lower()
-            # Find closest matching explanation (partial match allowed)
-            matched_explanation = None
-            for key in explanations.keys():
-                if key in etype or etype in key:
-                    matched_explanation = explanations[key]
-                    break
+            event_id = event.get("canonical_type") or canonical_id(etype)
+            matched_explanation = explanations_by_type.get(event_id) if event_id else None
+            if matched_explanation is None and not event_id:
+                # Unknown type: find closest matching explanation (partial match allowed)
+                for key in explanations.keys():
+                    if key in etype or etype in key:
+                        matched_explanation = explanations[key]
+                        break
             if matched_explanation:
                 event["explanation"] = matched_explanation
 
-    # Step 4: Save updated JSON
-    with open(json_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # Step 4: Save updated events (atomic rewrite, the log is never half-written)
+    write_events(json_file, data)
 
     print(f"✅ Explanations appended to events in {json_file}")
 
@@ -700,8 +633,17 @@ def main():
         api_key=azure_api_key,
         api_version="2025-01-01-preview",
     )
+    async_client = AsyncAzureOpenAI(
+        azure_endpoint=azure_endpoint,
+        api_key=azure_api_key,
+        api_version="2025-01-01-preview",
+    )
 
-
+    # Identical prompts (reruns, unchanged chunks) are answered from the local cache;
+    # set LLM_CACHE_DISABLED=1 to always call the model
+    llm_cache = LLMCache()
+    client = CachedChatClient(client, llm_cache)
+    async_client = CachedAsyncChatClient(async_client, llm_cache)
 
     stl_file_path = "/Users/prda5207/PycharmProjects/Labweek_Fall_2025_MatchAgent/SubtitleRules/Data/TESTFeedforSTLsubtitlefile.stl"
     #stl_file_path = "/Users/prda5207/PycharmProjects/Labweek_Fall_2025_MatchAgent/SubtitleRules/Data/AIgeneratedSubtitles.stl"
@@ -713,9 +655,21 @@ def main():
         return
 
     #print("Reading STL file...")
-    #event_types = subtitle_to_event_types(stl_file_path, client, llm_output_filename)
+    #event_types = subtitle_to_event_types(stl_file_path, client, llm_output_filename, async_client=async_client)
     #print(event_types)
-    append_explanation_to_json(llm_output_filename, "/Users/prda5207/PycharmProjects/Labweek_Fall_2025_MatchAgent/SubtitleRules/gpt_outputs/explanation.txt")
+    # Rule explanations are shared across matches. Generating missing ones calls the model,
+    # so it only happens with EXPLANATION_LIBRARY_WARM=1; otherwise explanation.txt is used
+    library = ExplanationLibrary()
+    event_types = read_event_types_from_json(llm_output_filename)
+    if warm_enabled():
+        library.warm(client, event_types)
+    missing = library.missing(event_types)
+    if missing:
+        print(f"ℹ️ {len(missing)} event types are not in the explanation library "
+              f"(set {WARM_ENV}=1 to generate them), using explanation.txt")
+        append_explanation_to_json(llm_output_filename, "/Users/prda5207/PycharmProjects/Labweek_Fall_2025_MatchAgent/SubtitleRules/gpt_outputs/explanation.txt")
+    else:
+        append_explanation_to_json(llm_output_filename, library=library)
 
     #text = read_stl_file(stl_file_path)
     #chunks = chunk_text(text)
@@ -773,6 +727,8 @@ def main():
     #print("🏁 All football term folders created successfully.")
 
     #wv_client.close()
+    print(f"LLM cache: {llm_cache.stats()}")
+    llm_cache.close()
     print("Processing complete.")
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+from SubtitleRules.relevance import compile_lexicon, score_text
+from SubtitleRules.stl_parser import FPS, iter_stl_cues
+
+DEFAULT_TABLE_PATH = os.path.join("gpt_outputs", "ad_fingerprints.json")
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+ENGLISH_WORDS = {
+    "the", "you", "and", "of", "is", "it", "we", "to", "a", "in", "my", "your", "me",
+    "love", "baby", "can", "make", "if", "try", "what", "needs", "world", "just", "us",
+    "this", "that", "with", "for", "on", "be", "all", "yeah", "oh", "go", "here", "place",
+}
+GERMAN_WORDS = {
+    "der", "die", "das", "und", "ist", "nicht", "ein", "eine", "den", "dem", "mit", "auf",
+    "zu", "von", "im", "es", "er", "sie", "wir", "ich", "auch", "noch", "jetzt", "dann",
+    "schon", "aber", "hier", "wie", "so", "mal", "für", "bei", "nach", "was",
+}
+# Vocabulary of commercials, sponsor boards and channel promos, matched as
+# whole words like the relevance lexicon ("euro" does not hit Europa League)
+AD_MARKERS = [
+    "euro", "bonus", "neukunden", "wetten", "sportwette", "tipico", "interwetten",
+    "online", "registrierung", "angebot", "apotheke", "packungsbeilage", "nebenwirkungen",
+    "präsentiert von", "sky atlantic", "sky sport news", "skysport", "hd plus", "abo",
+    "www", "günstiger", "krombacher", "bestellen", "cashback", "vorteilspreis", "testsieger",
+    "paket", "deal", "jetzt starten", "hol dir", "hole dir", "sicher dir", "sichere dir",
+]
+# Literal tokens: the euro sign and web addresses (sky.de)
+AD_SYMBOLS = r"€|\.de\b"
+_AD_MARKER_RE = re.compile(compile_lexicon({marker: 1 for marker in AD_MARKERS}).pattern + "|" + AD_SYMBOLS,
+                           re.IGNORECASE)
+
+# Per-cue feature weights for the ad score
+WEIGHTS = {"english": 1.0, "ad_marker": 1.0, "recurring": 0.8, "long_gap": 0.3, "football": -1.0}
+DEFAULT_WINDOW = 9
+DEFAULT_THRESHOLD = 0.45
+DEFAULT_MIN_BLOCK = 4
+LONG_GAP_SECONDS = 4
+
+
+def fingerprint(text):
+    """Normalized hash of a cue text, or None for phrases too short to be telling."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < 3:
+        return None
+    return hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class FingerprintTable:
+    """
+    Recurring-phrase table learned across subtitle files: fingerprint →
+    number of different files it appeared in. Jingles, sponsor boards and
+    commercials repeat across broadcasts, live commentary does not.
+    """
+
+    def __init__(self, path=DEFAULT_TABLE_PATH, min_files=2):
+        self.path = path
+        self.min_files = min_files
+        self.counts = {}
+        self.files = set()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.counts = data.get("counts", {})
+            self.files = set(data.get("files", []))
+
+    def learn(self, stl_file):
+        """Adds the fingerprints of one file (each counted once per file)."""
+        key = os.path.basename(stl_file)
+        if key in self.files:
+            return
+        seen = {fingerprint(cue.text) for cue in iter_stl_cues(stl_file)}
+        seen.discard(None)
+        for fp in seen:
+            self.counts[fp] = self.counts.get(fp, 0) + 1
+        self.files.add(key)
+
+    def is_recurring(self, fp):
+        return fp is not None and self.counts.get(fp, 0) >= self.min_files
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"files": sorted(self.files), "counts": self.counts}, f)
+
+
+def cue_features(cues, table=None, fps=FPS):
+    """
+    Per-cue feature matrix (n_cues × features) in WEIGHTS order. Text
+    features are computed once per cue; timing statistics are vectorized.
+    """
+    n = len(cues)
+    english = np.zeros(n)
+    ad_marker = np.zeros(n)
+    recurring = np.zeros(n)
+    football = np.zeros(n)
+
+    # Phrases repeated inside the same broadcast count as recurring too
+    fingerprints = [fingerprint(cue.text) for cue in cues]
+    in_file = {}
+    for fp in fingerprints:
+        if fp is not None:
+            in_file[fp] = in_file.get(fp, 0) + 1
+
+    for i, cue in enumerate(cues):
+        words = _WORD_RE.findall(cue.text.lower())
+        if words:
+            en = sum(w in ENGLISH_WORDS for w in words)
+            de = sum(w in GERMAN_WORDS for w in words)
+            english[i] = en / len(words) if en > de else 0.0
+        ad_marker[i] = min(len(_AD_MARKER_RE.findall(cue.text)), 2) / 2
+        fp = fingerprints[i]
+        recurring[i] = float(in_file.get(fp, 0) > 1 or (table is not None and table.is_recurring(fp)))
+        football[i] = min(score_text(cue.text), 2) / 2
+
+    starts = np.fromiter((cue.start for cue in cues), dtype=np.int64, count=n)
+    ends = np.fromiter((cue.end for cue in cues), dtype=np.int64, count=n)
+    gaps = np.maximum(starts - np.concatenate(([starts[0] if n else 0], ends[:-1])), 0)
+    long_gap = (gaps > LONG_GAP_SECONDS * fps).astype(float)
+
+    return np.column_stack([english, ad_marker, recurring, long_gap, football])
+
+
+def detect_ad_blocks(cues, table=None, window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD,
+                     min_block=DEFAULT_MIN_BLOCK, fps=FPS):
+    """
+    Flags advert / non-commentary blocks. Returns (mask, blocks): a boolean
+    array marking ad cues and a list of (first_index, last_index) blocks.
+    The weighted per-cue score is smoothed with a moving average over
+    `window` cues; runs above `threshold` of at least `min_block` cues
+    become blocks.
+    """
+    cues = list(cues)
+    n = len(cues)
+    if n == 0:
+        return np.zeros(0, dtype=bool), []
+
+    weights = np.array([WEIGHTS[name] for name in ("english", "ad_marker", "recurring", "long_gap", "football")])
+    scores = cue_features(cues, table, fps) @ weights
+    kernel = np.ones(window) / window
+    smoothed = np.convolve(scores, kernel, mode="same")
+    flagged = smoothed > threshold
+
+    # Run boundaries of the flagged mask
+    padded = np.concatenate(([False], flagged, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    starts, stops = edges[0::2], edges[1::2]
+    keep = (stops - starts) >= min_block
+
+    mask = np.zeros(n, dtype=bool)
+    blocks = []
+    for start, stop in zip(starts[keep], stops[keep]):
+        mask[start:stop] = True
+        blocks.append((int(start), int(stop - 1)))
+    return mask, blocks
+
+
+def strip_ads(cues, table=None, **kwargs):
+    """
+    Removes ad blocks from a cue list before chunking.
+    Returns (kept_cues, report).
+    """
+    cues = list(cues)
+    mask, blocks = detect_ad_blocks(cues, table, **kwargs)
+    kept = [cue for cue, is_ad in zip(cues, mask) if not is_ad]
+    report = {
+        "cues": len(cues),
+        "ad_cues": int(mask.sum()),
+        "ad_blocks": [{"first": cues[a].start, "last": cues[b].end, "cues": b - a + 1} for a, b in blocks],
+    }
+    print(f"📺 Ad filter: removed {report['ad_cues']}/{len(cues)} cues in {len(blocks)} blocks")
+    return kept, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Learn recurring ad phrases across subtitle files.")
+    parser.add_argument("paths", nargs="+", help=".stl files or glob patterns")
+    parser.add_argument("--table", default=DEFAULT_TABLE_PATH)
+    args = parser.parse_args()
+
+    table = FingerprintTable(args.table)
+    for pattern in args.paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            table.learn(path)
+    table.save()
+    recurring = sum(1 for count in table.counts.values() if count >= table.min_files)
+    print(f"✅ Learned {len(table.files)} files, {recurring} recurring phrases → {args.table}")
+
+
+if __name__ == "__main__":
+    main()
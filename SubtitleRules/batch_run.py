@@ -0,0 +1,283 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+if __name__ == "__main__":
+    # Run as a script (python SubtitleRules/batch_run.py): make the project packages importable.
+    # Imported as a library, the caller's path already resolves them.
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from Instrumentation.metrics import METRICS, span
+from SubtitleRules.chunker import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_CUES
+
+DEFAULT_RUNS_DIR = os.path.join("gpt_outputs", "runs")
+DEFAULT_MAX_REQUESTS = 16
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+
+class UsageCounter:
+    """
+    Wraps a chat client and counts requests, cache hits and token usage
+    of every `chat.completions.create(...)` call that goes through it.
+    """
+
+    def __init__(self, client, is_async=False):
+        self._client = client
+        self.requests = 0
+        self.cached = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        create = self._create_async if is_async else self._create
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _count(self, response):
+        self.requests += 1
+        self.cached += bool(getattr(response, "cached", False))
+        usage = getattr(response, "usage", None)
+        self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+        return response
+
+    def _create(self, **kwargs):
+        return self._count(self._client.chat.completions.create(**kwargs))
+
+    async def _create_async(self, **kwargs):
+        return self._count(await self._client.chat.completions.create(**kwargs))
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "cached": self.cached,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+def find_stl_files(paths):
+    """Expands directories and glob patterns into a sorted, de-duplicated list of .stl files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, "**", "*.stl"), recursive=True)
+        else:
+            matches = glob.glob(path, recursive=True) or [path]
+        files.extend(m for m in matches if m.lower().endswith(".stl") and os.path.isfile(m))
+    return sorted(set(files))
+
+
+def match_dir_names(stl_files):
+    """
+    Output folder name of every file: its path relative to the deepest
+    directory shared by all files, without the extension, with "__" for
+    path separators. Files with the same name in different subfolders
+    (a/feed.stl, b/feed.stl → a__feed, b__feed) get folders of their own.
+    """
+    paths = [os.path.abspath(stl_file) for stl_file in stl_files]
+    if not paths:
+        return {}
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return {stl_file: os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, "__")
+            for stl_file, path in zip(stl_files, paths)}
+
+
+def _make_clients(fake_latency=None):
+    """
+    Returns (client, make_async_client). A new async client is made per match:
+    its connection pool is bound to the event loop of that match's run.
+    """
+    from SubtitleRules.llm_cache import LLMCache, CachedChatClient, CachedAsyncChatClient
+
+    if fake_latency is not None:
+        from SubtitleRules.fake_llm import FakeChatClient, FakeAsyncChatClient
+        return FakeChatClient(latency=fake_latency), lambda: FakeAsyncChatClient(latency=fake_latency)
+
+    from dotenv import load_dotenv
+    from openai import AzureOpenAI, AsyncAzureOpenAI
+
+    load_dotenv()
+    settings = dict(
+        azure_endpoint=os.getenv("azure_endpoint_gpt4o"),
+        api_key=os.getenv("azure_endpoint_gpt4o_key"),
+        api_version="2025-01-01-preview",
+    )
+    # All workers share one cache file (SQLite WAL)
+    llm_cache = LLMCache()
+    return CachedChatClient(AzureOpenAI(**settings), llm_cache), \
+        lambda: CachedAsyncChatClient(AsyncAzureOpenAI(**settings), llm_cache)
+
+
+def _init_worker(fake_latency):
+    client, make_async_client = _make_clients(fake_latency)
+    _worker["client"] = UsageCounter(client)
+    _worker["make_async_client"] = make_async_client
+
+
+def process_match(stl_file, output_file, options):
+    """Runs the extraction pipeline for one match in a worker process; returns its stats."""
+    from SubtitleRules.Subtitle_preprocessinf import subtitle_to_event_types
+    from SubtitleRules.routing import ChunkRouter
+
+    client = _worker["client"]
+    router = ChunkRouter(cheap_model=options["cheap_model"]) if options.get("route") else None
+    async_client = UsageCounter(_worker["make_async_client"](), is_async=True)
+    # A report left by an earlier run of this run_dir would be read as this run's
+    prefilter_report = f"{output_file}.prefilter.json"
+    if os.path.exists(prefilter_report):
+        os.remove(prefilter_report)
+    # Worker metrics are shipped back with the result and merged by the parent
+    METRICS.reset()
+    started = time.perf_counter()
+    try:
+        with span("match", stl_file=os.path.basename(stl_file)):
+            event_types = subtitle_to_event_types(
+                stl_file, client, output_file,
+                max_tokens=options["max_tokens"],
+                overlap_cues=options["overlap_cues"],
+                async_client=async_client,
+                concurrency=options["concurrency"],
+                resume=options["resume"],
+                prefilter=options["prefilter"],
+                remove_ads=options["remove_ads"],
+                router=router,
+            )
+        status, error = "ok", None
+    except Exception as e:
+        event_types, status, error = [], "failed", f"{type(e).__name__}: {e}"
+
+    stats = async_client.snapshot()
+    if options["prefilter"] and os.path.exists(prefilter_report):
+        with open(prefilter_report, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        stats["chunks"] = report["chunks"]
+        stats["estimated_tokens"] = report["tokens_total"]
+    else:
+        stats["chunks"] = stats["requests"]
+
+    return {
+        "stl_file": stl_file,
+        "output_file": output_file,
+        "status": status,
+        "error": error,
+        "seconds": round(time.perf_counter() - started, 3),
+        "event_types": sorted(event_types),
+        "metrics": METRICS.snapshot() if METRICS.enabled else None,
+        "routing": router.report() if router is not None else None,
+        **stats,
+    }
+
+
+def summarize(results, wall_seconds):
+    """Throughput summary of a batch run."""
+    ok = [r for r in results if r["status"] == "ok"]
+    totals = {key: sum(r.get(key, 0) for r in results)
+              for key in ("chunks", "requests", "cached", "prompt_tokens", "completion_tokens")}
+    hours = wall_seconds / 3600 if wall_seconds else 0
+    return {
+        "matches": len(results),
+        "failed": len(results) - len(ok),
+        "wall_seconds": round(wall_seconds, 3),
+        "matches_per_hour": round(len(ok) / hours, 1) if hours else 0.0,
+        "chunks_per_second": round(totals["chunks"] / wall_seconds, 2) if wall_seconds else 0.0,
+        **totals,
+    }
+
+
+def run_batch(stl_files, run_dir, workers, max_requests, fake_latency=None, **options):
+    """
+    Processes matches across `workers` processes. The global cap of
+    `max_requests` concurrent LLM requests is split evenly between the
+    workers; there are never more workers than requests allowed, so the
+    cap holds. Outputs go to run_dir/<match>/events.jsonl (see
+    match_dir_names); rerunning the same run_dir resumes from the
+    per-match checkpoints.
+    """
+    if max_requests < 1:
+        raise ValueError(f"max_requests must be at least 1, got {max_requests}")
+    if workers > max_requests:
+        print(f"⚠️ {workers} workers would exceed --max-requests {max_requests}, using {max_requests} workers")
+    workers = max(1, min(workers, len(stl_files), max_requests))
+    options["concurrency"] = max_requests // workers
+    os.makedirs(run_dir, exist_ok=True)
+
+    print(f"🚀 {len(stl_files)} matches, {workers} workers, "
+          f"{options['concurrency']} requests per worker → {run_dir}")
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(fake_latency,)) as pool:
+        futures = {}
+        names = match_dir_names(stl_files)
+        for stl_file in stl_files:
+            match_dir = os.path.join(run_dir, names[stl_file])
+            os.makedirs(match_dir, exist_ok=True)
+            output_file = os.path.join(match_dir, "events.jsonl")
+            futures[pool.submit(process_match, stl_file, output_file, options)] = stl_file
+
+        for future in as_completed(futures):
+            result = future.result()
+            METRICS.merge(result.pop("metrics"))
+            results.append(result)
+            icon = "✅" if result["status"] == "ok" else "❌"
+            print(f"{icon} [{len(results)}/{len(futures)}] {Path(result['stl_file']).name}: "
+                  f"{result['chunks']} chunks in {result['seconds']}s"
+                  + (f" ({result['error']})" if result["error"] else ""))
+
+    summary = summarize(results, time.perf_counter() - started)
+    with open(os.path.join(run_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "matches": sorted(results, key=lambda r: r["stl_file"])}, f, indent=2)
+    if METRICS.enabled:
+        METRICS.export(run_dir)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract match events from a directory of .stl subtitle files.")
+    parser.add_argument("paths", nargs="+", help="directories, .stl files or glob patterns")
+    parser.add_argument("--run-dir", help=f"output directory (default: {DEFAULT_RUNS_DIR}/<timestamp>)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_REQUESTS,
+                        help="global cap on concurrent LLM requests")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS)
+    parser.add_argument("--overlap-cues", type=int, default=DEFAULT_OVERLAP_CUES)
+    parser.add_argument("--no-resume", action="store_true")
+    parser.add_argument("--no-prefilter", action="store_true")
+    parser.add_argument("--keep-ads", action="store_true")
+    parser.add_argument("--route", action="store_true",
+                        help="send sparse chunks to a cheaper deployment (see SubtitleRules/routing.py)")
+    parser.add_argument("--cheap-model", help="deployment for sparse chunks (default: $EXTRACTION_CHEAP_MODEL or gpt-4o-mini)")
+    parser.add_argument("--fake-llm", type=float, metavar="LATENCY",
+                        help="dry run against the fake LLM client with this latency (seconds)")
+    args = parser.parse_args()
+
+    stl_files = find_stl_files(args.paths)
+    if not stl_files:
+        print(f"⚠️ No .stl files found in {args.paths}")
+        return
+
+    run_dir = args.run_dir or os.path.join(DEFAULT_RUNS_DIR, datetime.now().strftime("%Y%m%d_%H%M%S"))
+    summary = run_batch(
+        stl_files, run_dir, args.workers, args.max_requests, fake_latency=args.fake_llm,
+        max_tokens=args.max_tokens, overlap_cues=args.overlap_cues, resume=not args.no_resume,
+        prefilter=not args.no_prefilter, remove_ads=not args.keep_ads,
+        route=args.route, cheap_model=args.cheap_model,
+    )
+
+    print(f"🏁 {summary['matches'] - summary['failed']}/{summary['matches']} matches in "
+          f"{summary['wall_seconds']}s: {summary['matches_per_hour']} matches/hour, "
+          f"{summary['chunks_per_second']} chunks/s, "
+          f"{summary['prompt_tokens']} prompt + {summary['completion_tokens']} completion tokens")
+
+
+if __name__ == "__main__":
+    main()
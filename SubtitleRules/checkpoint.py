@@ -0,0 +1,127 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from SubtitleRules.event_store import append_events, iter_events, write_events
+from SubtitleRules.extraction import EXTRACTION_MODEL, build_extraction_prompt
+
+
+def chunk_hash(chunk, model=EXTRACTION_MODEL):
+    """
+    Content hash of a chunk as sent to `model` (the deployment the chunk
+    was actually routed to). The full prompt is hashed, so editing the
+    prompt template also invalidates finished chunks.
+    """
+    prompt = build_extraction_prompt(getattr(chunk, "text", chunk))
+    return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def checkpoint_path(output_file):
+    """The manifest lives next to the event log: <output>.checkpoint.jsonl"""
+    return f"{output_file}.checkpoint.jsonl"
+
+
+class RunCheckpoint:
+    """
+    Append-only manifest of the chunks whose events were already saved.
+
+    A rerun skips every chunk whose hash is recorded, so a crashed run only
+    processes the remainder and a revised subtitle file only re-sends the
+    chunks whose content changed.
+
+    Entries are tagged with the .stl file they belong to, so several
+    matches can share one event log and manifest. Entries without a tag
+    (written before tagging) still count as done but are never pruned.
+    """
+
+    def __init__(self, manifest_path, stl_file=None):
+        self.manifest_path = manifest_path
+        self.stl_file = Path(stl_file).name if stl_file else None
+        self.entries = []
+        self.completed = {}
+        for entry in iter_events(manifest_path):
+            if not isinstance(entry, dict) or "chunk_hash" not in entry:
+                continue
+            self.entries.append(entry)
+            if entry.get("stl_file") in (None, self.stl_file):
+                self.completed[entry["chunk_hash"]] = entry
+
+    def is_done(self, chunk_hash_value):
+        return chunk_hash_value in self.completed
+
+    def mark_done(self, chunk_hash_value, chunk=None, events=0, merged_into=()):
+        """
+        Records a finished chunk. `merged_into` are the hashes of the chunks
+        whose saved events absorbed duplicates from this one.
+        """
+        entry = {
+            "chunk_hash": chunk_hash_value,
+            "stl_file": self.stl_file,
+            "index": getattr(chunk, "index", None),
+            "start": getattr(chunk, "start", None),
+            "end": getattr(chunk, "end", None),
+            "events": events,
+            "merged_into": sorted(h for h in set(merged_into) if h and h != chunk_hash_value),
+            "completed_at": time.time(),
+        }
+        append_events(self.manifest_path, [entry])
+        self.entries.append(entry)
+        self.completed[chunk_hash_value] = entry
+
+    def _owned(self):
+        """Entries of this checkpoint's .stl file, by hash."""
+        if self.stl_file is None:
+            return {}
+        return {e["chunk_hash"]: e for e in self.entries if e.get("stl_file") == self.stl_file}
+
+    def stale_hashes(self, live_hashes):
+        """
+        Hashes of this file's chunks that are no longer live, plus the live
+        chunks that merged events into one of them (their events would be
+        dropped with it, so they have to be extracted again). Hashes also
+        recorded by an untagged entry are never stale.
+        """
+        live_hashes = set(live_hashes)
+        owned = self._owned()
+        shared = {e["chunk_hash"] for e in self.entries if e.get("stl_file") is None}
+        stale = {h for h in owned if h not in live_hashes and h not in shared}
+
+        dependents = stale
+        while dependents:
+            dependents = {h for h, e in owned.items()
+                          if h not in stale and h not in shared and stale.intersection(e.get("merged_into") or ())}
+            stale |= dependents
+        return stale
+
+    def prune(self, output_file, live_hashes):
+        """
+        Forgets this file's chunks that are no longer part of the subtitle
+        file and drops their events from `output_file`. Only events tagged
+        with this file and such a chunk's hash are dropped: events of other
+        files, untagged and legacy records are left alone. Returns the
+        number of chunks forgotten.
+        """
+        stale = self.stale_hashes(live_hashes)
+        if not stale:
+            return 0
+
+        if os.path.exists(output_file):
+            events = list(iter_events(output_file))
+            kept = [
+                e for e in events
+                if not isinstance(e, dict)
+                or e.get("chunk_hash") not in stale
+                or e.get("stl_file") != self.stl_file
+            ]
+            if len(kept) != len(events):
+                write_events(output_file, kept)
+                print(f"🧹 Dropped {len(events) - len(kept)} stale events from {output_file}")
+
+        self.entries = [e for e in self.entries
+                        if not (e["chunk_hash"] in stale and e.get("stl_file") == self.stl_file)]
+        for h in stale:
+            del self.completed[h]
+        write_events(self.manifest_path, self.entries)
+        print(f"🧹 Forgot {len(stale)} chunks that changed or disappeared")
+        return len(stale)
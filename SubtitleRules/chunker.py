@@ -0,0 +1,98 @@
+import math
+import re
+from typing import Iterable, Iterator, NamedTuple, Tuple
+
+from SubtitleRules.stl_parser import FPS, Cue
+
+# Rough BPE behaviour: words split into ~4 character pieces, digit runs into
+# ~3 digit pieces, every punctuation mark is its own token
+_TOKEN_PIECE_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]")
+
+DEFAULT_MAX_TOKENS = 2000
+DEFAULT_OVERLAP_CUES = 3
+
+
+class Chunk(NamedTuple):
+    """A group of whole cues sent to the LLM in one request."""
+    index: int
+    start: int
+    end: int
+    cues: Tuple[Cue, ...]
+    tokens: int
+    text: str
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local, network-free estimate of the GPT-4o token count of a text.
+    Slightly over-estimates for German compounds, which keeps chunks safe.
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECE_RE.findall(text):
+        if piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        elif piece.isalpha():
+            tokens += math.ceil(len(piece) / 4)
+        else:
+            tokens += 1
+    return tokens
+
+
+def format_chunk_line(cue: Cue, fps: int = FPS) -> str:
+    """One prompt line per cue, prefixed with its start timecode as written in the source."""
+    return f"[{cue.timecodes(fps)[0]}] {cue.text}"
+
+
+def _build_chunk(index, cues, fps):
+    lines = [format_chunk_line(cue, fps) for cue in cues]
+    text = "\n".join(lines)
+    return Chunk(index, cues[0].start, cues[-1].end, tuple(cues), estimate_tokens(text), text)
+
+
+def chunk_cues(cues: Iterable[Cue], max_tokens: int = DEFAULT_MAX_TOKENS,
+               overlap_cues: int = DEFAULT_OVERLAP_CUES, overlap_seconds: float = 0,
+               fps: int = FPS) -> Iterator[Chunk]:
+    """
+    Packs whole cues into chunks of at most `max_tokens` estimated tokens.
+
+    Cues are never split. Each new chunk repeats the last `overlap_cues` cues
+    of the previous one, plus any cues ending within `overlap_seconds` of its
+    end, so events on a chunk border are seen in full at least once.
+    A single cue larger than the budget becomes a chunk of its own.
+    """
+    overlap_frames = int(overlap_seconds * fps)
+    current, current_tokens = [], 0
+    new_cues = 0  # cues in `current` that are not carried-over overlap
+    index = 0
+
+    for cue in cues:
+        # +1 for the newline joining the lines
+        cue_tokens = estimate_tokens(format_chunk_line(cue, fps)) + 1
+
+        if new_cues and current_tokens + cue_tokens > max_tokens:
+            yield _build_chunk(index, current, fps)
+            index += 1
+
+            # Carry the tail of this chunk over into the next one
+            tail = current[-overlap_cues:] if overlap_cues > 0 else []
+            if overlap_frames:
+                cutoff = current[-1].end - overlap_frames
+                by_time = [c for c in current if c.end >= cutoff]
+                if len(by_time) > len(tail):
+                    tail = by_time
+            # Never carry over the whole chunk, otherwise nothing advances
+            tail = tail[-(len(current) - 1):] if len(current) > 1 else []
+            # Drop overlap that would leave no room for the next cue
+            while tail and sum(estimate_tokens(format_chunk_line(c, fps)) + 1 for c in tail) + cue_tokens > max_tokens:
+                tail = tail[1:]
+
+            current = list(tail)
+            current_tokens = sum(estimate_tokens(format_chunk_line(c, fps)) + 1 for c in current)
+            new_cues = 0
+
+        current.append(cue)
+        current_tokens += cue_tokens
+        new_cues += 1
+
+    if new_cues:
+        yield _build_chunk(index, current, fps)
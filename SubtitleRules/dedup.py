@@ -0,0 +1,142 @@
+import bisect
+import re
+import unicodedata
+
+from SubtitleRules.timecode import FPS, parse_timecode
+from SubtitleRules.taxonomy import canonical_id
+
+# Overlapping chunks see the same cues, so the model reports a repeated event at
+# (almost) the same cue timecode; a few seconds of slack cover neighbouring cues
+DEFAULT_TOLERANCE_SECONDS = 5
+
+
+def canonical_event_type(event_type):
+    """
+    Dedup key of an event type: its canonical taxonomy id, or the lowercased,
+    whitespace-collapsed raw type if the taxonomy does not know it.
+    """
+    return canonical_id(event_type) or " ".join(str(event_type or "").lower().replace("_", " ").split())
+
+
+def normalize_person(name):
+    """
+    Case/accent-insensitive surname key: commentary says 'Buckley' for
+    'Derren Buckley', so only the last name token is kept.
+    """
+    if isinstance(name, list):
+        name = name[0] if name else ""
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode()
+    tokens = re.findall(r"[a-z0-9]+", text.lower())
+    return tokens[-1] if tokens else ""
+
+
+def parse_event_frame(timestamp, fps=FPS):
+    """Frame number of an LLM 'timestamp' string, or None if it is not a timecode."""
+    return parse_timecode(timestamp, fps)
+
+
+def chunk_overlap(a, b):
+    """
+    (first, last) frame that the chunks two events were extracted from have
+    in common, or None. Events without a 'chunk_span' ([start, end] frames
+    of their chunk) and events of the same chunk have no overlap.
+    """
+    span_a, span_b = a.get("chunk_span"), b.get("chunk_span")
+    if not span_a or not span_b or list(span_a) == list(span_b):
+        return None
+    first, last = max(span_a[0], span_b[0]), min(span_a[1], span_b[1])
+    return (first, last) if first <= last else None
+
+
+class EventDedupIndex:
+    """
+    In-memory index that merges events reported twice by overlapping chunks.
+
+    Events are keyed by source file, canonical event type and player
+    surname (or team when no player is named). Two events with the same
+    key are the same event only if they were extracted from different,
+    overlapping chunks (their 'chunk_span') and both timecodes lie within
+    `tolerance_seconds` of that overlap and of each other. Two corners of
+    one team a few seconds apart, reported by the same chunk, stay apart.
+    Events without timestamp are merged only when they name a player or
+    team; events naming neither are never merged.
+
+    The first event is kept, missing fields are filled in from the later
+    one and its 'mentions' counter is increased.
+    """
+
+    def __init__(self, tolerance_seconds=DEFAULT_TOLERANCE_SECONDS, fps=FPS):
+        self.tolerance = int(tolerance_seconds * fps)
+        self.fps = fps
+        self._by_key = {}       # key -> (sorted frames, events at those frames)
+        self._untimed = {}      # key -> events without a usable timestamp
+        self._events = []
+        self.duplicates = 0
+
+    def key(self, event):
+        player = normalize_person(event.get("player"))
+        team = "" if player else normalize_person(event.get("team"))
+        return event.get("stl_file") or "", canonical_event_type(event.get("event_type")), player, team
+
+    def add(self, event):
+        """
+        Adds an event. Returns (event, is_new): the stored event the input
+        was merged into, and whether it was new.
+        """
+        key = self.key(event)
+        frame = parse_event_frame(event.get("timestamp"), self.fps)
+
+        existing = self._find(key, frame, event)
+        if existing is not None:
+            self.duplicates += 1
+            for field, value in event.items():
+                if value not in (None, "", []) and existing.get(field) in (None, "", []):
+                    existing[field] = value
+            existing["mentions"] = existing.get("mentions", 1) + 1
+            return existing, False
+
+        stored = dict(event)
+        if frame is None:
+            self._untimed.setdefault(key, []).append(stored)
+        else:
+            frames, events = self._by_key.setdefault(key, ([], []))
+            position = bisect.bisect(frames, frame)
+            frames.insert(position, frame)
+            events.insert(position, stored)
+        self._events.append(stored)
+        return stored, True
+
+    def _find(self, key, frame, event):
+        if frame is None:
+            if not (key[2] or key[3]):
+                # Nothing but the type to go on: two such events may well be different ones
+                return None
+            return next((e for e in self._untimed.get(key, ()) if chunk_overlap(e, event)), None)
+        if key not in self._by_key:
+            return None
+        frames, events = self._by_key[key]
+        position = bisect.bisect_left(frames, frame - self.tolerance)
+        while position < len(frames) and frames[position] <= frame + self.tolerance:
+            overlap = chunk_overlap(events[position], event)
+            if overlap is not None and all(overlap[0] - self.tolerance <= f <= overlap[1] + self.tolerance
+                                           for f in (frames[position], frame)):
+                return events[position]
+            position += 1
+        return None
+
+    def events(self):
+        """Unique events in the order they were first seen."""
+        return list(self._events)
+
+    def __len__(self):
+        return len(self._events)
+
+
+def dedup_events(events, tolerance_seconds=DEFAULT_TOLERANCE_SECONDS):
+    """Merges duplicates in an iterable of events; returns the unique events."""
+    index = EventDedupIndex(tolerance_seconds)
+    for event in events:
+        index.add(event)
+    if index.duplicates:
+        print(f"🧬 Merged {index.duplicates} duplicate events, {len(index)} unique")
+    return index.events()
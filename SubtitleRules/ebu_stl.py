@@ -0,0 +1,152 @@
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from typing import Iterator, NamedTuple
+
+from SubtitleRules.stl_parser import Cue
+from SubtitleRules.timecode import FPS, fields_to_frames
+
+GSI_SIZE = 1024
+TTI_SIZE = 128
+TEXT_FIELD_SIZE = 112
+
+# TTI header: SGN, SN, EBN, CS, TCI (h, m, s, f), TCO (h, m, s, f), VP, JC, CF
+_TTI_HEADER = struct.Struct("<BHBB4B4BBBB")
+EBN_LAST = 0xFF
+EBN_USER_DATA = 0xFE
+
+# Character code table (GSI CCT) → Python codec; "00" is ISO 6937, decoded below
+CODE_TABLES = {"00": None, "01": "iso8859_5", "02": "iso8859_6", "03": "iso8859_7", "04": "iso8859_8"}
+
+# ISO 6937 upper half; 0xC1-0xCF are non-spacing diacritics written before the base letter
+_ISO6937_UPPER = {
+    0xA0: " ", 0xA1: "¡", 0xA2: "¢", 0xA3: "£", 0xA4: "$", 0xA5: "¥", 0xA6: "#", 0xA7: "§",
+    0xA8: "¤", 0xA9: "‘", 0xAA: "“", 0xAB: "«", 0xAC: "←", 0xAD: "↑", 0xAE: "→", 0xAF: "↓",
+    0xB0: "°", 0xB1: "±", 0xB2: "²", 0xB3: "³", 0xB4: "×", 0xB5: "µ", 0xB6: "¶", 0xB7: "·",
+    0xB8: "÷", 0xB9: "’", 0xBA: "”", 0xBB: "»", 0xBC: "¼", 0xBD: "½", 0xBE: "¾", 0xBF: "¿",
+    0xC1: "\u0300", 0xC2: "\u0301", 0xC3: "\u0302", 0xC4: "\u0303", 0xC5: "\u0304", 0xC6: "\u0306",
+    0xC7: "\u0307", 0xC8: "\u0308", 0xCA: "\u030a", 0xCB: "\u0327", 0xCD: "\u030b", 0xCE: "\u0328",
+    0xCF: "\u030c",
+    0xD0: "―", 0xD1: "¹", 0xD2: "®", 0xD3: "©", 0xD4: "™", 0xD5: "♪", 0xD6: "¬", 0xD7: "¦",
+    0xDC: "⅛", 0xDD: "⅜", 0xDE: "⅝", 0xDF: "⅞",
+    0xE0: "Ω", 0xE1: "Æ", 0xE2: "Đ", 0xE3: "ª", 0xE4: "Ħ", 0xE6: "Ĳ", 0xE7: "Ŀ", 0xE8: "Ł",
+    0xE9: "Ø", 0xEA: "Œ", 0xEB: "º", 0xEC: "Þ", 0xED: "Ŧ", 0xEE: "Ŋ", 0xEF: "ŉ",
+    0xF0: "ĸ", 0xF1: "æ", 0xF2: "đ", 0xF3: "ð", 0xF4: "ħ", 0xF5: "ı", 0xF6: "ĳ", 0xF7: "ŀ",
+    0xF8: "ł", 0xF9: "ø", 0xFA: "œ", 0xFB: "ß", 0xFC: "þ", 0xFD: "ŧ", 0xFE: "ŋ", 0xFF: "\u00ad",
+}
+
+
+def _control_table():
+    """Teletext control codes: 0x8A is a line break, every other control code is dropped."""
+    table = {code: None for code in list(range(0x00, 0x20)) + list(range(0x80, 0xA0))}
+    table[0x8A] = "\n"
+    return table
+
+
+_CONTROL_TABLE = _control_table()
+_ISO6937_TABLE = {**_CONTROL_TABLE, **{code: _ISO6937_UPPER.get(code) for code in range(0xA0, 0x100)}}
+_DIACRITIC_RE = re.compile("([\u0300-\u036f])(.?)", re.DOTALL)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def decode_text_field(data, code_table="00"):
+    """
+    Text of one subtitle (the joined TF bytes of its TTI blocks) as a
+    single line. Bytes are decoded in C (latin-1 / ISO 8859 codec plus a
+    translate table); only ISO 6937 diacritics need a regex pass.
+    """
+    raw = bytes(data).split(b"\x8f", 1)[0]   # 0x8F pads the unused rest of the field
+    codec = CODE_TABLES.get(code_table)
+    if codec is None:
+        text = raw.decode("latin-1").translate(_ISO6937_TABLE)
+        # Diacritic before base letter → composed character
+        text = _DIACRITIC_RE.sub(lambda m: unicodedata.normalize("NFC", m.group(2) + m.group(1)), text)
+    else:
+        text = raw.decode(codec, errors="replace").translate(_CONTROL_TABLE)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class GSIHeader(NamedTuple):
+    code_page: str
+    disk_format: str
+    fps: int
+    code_table: str
+    language: str
+    title: str
+    tti_blocks: int
+    subtitles: int
+
+
+def is_ebu_stl(file_path):
+    """True if the file looks like a binary EBU STL file (GSI header + whole TTI blocks)."""
+    size = os.path.getsize(file_path)
+    if size < GSI_SIZE or (size - GSI_SIZE) % TTI_SIZE:
+        return False
+    with open(file_path, "rb") as f:
+        header = f.read(11)
+    return header[3:6] == b"STL" and header[8:11] == b".01"
+
+
+def _ascii(view, start, end):
+    return bytes(view[start:end]).decode("latin-1").strip()
+
+
+def read_gsi(view):
+    """Parses the 1024-byte General Subtitle Information block."""
+    disk_format = _ascii(view, 3, 11)
+    fps = 30 if disk_format == "STL30.01" else 25
+    tti_blocks = _ascii(view, 238, 243)
+    subtitles = _ascii(view, 243, 248)
+    return GSIHeader(
+        code_page=_ascii(view, 0, 3),
+        disk_format=disk_format,
+        fps=fps,
+        code_table=_ascii(view, 12, 14) or "00",
+        language=_ascii(view, 14, 16),
+        title=_ascii(view, 16, 48),
+        tti_blocks=int(tti_blocks) if tti_blocks.isdigit() else 0,
+        subtitles=int(subtitles) if subtitles.isdigit() else 0,
+    )
+
+
+def iter_ebu_cues(file_path, fps: int = FPS) -> Iterator[Cue]:
+    """
+    Lazily yields Cue records from a binary EBU Tech 3264 STL file.
+
+    The file is memory-mapped and TTI headers are unpacked in place with
+    struct.unpack_from; text fields are only sliced as memoryviews until
+    a subtitle is complete. Extension blocks (same subtitle number, EBN
+    0, 1, ... 0xFF) are joined, user-data and comment blocks skipped.
+    Timecodes are converted to frames at `fps`; frame fields beyond the
+    file's frame rate are clamped (see timecode.fields_to_frames).
+    """
+    if os.path.getsize(file_path) < GSI_SIZE:
+        return
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            gsi = read_gsi(view)
+            parts = []
+            for offset in range(GSI_SIZE, len(view) - TTI_SIZE + 1, TTI_SIZE):
+                (_, _, ebn, _, ih, im, is_, if_, oh, om, os_, of_, _, _, comment) = \
+                    _TTI_HEADER.unpack_from(view, offset)
+                if ebn == EBN_USER_DATA or comment:
+                    continue
+
+                parts.append(view[offset + 16:offset + TTI_SIZE])
+                if ebn != EBN_LAST:
+                    continue
+
+                text = decode_text_field(b"".join(parts), gsi.code_table)
+                parts = []
+                if text:
+                    yield Cue(fields_to_frames(ih, im, is_, if_, fps, gsi.fps),
+                              fields_to_frames(oh, om, os_, of_, fps, gsi.fps), text,
+                              f"{ih:02d}:{im:02d}:{is_:02d}:{if_:02d}", f"{oh:02d}:{om:02d}:{os_:02d}:{of_:02d}")
+        finally:
+            # Drop the text slices first: the map cannot close while they are exported
+            parts = []
+            view.release()
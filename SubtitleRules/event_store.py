@@ -0,0 +1,164 @@
+import argparse
+import gzip
+import json
+import os
+import tempfile
+
+
+def _open(path, mode):
+    """Opens plain or gzip-compressed (*.gz) event logs in text mode."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _is_legacy_json(path):
+    """True for the old format: one JSON array rewritten on every save."""
+    if path.endswith(".gz") or not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()
+    return head.startswith(b"[")
+
+
+def _ends_torn(path):
+    """True if a plain log does not end with a newline (interrupted write)."""
+    if path.endswith(".gz") or not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def iter_events(path):
+    """
+    Streams the records of an event log one by one.
+
+    Reads JSONL (optionally .gz) line by line; a torn last line left by a
+    crash is skipped. Legacy JSON array files are still understood.
+    """
+    path = os.fspath(path)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+
+    if _is_legacy_json(path):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                print(f"⚠️ Invalid legacy JSON file: {path}")
+                return
+        yield from (data if isinstance(data, list) else [data])
+        return
+
+    with _open(path, "r") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️ Skipping corrupt line {line_no} in {path}")
+
+
+def read_events(path):
+    return list(iter_events(path))
+
+
+def append_events(path, events):
+    """
+    Appends records to a JSONL event log.
+
+    All records are written with a single write() on an O_APPEND handle and
+    fsync'ed, so a crash never leaves a half-rewritten file behind.
+    Returns the number of records written.
+    """
+    path = os.fspath(path)
+    events = list(events)
+    if not events:
+        return 0
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if _is_legacy_json(path):
+        # Convert the old JSON array once, then keep appending
+        compact(path)
+
+    payload = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+    if _ends_torn(path):
+        # Start on a fresh line so the torn record does not swallow ours
+        payload = "\n" + payload
+    with _open(path, "a") as f:
+        f.write(payload)
+        f.flush()
+        if not path.endswith(".gz"):
+            os.fsync(f.fileno())
+    return len(events)
+
+
+def write_events(path, events):
+    """Atomically replaces the whole log with `events` (temp file + rename)."""
+    path = os.fspath(path)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".events-", suffix=".tmp")
+    os.close(fd)
+    count = 0
+    try:
+        opener = gzip.open(tmp_path, "wt", encoding="utf-8") if path.endswith(".gz") \
+            else open(tmp_path, "w", encoding="utf-8")
+        with opener as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+                count += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def compact(path, output=None, dedupe=False):
+    """
+    Rewrites an event log: drops corrupt lines, merges gzip members,
+    converts legacy JSON arrays and optionally removes exact duplicates.
+    Writing `output` with a .gz suffix compresses the result.
+    """
+    path = os.fspath(path)
+    output = os.fspath(output or path)
+    events = iter_events(path)
+    if dedupe:
+        events = _unique(events)
+    # Materialize first when rewriting in place, the reader still holds the file
+    if output == path:
+        events = list(events)
+    count = write_events(output, events)
+    print(f"✅ Compacted {path} → {output} ({count} records)")
+    return count
+
+
+def _unique(events):
+    seen = set()
+    for event in events:
+        key = json.dumps(event, sort_keys=True, ensure_ascii=False)
+        if key not in seen:
+            seen.add(key)
+            yield event
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance for JSONL event logs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact_cmd = sub.add_parser("compact", help="rewrite a log, dropping corrupt lines")
+    compact_cmd.add_argument("path")
+    compact_cmd.add_argument("--output", help="write to this file instead (use .gz to compress)")
+    compact_cmd.add_argument("--dedupe", action="store_true", help="drop exact duplicate records")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        compact(args.path, args.output, dedupe=args.dedupe)
+
+
+if __name__ == "__main__":
+    main()
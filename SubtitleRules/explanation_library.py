@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+import time
+
+from Instrumentation.metrics import record_usage, span
+from SubtitleRules.json_extract import parse_llm_content
+from SubtitleRules.taxonomy import CANONICAL_TYPES, canonical_id, display_name, to_canonical_id
+
+DEFAULT_LIBRARY_PATH = os.path.join("gpt_outputs", "explanation_library.json")
+EXPLANATION_MODEL = "gpt-4o"
+# Bump when the prompt changes: entries of older versions are not served any more
+PROMPT_VERSION = "v1"
+LANGUAGES = {"en": "English", "de": "German"}
+BATCH_SIZE = 10
+
+# Set EXPLANATION_LIBRARY_WARM=1 to let pipeline runs generate missing explanations (calls the model)
+WARM_ENV = "EXPLANATION_LIBRARY_WARM"
+
+
+def warm_enabled():
+    return os.getenv(WARM_ENV, "").lower() in ("1", "true", "yes")
+
+EXPLANATION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "rule_explanations",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "explanations": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "event_type": {"type": "string"},
+                            "explanation": {"type": "string"},
+                        },
+                        "required": ["event_type", "explanation"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["explanations"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def type_key(event_type):
+    """Library key of an event type: its canonical id, or the normalized raw type."""
+    return canonical_id(event_type) or to_canonical_id(event_type)
+
+
+def build_explanation_prompt(names, language="en"):
+    listed = "\n".join(f"- {name}" for name in names)
+    return (
+        "You are a football commentator explaining match events to beginners. "
+        "For each event type below, explain briefly what it means, the rule behind it, "
+        "and how it affects the match flow — in simple, clear terms. "
+        f"Answer in {LANGUAGES.get(language, language)}. "
+        'Return JSON: {"explanations": [{"event_type": "...", "explanation": "..."}]} '
+        "with one entry per event type, using the names exactly as given.\n\n"
+        f"Event types:\n{listed}"
+    )
+
+
+class ExplanationLibrary:
+    """
+    Persistent rule explanations keyed by (prompt version, language,
+    canonical event type). Lookups are dict hits; the model is only
+    called by warm() for types the library has never seen.
+    """
+
+    def __init__(self, path=DEFAULT_LIBRARY_PATH, language="en",
+                 prompt_version=PROMPT_VERSION, model=EXPLANATION_MODEL):
+        self.path = path
+        self.language = language
+        self.prompt_version = prompt_version
+        self.model = model
+        self.entries = {}
+        self.requests = 0
+        self._dirty = False
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+
+    def _key(self, event_type, language=None):
+        return f"{self.prompt_version}/{language or self.language}/{type_key(event_type)}"
+
+    def get(self, event_type, language=None):
+        """Explanation text for an event type, or None if it was never generated."""
+        entry = self.entries.get(self._key(event_type, language))
+        return entry["text"] if entry else None
+
+    def missing(self, event_types, language=None):
+        """Distinct event types (first spelling seen) without an explanation yet."""
+        missing = {}
+        for event_type in event_types:
+            if event_type and self.get(event_type, language) is None:
+                missing.setdefault(type_key(event_type), event_type)
+        return list(missing.values())
+
+    def warm(self, client, event_types, language=None, temperature=0.5):
+        """
+        Generates explanations for the event types that are not in the library
+        yet, BATCH_SIZE types per request, and saves the library.
+        Returns the number of new entries.
+        """
+        language = language or self.language
+        todo = self.missing(event_types, language)
+        added = 0
+        for start in range(0, len(todo), BATCH_SIZE):
+            batch = todo[start:start + BATCH_SIZE]
+            names = [display_name(canonical_id(t)) if canonical_id(t) else t for t in batch]
+            with span("llm_request", model=self.model, stage="explanation"):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": build_explanation_prompt(names, language)}],
+                    temperature=temperature,
+                    response_format=EXPLANATION_RESPONSE_FORMAT,
+                )
+            record_usage(response, stage="explanation", model=self.model)
+            self.requests += 1
+
+            by_key = {}
+            for record in parse_llm_content(response.choices[0].message.content):
+                for item in record.get("explanations", [record]):
+                    if isinstance(item, dict) and item.get("event_type") and item.get("explanation"):
+                        by_key.setdefault(type_key(item["event_type"]), item["explanation"])
+
+            for event_type, name in zip(batch, names):
+                text = by_key.get(type_key(event_type))
+                if not text:
+                    print(f"⚠️ No explanation returned for '{name}'")
+                    continue
+                self.entries[self._key(event_type, language)] = {
+                    "event_type": name,
+                    "text": text.strip(),
+                    "model": self.model,
+                    "created_at": time.time(),
+                }
+                added += 1
+                self._dirty = True
+
+        if added:
+            print(f"📚 Added {added} explanations to the library ({self.requests} requests)")
+        self.save()
+        return added
+
+    def explain(self, events, language=None):
+        """Sets event['explanation'] from the library; returns the number of events explained."""
+        explained = 0
+        for event in events:
+            if isinstance(event, dict) and event.get("event_type"):
+                text = self.get(event["event_type"], language)
+                if text:
+                    event["explanation"] = text
+                    explained += 1
+        return explained
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def main():
+    from dotenv import load_dotenv
+    from openai import AzureOpenAI
+    from SubtitleRules.llm_cache import LLMCache, CachedChatClient
+
+    parser = argparse.ArgumentParser(description="Warm the rule explanation library for all known event types.")
+    parser.add_argument("--language", default="en", choices=sorted(LANGUAGES))
+    parser.add_argument("--library", default=DEFAULT_LIBRARY_PATH)
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = AzureOpenAI(
+        azure_endpoint=os.getenv("azure_endpoint_gpt4o"),
+        api_key=os.getenv("azure_endpoint_gpt4o_key"),
+        api_version="2025-01-01-preview",
+    )
+    client = CachedChatClient(client, LLMCache())
+
+    library = ExplanationLibrary(args.library, language=args.language)
+    added = library.warm(client, list(CANONICAL_TYPES.values()))
+    print(f"✅ Library {args.library}: {added} new, {len(library.entries)} total entries")
+
+
+if __name__ == "__main__":
+    main()
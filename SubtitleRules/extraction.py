@@ -0,0 +1,121 @@
+import asyncio
+import random
+import time
+
+from Instrumentation.metrics import inc, record_usage, span
+from SubtitleRules.json_extract import EVENT_RESPONSE_FORMAT
+
+EXTRACTION_MODEL = "gpt-4o"
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def build_extraction_prompt(chunk_text):
+    """Prompt used for every event extraction request (sync and async)."""
+    return f"""
+    Extract football match events from the following commentary text.
+    Each line starts with the [HH:MM:SS:FF] timecode of the subtitle cue:
+    {chunk_text}
+
+    Return a list of JSON objects with the following keys:
+    - timestamp (the timecode of the cue the event is mentioned in)
+    - event_type (e.g. goal, foul, penalty, substitution, offside, free kick, yellow/red card, corner, injury)
+    - player (if mentioned)
+    - team (if mentioned)
+    """
+
+
+def is_retryable(exc):
+    """True for 429/5xx responses and connection/timeout errors."""
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # openai.APIConnectionError / APITimeoutError carry no status code
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError", "TimeoutError")
+
+
+def _retry_after(exc):
+    """Seconds requested by the server via Retry-After, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def extract_chunk_async(client, chunk, semaphore, model=EXTRACTION_MODEL,
+                              max_retries=5, base_delay=1.0, router=None, **params):
+    """
+    Sends one chunk to the async chat endpoint, retrying 429/5xx with
+    exponential backoff and jitter. Returns the raw response object.
+    With a `router` (see SubtitleRules/routing.py) the model is picked per
+    chunk and the request's latency and usage are recorded on its route.
+    """
+    route = router.route(chunk) if router is not None else None
+    if route is not None:
+        model = route.model
+    chunk_text = getattr(chunk, "text", chunk)
+    messages = [{"role": "user", "content": build_extraction_prompt(chunk_text)}]
+    params.setdefault("temperature", 0)
+    params.setdefault("response_format", EVENT_RESPONSE_FORMAT)
+
+    for attempt in range(max_retries + 1):
+        try:
+            async with semaphore:
+                started = time.perf_counter()
+                with span("llm_request", model=model, attempt=attempt):
+                    response = await client.chat.completions.create(model=model, messages=messages, **params)
+            record_usage(response, stage="extraction", model=model)
+            if route is not None:
+                router.record(route, time.perf_counter() - started, response)
+            return response
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                inc("llm_failures_total", stage="extraction", error=type(e).__name__)
+                raise
+            inc("llm_retries_total", stage="extraction", status=getattr(e, "status_code", None), error=type(e).__name__)
+            delay = _retry_after(e) or base_delay * (2 ** attempt)
+            delay += random.uniform(0, base_delay)
+            print(f"⚠️ Chunk {getattr(chunk, 'index', '?')} failed ({e}), retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+
+async def extract_chunks_async(client, chunks, concurrency=8, on_result=None, **kwargs):
+    """
+    Extracts events from all chunks with at most `concurrency` requests in
+    flight. Responses are returned in the same order as `chunks`.
+
+    `on_result(position, response)` is called in chunk order as soon as a
+    chunk and all chunks before it have completed, so results can be saved
+    while the rest are still in flight.
+    """
+    chunks = list(chunks)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = [None] * len(chunks)
+    ready = {}
+    next_position = 0
+
+    async def run(position, chunk):
+        nonlocal next_position
+        results[position] = await extract_chunk_async(client, chunk, semaphore, **kwargs)
+        if on_result is not None:
+            ready[position] = results[position]
+            while next_position in ready:
+                on_result(next_position, ready.pop(next_position))
+                next_position += 1
+
+    await asyncio.gather(*(run(position, chunk) for position, chunk in enumerate(chunks)))
+    return results
+
+
+def run_async_extraction(client, chunks, concurrency=8, on_result=None, **kwargs):
+    """Synchronous entry point: runs extract_chunks_async on a fresh event loop."""
+    started = time.perf_counter()
+    with span("extraction", concurrency=concurrency):
+        responses = asyncio.run(
+            extract_chunks_async(client, chunks, concurrency=concurrency, on_result=on_result, **kwargs)
+        )
+    print(f"✅ Extracted {len(responses)} chunks in {time.perf_counter() - started:.1f}s "
+          f"(concurrency={concurrency})")
+    return responses
@@ -0,0 +1,93 @@
+import asyncio
+import itertools
+import json
+import random
+import time
+from types import SimpleNamespace
+
+# Canned answer in the shape GPT-4o returns for a chunk with match action
+DEFAULT_RESPONSE = json.dumps([
+    {"timestamp": "00:00:00:00", "event_type": "foul", "player": "", "team": ""}
+])
+
+
+class FakeStatusError(Exception):
+    """Stand-in for openai.APIStatusError (carries a status_code)."""
+
+    def __init__(self, status_code, message="fake API error"):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+
+
+def make_response(content, prompt_tokens=0, completion_tokens=0, model="gpt-4o"):
+    """Builds an object shaped like openai's ChatCompletion."""
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ),
+    )
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, messages, **params):
+        return self._owner._complete(model, messages, params)
+
+
+class _AsyncCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def create(self, model, messages, **params):
+        return await self._owner._complete_async(model, messages, params)
+
+
+class FakeChatClient:
+    """
+    Offline test double for AzureOpenAI: `client.chat.completions.create`
+    sleeps for `latency` seconds, fails with a retryable 429/503 at
+    `error_rate`, and answers from `responses` in round-robin order.
+    """
+
+    def __init__(self, responses=None, latency=0.0, error_rate=0.0, seed=None):
+        self._responses = itertools.cycle(responses or [DEFAULT_RESPONSE])
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def _next(self, model, messages):
+        self.calls += 1
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            raise FakeStatusError(self._random.choice([429, 503]))
+        prompt = " ".join(m.get("content", "") for m in messages)
+        content = next(self._responses)
+        # Close enough to real usage numbers for benchmarking
+        return make_response(content, len(prompt) // 4, len(content) // 4, model)
+
+    def _complete(self, model, messages, params):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._next(model, messages)
+
+
+class FakeAsyncChatClient(FakeChatClient):
+    """Async variant of FakeChatClient, mirroring AsyncAzureOpenAI."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(self))
+
+    async def _complete_async(self, model, messages, params):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._next(model, messages)
@@ -0,0 +1,163 @@
+import json
+from typing import Iterator
+
+_decoder = json.JSONDecoder()
+
+# Structured output for the extraction requests: the model must answer with
+# {"events": [...]}, so most responses parse directly without any repair
+EVENT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "match_events",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "events": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "timestamp": {"type": "string"},
+                            "event_type": {"type": "string"},
+                            "player": {"type": "string"},
+                            "team": {"type": "string"},
+                        },
+                        "required": ["timestamp", "event_type", "player", "team"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["events"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _bracket_ends(text, start):
+    """
+    Index just past the closing bracket for text[start] and for every
+    bracket opened inside it, skipping over JSON strings; -1 for brackets
+    that never close. One pass, so each failed opener is scanned once.
+    """
+    ends = {}
+    stack = []
+    in_string = escaped = False
+    for pos in range(start, len(text)):
+        char = text[pos]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            stack.append(pos)
+        elif char in "]}":
+            ends[stack.pop()] = pos + 1
+            if not stack:
+                return ends
+    for opener in stack:
+        ends[opener] = -1
+    return ends
+
+
+def iter_json_values(text: str) -> Iterator:
+    """
+    Yields every top-level JSON array/object embedded in free text
+    (markdown fences, explanations around it, several blocks in a row).
+
+    Each candidate is bracket-balanced first and then decoded once with
+    JSONDecoder.raw_decode, so well-formed text is scanned in linear time.
+    If a balanced block is not valid JSON, or a truncated one never
+    closes, scanning resumes inside it; the bracket ends found on the way
+    are kept, so no part of the text is bracket-scanned twice.
+    """
+    ends = {}
+    pos = 0
+    length = len(text)
+    while pos < length:
+        next_obj = text.find("{", pos)
+        next_arr = text.find("[", pos)
+        candidates = [p for p in (next_obj, next_arr) if p != -1]
+        if not candidates:
+            return
+        start = min(candidates)
+
+        end = ends.get(start)
+        if end is None:
+            # Openers inside a string of an earlier scan are not cached
+            ends.update(_bracket_ends(text, start))
+            end = ends[start]
+        if end != -1:
+            try:
+                # Decode the segment only: error messages on the full text
+                # would count newlines from the start on every failure
+                segment = text[start:end]
+                value, value_end = _decoder.raw_decode(segment)
+                if value_end == len(segment):
+                    yield value
+                    pos = end
+                    continue
+            except json.JSONDecodeError:
+                pass
+        pos = start + 1
+
+
+def _events_in(value):
+    if isinstance(value, list):
+        for item in value:
+            yield from _events_in(item)
+    elif isinstance(value, dict):
+        if "event_type" in value:
+            yield value
+        elif isinstance(value.get("events"), list):
+            yield from _events_in(value["events"])
+
+
+def extract_json_events(text: str):
+    """All event dicts found anywhere in `text`."""
+    return [event for value in iter_json_values(text) for event in _events_in(value)]
+
+
+def parse_llm_content(content: str):
+    """
+    Turns an extraction response into a list of records.
+
+    Structured-output answers ({"events": [...]}) and plain JSON parse
+    directly; anything else goes through the scanner. If nothing usable
+    is found the text is kept as a single {"raw_text": ...} record.
+    """
+    content = (content or "").strip()
+    try:
+        value = json.loads(content)
+    except json.JSONDecodeError:
+        events = extract_json_events(content)
+    else:
+        if isinstance(value, dict) and "event_type" not in value and "events" not in value:
+            return [value]
+        events = list(_events_in(value))
+        if not events and isinstance(value, list):
+            return [item for item in value if isinstance(item, dict)]
+        return events
+
+    return events if events else [{"raw_text": content}]
+
+
+def events_from_record(record):
+    """
+    Events stored in one event-log record: the record itself for structured
+    events, or every event embedded in a legacy {"raw_text": ...} record.
+    """
+    if not isinstance(record, dict):
+        return []
+    if "event_type" in record:
+        return [record]
+    raw_text = record.get("raw_text")
+    if isinstance(raw_text, str):
+        return extract_json_events(raw_text)
+    return list(_events_in(record))
@@ -0,0 +1,314 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+if __name__ == "__main__":
+    # Run as a script (python SubtitleRules/live_tail.py): make the project packages importable.
+    # Imported as a library, the caller's path already resolves them.
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from Instrumentation.metrics import inc, observe, record_usage, span
+from SubtitleRules.chunker import chunk_cues
+from SubtitleRules.dedup import EventDedupIndex
+from SubtitleRules.event_store import append_events
+from SubtitleRules.extraction import EXTRACTION_MODEL, build_extraction_prompt
+from SubtitleRules.json_extract import EVENT_RESPONSE_FORMAT, parse_llm_content
+from SubtitleRules.relevance import DEFAULT_MIN_SCORE, score_text
+from SubtitleRules.stl_parser import CUE_LINE_RE, CueAssembler
+from SubtitleRules.timecode import FPS, SOURCE_RATES, CueIndex, detect_fps, frames_to_timecode, normalize_timecode
+from SubtitleRules.taxonomy import canonical_id
+
+DEFAULT_POLL_INTERVAL = 0.25
+DEFAULT_IDLE_FLUSH = 1.0     # seconds without new lines before the pending cue counts as complete
+DEFAULT_TRIGGER_SCORE = 4    # new action text that triggers an extraction right away
+DEFAULT_MAX_WAIT = 8.0       # seconds a cue may wait for its extraction at most
+DEFAULT_CONTEXT_CUES = 6     # already processed cues repeated as context
+DEFAULT_MAX_TOKENS = 1200
+# Frame rate detection of a feed: frame fields to collect at most, and how many
+# fields >= 25 settle it early (a 30 fps feed shows one every ~6 timecodes)
+DETECT_TIMECODES = 40
+DETECT_HIGH_FIELDS = 2
+
+
+class DetectingCueAssembler:
+    """
+    CueAssembler for a feed whose frame rate is not known up front.
+
+    Lines are held back until DETECT_HIGH_FIELDS frame fields >= 25 have
+    been read (only 30 fps feeds have them) or DETECT_TIMECODES fields in
+    all; the rate is then fixed with timecode.detect_fps() and the held
+    lines are replayed. With `source_fps` given, lines pass straight through.
+    """
+
+    def __init__(self, fps=FPS, source_fps=None):
+        self.fps = fps
+        self.source_fps = source_fps
+        self._assembler = CueAssembler(fps, source_fps) if source_fps else None
+        self._held = []
+        self._frame_fields = []
+
+    def feed(self, line):
+        """Cues completed by `line` (several when the held lines are replayed)."""
+        if self._assembler is None:
+            self._held.append(line)
+            match = CUE_LINE_RE.match(line.lstrip("\ufeff").strip())
+            if match:
+                self._frame_fields += [int(match.group(4)), int(match.group(8))]
+            high = sum(field >= SOURCE_RATES[0] for field in self._frame_fields)
+            if high >= DETECT_HIGH_FIELDS or len(self._frame_fields) >= DETECT_TIMECODES:
+                return self._replay()
+            return []
+        cue = self._assembler.feed(line)
+        return [] if cue is None else [cue]
+
+    def _replay(self):
+        self.source_fps = detect_fps(self._frame_fields)
+        print(f"🎞️ Feed timecodes counted at {self.source_fps} fps")
+        self._assembler = CueAssembler(self.fps, self.source_fps)
+        held, self._held, self._frame_fields = self._held, [], []
+        return [cue for cue in map(self._assembler.feed, held) if cue is not None]
+
+    def flush(self):
+        """The pending cue, once the frame rate is known (held lines wait for more timecodes)."""
+        if self._assembler is None:
+            return []
+        cue = self._assembler.flush()
+        return [] if cue is None else [cue]
+
+
+def follow_stl_cues(path, poll_interval=DEFAULT_POLL_INTERVAL, idle_flush=DEFAULT_IDLE_FLUSH,
+                    from_start=True, fps=FPS, should_stop=None, source_fps=None):
+    """
+    Tails a growing text .stl file by polling its size and yields a list
+    of the cues completed since the last poll (often empty, so callers can
+    check deadlines). Only appended bytes are read; a partial last line is
+    kept until its newline arrives. A truncated or replaced file is read
+    again from the start. Unless `source_fps` is given, the frame rate is
+    detected from the first timecodes (see DetectingCueAssembler).
+    """
+    offset = None
+    inode = None
+    partial = b""
+    assembler = DetectingCueAssembler(fps, source_fps)
+    last_data = time.monotonic()
+
+    while should_stop is None or not should_stop():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            time.sleep(poll_interval)
+            yield []
+            continue
+
+        if offset is None or stat.st_ino != inode or stat.st_size < offset:
+            # First open, rotation or truncation
+            offset = 0 if (from_start or offset is not None) else stat.st_size
+            inode = stat.st_ino
+            partial = b""
+            assembler = DetectingCueAssembler(fps, source_fps)
+
+        cues = []
+        if stat.st_size > offset:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(stat.st_size - offset)
+            offset += len(data)
+            last_data = time.monotonic()
+
+            lines = (partial + data).split(b"\n")
+            partial = lines.pop()
+            for line in lines:
+                cues += assembler.feed(line.decode("utf-8", errors="replace"))
+        elif time.monotonic() - last_data >= idle_flush:
+            # Nothing new for a while: the last cue is not going to grow any more
+            if partial:
+                cues += assembler.feed(partial.decode("utf-8", errors="replace"))
+                partial = b""
+            cues += assembler.flush()
+
+        yield cues
+        if not cues:
+            time.sleep(poll_interval)
+
+
+class LiveExtractor:
+    """
+    Sliding-window extraction for a live subtitle feed.
+
+    New cues collect in a pending window. An extraction is triggered as
+    soon as their action score reaches `trigger_score`, or when the oldest
+    pending cue has waited `max_wait` seconds (windows without any action
+    text are then dropped without a request). Each request carries the
+    last `context_cues` processed cues for context and runs on a worker
+    thread, so tailing continues meanwhile; results are emitted in order.
+
+    Events are snapped to the start timecode of the cue they were reported
+    at, merged by an EventDedupIndex, appended to `output_file` and passed
+    to `on_event`.
+    """
+
+    def __init__(self, client, on_event=None, output_file=None, model=EXTRACTION_MODEL,
+                 trigger_score=DEFAULT_TRIGGER_SCORE, max_wait=DEFAULT_MAX_WAIT,
+                 context_cues=DEFAULT_CONTEXT_CUES, max_tokens=DEFAULT_MAX_TOKENS, fps=FPS):
+        self.client = client
+        self.on_event = on_event
+        self.output_file = output_file
+        self.model = model
+        self.trigger_score = trigger_score
+        self.max_wait = max_wait
+        self.max_tokens = max_tokens
+        self.fps = fps
+        self.context = deque(maxlen=context_cues)
+        self.pending = []
+        self.pending_score = 0
+        self.pending_since = None
+        self.dedup = EventDedupIndex(fps=fps)
+        self.stats = {"cues": 0, "requests": 0, "skipped_windows": 0, "events": 0}
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        self._in_flight = deque()
+
+    def add(self, cues):
+        """Adds newly read cues; triggers extractions and emits finished ones."""
+        now = time.monotonic()
+        for cue in cues:
+            if not self.pending:
+                self.pending_since = now
+            self.pending.append((cue, now))
+            self.pending_score += score_text(cue.text)
+            self.stats["cues"] += 1
+
+        if self.pending and (self.pending_score >= self.trigger_score
+                             or now - self.pending_since >= self.max_wait):
+            self._dispatch()
+        self._emit_finished()
+
+    def _dispatch(self):
+        window = list(self.context) + [cue for cue, _ in self.pending]
+        read_at = self.pending[0][1]
+        if self.pending_score < DEFAULT_MIN_SCORE:
+            self.stats["skipped_windows"] += 1
+            inc("live_windows_skipped_total")
+        else:
+            for chunk in chunk_cues(window, max_tokens=self.max_tokens, overlap_cues=0):
+                self._in_flight.append((self._executor.submit(self._extract, chunk), chunk, read_at))
+                self.stats["requests"] += 1
+
+        self.context.extend(cue for cue, _ in self.pending)
+        self.pending = []
+        self.pending_score = 0
+        self.pending_since = None
+
+    def _extract(self, chunk):
+        with span("llm_request", model=self.model, stage="live"):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": build_extraction_prompt(chunk.text)}],
+                temperature=0,
+                response_format=EVENT_RESPONSE_FORMAT,
+            )
+        record_usage(response, stage="live", model=self.model)
+        return response
+
+    def _emit_finished(self, wait=False):
+        while self._in_flight and (wait or self._in_flight[0][0].done()):
+            future, chunk, read_at = self._in_flight.popleft()
+            try:
+                response = future.result()
+            except Exception as e:
+                print(f"⚠️ Live extraction failed for {frames_to_timecode(chunk.start, self.fps)}: {e}")
+                inc("llm_failures_total", stage="live", error=type(e).__name__)
+                continue
+            self._emit(parse_llm_content(response.choices[0].message.content), chunk, read_at)
+
+    def _emit(self, records, chunk, read_at):
+        # Snap the model's timestamps to the start timecode of the matching cue
+        events = [event for event in records if "event_type" in event]
+        index = CueIndex(chunk.cues, self.fps)
+        positions = index.locate([event.get("timestamp") for event in events]).tolist()
+        # Timecodes quoted exactly from the prompt find their cue even when the feed is not at self.fps
+        by_timecode = {cue.timecodes(self.fps)[0]: i for i, cue in enumerate(index.cues)}
+        positions = [by_timecode.get(normalize_timecode(event.get("timestamp")), position)
+                     for event, position in zip(events, positions)]
+
+        new_events = []
+        for event, position in zip(events, positions):
+            cue = index.cues[position] if position >= 0 else index.cues[-1]
+            event["timestamp"], event["cue_end"] = cue.timecodes(self.fps)
+            event["chunk_span"] = [chunk.start, chunk.end]
+            event["canonical_type"] = canonical_id(event["event_type"])
+            stored, is_new = self.dedup.add(event)
+            if is_new:
+                new_events.append(stored)
+
+        if not new_events:
+            return
+        latency = time.monotonic() - read_at
+        observe("live_event_latency_seconds", latency)
+        inc("live_events_total", len(new_events))
+        self.stats["events"] += len(new_events)
+        if self.output_file:
+            append_events(self.output_file, new_events)
+        for event in new_events:
+            if self.on_event is not None:
+                self.on_event(event)
+
+    def close(self):
+        """Extracts whatever is still pending and waits for all requests."""
+        if self.pending:
+            self._dispatch()
+        self._emit_finished(wait=True)
+        self._executor.shutdown()
+
+
+def run_live(stl_file, client, output_file=None, on_event=None, should_stop=None, source_fps=None, **kwargs):
+    """Follows `stl_file` until should_stop() is true (or Ctrl+C) and extracts events live."""
+    extractor = LiveExtractor(client, on_event=on_event, output_file=output_file, **kwargs)
+    print(f"📡 Following {stl_file} ...")
+    try:
+        for cues in follow_stl_cues(stl_file, should_stop=should_stop, source_fps=source_fps):
+            extractor.add(cues)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        extractor.close()
+    print(f"🏁 Live run: {extractor.stats}")
+    return extractor.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow a growing .stl file and extract match events live.")
+    parser.add_argument("stl_file")
+    parser.add_argument("--output", default=os.path.join("gpt_outputs", "live_events.jsonl"))
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT)
+    parser.add_argument("--trigger-score", type=int, default=DEFAULT_TRIGGER_SCORE)
+    parser.add_argument("--source-fps", type=int, choices=[25, 30], help="frame rate of the feed's timecodes (default: detected from the first timecodes)")
+    parser.add_argument("--fake-llm", type=float, metavar="LATENCY",
+                        help="use the fake LLM client with this latency (seconds)")
+    args = parser.parse_args()
+
+    if args.fake_llm is not None:
+        from SubtitleRules.fake_llm import FakeChatClient
+        client = FakeChatClient(latency=args.fake_llm)
+    else:
+        from dotenv import load_dotenv
+        from openai import AzureOpenAI
+        load_dotenv()
+        client = AzureOpenAI(
+            azure_endpoint=os.getenv("azure_endpoint_gpt4o"),
+            api_key=os.getenv("azure_endpoint_gpt4o_key"),
+            api_version="2025-01-01-preview",
+        )
+
+    def show(event):
+        print(f"⚽ {event['timestamp']} {event['event_type']} {event.get('player') or ''} {event.get('team') or ''}")
+
+    run_live(args.stl_file, client, output_file=args.output, on_event=show,
+             max_wait=args.max_wait, trigger_score=args.trigger_score, source_fps=args.source_fps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from types import SimpleNamespace
+
+DEFAULT_CACHE_PATH = os.path.join("gpt_outputs", "llm_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 50000
+
+# Set LLM_CACHE_DISABLED=1 to bypass the cache without touching code
+CACHE_DISABLED_ENV = "LLM_CACHE_DISABLED"
+
+
+def cache_key(model, messages, **params):
+    """Content address of a chat request: sha256 of model + messages + parameters."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent SQLite cache of chat completions with LRU eviction.
+
+    Entries are keyed by cache_key(); the least recently used rows are
+    dropped once more than `max_entries` are stored.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, enabled=None):
+        if enabled is None:
+            enabled = os.getenv(CACHE_DISABLED_ENV, "").lower() not in ("1", "true", "yes")
+        self.enabled = enabled
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+
+        if self.enabled:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # WAL lets several worker processes share one cache file
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    content TEXT,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    created_at REAL,
+                    last_used REAL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON completions(last_used)")
+            self._conn.commit()
+
+    def get(self, key):
+        """Returns the cached row as a dict, or None on a miss."""
+        if not self.enabled:
+            return None
+        row = self._conn.execute(
+            "SELECT model, content, prompt_tokens, completion_tokens FROM completions WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return {"model": row[0], "content": row[1], "prompt_tokens": row[2], "completion_tokens": row[3]}
+
+    def put(self, key, model, content, prompt_tokens=0, completion_tokens=0):
+        if not self.enabled:
+            return
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, model, content, prompt_tokens, completion_tokens, now, now),
+        )
+        self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN "
+                "(SELECT key FROM completions ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        if self.enabled:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _response_from_cache(entry):
+    """Rebuilds an object shaped like openai's ChatCompletion from a cache row."""
+    return SimpleNamespace(
+        model=entry["model"],
+        cached=True,
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=entry["content"]))],
+        usage=SimpleNamespace(
+            prompt_tokens=entry["prompt_tokens"],
+            completion_tokens=entry["completion_tokens"],
+            total_tokens=entry["prompt_tokens"] + entry["completion_tokens"],
+        ),
+    )
+
+
+def _store_response(cache, key, model, response):
+    usage = getattr(response, "usage", None)
+    cache.put(
+        key, model, response.choices[0].message.content,
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+    )
+
+
+class CachedChatClient:
+    """
+    Wraps an AzureOpenAI client so `client.chat.completions.create(...)`
+    is answered from the LLMCache when the same request was made before.
+    Every other attribute is passed through to the wrapped client.
+    """
+
+    def __init__(self, client, cache=None):
+        self._client = client
+        self.cache = cache if cache is not None else LLMCache()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _create(self, model, messages, **params):
+        if not self.cache.enabled or params.get("stream"):
+            return self._client.chat.completions.create(model=model, messages=messages, **params)
+
+        key = cache_key(model, messages, **params)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return _response_from_cache(entry)
+
+        response = self._client.chat.completions.create(model=model, messages=messages, **params)
+        _store_response(self.cache, key, model, response)
+        return response
+
+
+class CachedAsyncChatClient(CachedChatClient):
+    """Async variant of CachedChatClient for AsyncAzureOpenAI."""
+
+    async def _create(self, model, messages, **params):
+        if not self.cache.enabled or params.get("stream"):
+            return await self._client.chat.completions.create(model=model, messages=messages, **params)
+
+        key = cache_key(model, messages, **params)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return _response_from_cache(entry)
+
+        response = await self._client.chat.completions.create(model=model, messages=messages, **params)
+        _store_response(self.cache, key, model, response)
+        return response
@@ -0,0 +1,155 @@
+import itertools
+import re
+
+from GCP.sports_terms import football_terms
+
+# German commentary vocabulary for the terms in GCP/sports_terms.py
+GERMAN_TERMS = {
+    "Offside": ["abseits"],
+    "Penalty": ["elfmeter", "strafstoß", "elfer"],
+    "Corner Kick": ["ecke", "eckball", "eckstoß"],
+    "Free Kick": ["freistoß"],
+    "Throw-In": ["einwurf"],
+    "Goal Kick": ["abstoß"],
+    "Offside Trap": ["abseitsfalle"],
+    "Yellow Card": ["gelbe karte", "gelb-rot", "gelbrot", "verwarnung"],
+    "Red Card": ["rote karte", "platzverweis"],
+    "Foul": ["foul", "foulspiel"],
+    "Handball": ["handspiel"],
+    "Goal Line": ["torlinie"],
+    "Penalty Area": ["strafraum", "sechzehner"],
+    "Goalkeeper": ["torwart", "torhüter", "keeper"],
+    "Defender": ["verteidiger", "abwehr"],
+    "Midfielder": ["mittelfeld"],
+    "Forward": ["stürmer", "angreifer"],
+    "Kick-off": ["anstoß", "anpfiff"],
+    "Extra Time": ["verlängerung"],
+    "Injury Time": ["nachspielzeit"],
+    "Substitution": ["wechsel", "eingewechselt", "ausgewechselt", "einwechslung", "auswechslung"],
+    "Dribble": ["dribbling", "dribbelt"],
+    "Tackle": ["zweikampf", "grätsche", "tackling"],
+    "Advantage Rule": ["vorteil"],
+    "Wall": ["mauer"],
+    "Hat-Trick": ["hattrick", "dreierpack"],
+    "Set Piece": ["standard", "standardsituation"],
+    "Man Marking": ["manndeckung"],
+    "Zonal Marking": ["raumdeckung"],
+    "Bicycle Kick": ["fallrückzieher"],
+    "Chip Shot": ["lupfer", "heber"],
+    "Cross": ["flanke"],
+    "Through Ball": ["steilpass"],
+    "One-Two": ["doppelpass"],
+    "Direct Free Kick": ["direkter freistoß"],
+    "Indirect Free Kick": ["indirekter freistoß"],
+}
+
+# Words that almost always mean something happened on the pitch
+STRONG_KEYWORDS = [
+    "tor", "treffer", "elfmeter", "gelbe karte", "rote karte", "foul", "gefoult", "abseits",
+    "ecke", "freistoß", "wechsel", "videobeweis", "ausgleich", "führung",
+    "platzverweis", "verletzt", "verletzung",
+    # Compounds of the stems above that commentary uses for the action itself
+    "eigentor", "kopfballtor", "freistoßtor", "abseitstor", "führungstor", "führungstreffer",
+    "anschlusstreffer", "ausgleichstreffer", "torschütze", "torschuss", "abseitsposition",
+]
+
+# Match play vocabulary that on its own is weaker evidence
+WEAK_KEYWORDS = [
+    "schuss", "schießt", "chance", "torchance", "pfosten", "latte", "parade", "pariert", "flanke",
+    "schiedsrichter", "pfeift", "pfiff", "halbzeit", "abpfiff", "konter", "kopfball",
+    "pass", "angriff", "spielminute",
+]
+
+# German noun and adjective endings a term may carry (Ecken, Tores, gelben Karten);
+# anything longer must be listed as a term of its own
+INFLECTIONS = ("e", "en", "em", "er", "es", "n", "s", "ern", "ns")
+_INFLECTION_RE = "(?:" + "|".join(sorted(INFLECTIONS, key=len, reverse=True)) + ")?"
+
+STRONG_WEIGHT = 2
+WEAK_WEIGHT = 1
+
+DEFAULT_MIN_SCORE = 3     # below: chunk is skipped
+DEFAULT_HIGH_DENSITY = 1.0  # weighted hits per 100 tokens for "high"
+
+
+def build_lexicon(terms=football_terms):
+    """Keyword → weight, seeded from the sports terms plus commentary keywords."""
+    lexicon = {}
+    for term in terms:
+        lexicon[term.lower()] = STRONG_WEIGHT
+        for german in GERMAN_TERMS.get(term, []):
+            lexicon[german] = STRONG_WEIGHT
+    for word in WEAK_KEYWORDS:
+        lexicon.setdefault(word, WEAK_WEIGHT)
+    for word in STRONG_KEYWORDS:
+        lexicon[word] = STRONG_WEIGHT
+    return lexicon
+
+
+def compile_lexicon(lexicon):
+    """
+    One alternation regex for the whole lexicon. Terms match whole words;
+    each word may only carry one of the INFLECTIONS, so 'tor' hits Tor and
+    Tore but not Toronto, and 'pass' does not hit passiert.
+    """
+    alternatives = sorted(lexicon, key=len, reverse=True)
+    terms = (r"\s+".join(re.escape(word) + _INFLECTION_RE for word in term.split()) for term in alternatives)
+    pattern = r"\b(" + "|".join(terms) + r")\b"
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def lexicon_term(text, lexicon):
+    """The lexicon term a match of compile_lexicon() stands for ('gelben Karten' → 'gelbe karte')."""
+    words = text.lower().split()
+    candidates = ([word] + [word[:-len(ending)] for ending in INFLECTIONS if word.endswith(ending)]
+                  for word in words)
+    for stems in itertools.product(*candidates):
+        term = " ".join(stems)
+        if term in lexicon:
+            return term
+    return None
+
+
+LEXICON = build_lexicon()
+_LEXICON_RE = compile_lexicon(LEXICON)
+
+
+def score_text(text, lexicon=LEXICON, pattern=_LEXICON_RE):
+    """Weighted number of lexicon hits in `text`."""
+    return sum(lexicon.get(lexicon_term(match.group(1), lexicon), 0) for match in pattern.finditer(text))
+
+
+def classify_chunk(chunk, min_score=DEFAULT_MIN_SCORE, high_density=DEFAULT_HIGH_DENSITY):
+    """
+    Returns (label, score) for a Chunk: "skip" if it has no match action,
+    "low" for sparse action and "high" for dense action.
+    """
+    score = score_text(chunk.text)
+    if score < min_score:
+        return "skip", score
+    density = 100 * score / max(chunk.tokens, 1)
+    return ("high" if density >= high_density else "low"), score
+
+
+def filter_chunks(chunks, min_score=DEFAULT_MIN_SCORE):
+    """
+    Drops chunks without match action before they reach the LLM.
+    Returns (kept_chunks, report) where the report lists skipped chunks
+    and the tokens saved.
+    """
+    kept = []
+    report = {"chunks": 0, "skipped": [], "tokens_total": 0, "tokens_saved": 0}
+
+    for chunk in chunks:
+        label, score = classify_chunk(chunk, min_score=min_score)
+        report["chunks"] += 1
+        report["tokens_total"] += chunk.tokens
+        if label == "skip":
+            report["skipped"].append({"index": chunk.index, "start": chunk.start, "score": score})
+            report["tokens_saved"] += chunk.tokens
+        else:
+            kept.append(chunk)
+
+    print(f"🔎 Pre-filter: skipped {len(report['skipped'])}/{report['chunks']} chunks, "
+          f"saved ~{report['tokens_saved']} of {report['tokens_total']} tokens")
+    return kept, report
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+if __name__ == "__main__":
+    # Run as a script (python SubtitleRules/routing.py): make the project packages importable.
+    # Imported as a library, the caller's path already resolves them.
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from Instrumentation.metrics import inc, observe
+from SubtitleRules.extraction import EXTRACTION_MODEL
+from SubtitleRules.relevance import DEFAULT_HIGH_DENSITY, compile_lexicon, score_text
+from SubtitleRules.timecode import FPS
+
+# Deployment for sparse chunks; override with EXTRACTION_CHEAP_MODEL=<deployment>
+CHEAP_MODEL_ENV = "EXTRACTION_CHEAP_MODEL"
+DEFAULT_CHEAP_MODEL = "gpt-4o-mini"
+
+# USD per 1M (prompt, completion) tokens, for the per-route spend estimate
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+DEFAULT_DENSE_CUE_RATE = 30     # cues per minute: fast back-and-forth commentary
+DEFAULT_DENSE_PLAYERS = 0.5     # player mentions per 100 tokens
+DEFAULT_DENSE_SCORE = 2.5       # sum of the three features, each scaled to its threshold
+
+# Goals, penalties and dismissals always get the large model, however quiet the rest of the chunk is
+DENSE_KEYWORDS = ["tor für", "ausgleich", "anschlusstreffer", "führungstreffer", "elfmeter", "strafstoß",
+                  "rote karte", "gelb-rot", "platzverweis", "videobeweis"]
+_DENSE_RE = compile_lexicon({keyword: 1 for keyword in DENSE_KEYWORDS})
+
+# Fallback when no roster is known: "Firstname Lastname" pairs inside a sentence
+_NAME_PAIR_RE = re.compile(r"(?<![.!?:]\s)(?<!^)\b([A-ZÄÖÜ][a-zäöüßéèáàíóúñçćčš]+) ([A-ZÄÖÜ][a-zäöüßéèáàíóúñçćčš]{2,})\b")
+
+
+class Route(NamedTuple):
+    """Routing decision for one chunk."""
+    name: str
+    model: str
+    complexity: float
+    density: float
+    cue_rate: float
+    players: float
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ChunkRouter:
+    """
+    Sends sparse chunks to a cheaper deployment and dense ones to GPT-4o.
+
+    Each chunk is scored locally from three features: keyword density
+    (weighted lexicon hits per 100 tokens, see relevance.py), cue rate
+    (cues per minute) and player mentions per 100 tokens. Every feature is
+    divided by its threshold and the sum compared with `dense_score`;
+    chunks mentioning a DENSE_KEYWORDS term (goals, penalties, red cards)
+    are always dense.
+    The defaults send about half of the bundled matches' chunks to GPT-4o.
+
+    record() collects latency, token usage and estimated cost per route.
+    """
+
+    def __init__(self, cheap_model=None, dense_model=EXTRACTION_MODEL,
+                 dense_density=DEFAULT_HIGH_DENSITY, dense_cue_rate=DEFAULT_DENSE_CUE_RATE,
+                 dense_players=DEFAULT_DENSE_PLAYERS, dense_score=DEFAULT_DENSE_SCORE,
+                 players=(), fps=FPS):
+        self.cheap_model = cheap_model or os.getenv(CHEAP_MODEL_ENV, DEFAULT_CHEAP_MODEL)
+        self.dense_model = dense_model
+        self.dense_density = dense_density
+        self.dense_cue_rate = dense_cue_rate
+        self.dense_players = dense_players
+        self.dense_score = dense_score
+        self.fps = fps
+        self.players = set()
+        self._players_re = None
+        self.add_players(players)
+        self.stats = {name: self._empty_stats() for name in ("cheap", "dense")}
+
+    @staticmethod
+    def _empty_stats():
+        return {"chunks": 0, "tokens": 0, "requests": 0, "cached": 0, "latencies": [],
+                "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+    def add_players(self, names):
+        """Adds player names (e.g. from already extracted events) to the roster."""
+        for name in names:
+            for token in re.findall(r"\w{3,}", str(name or "")):
+                if token[0].isupper():
+                    self.players.add(token.lower())
+        if self.players:
+            self._players_re = compile_lexicon({name: 1 for name in self.players})
+
+    def count_players(self, text):
+        if self._players_re is not None:
+            return len(self._players_re.findall(text))
+        return len(_NAME_PAIR_RE.findall(text))
+
+    def route(self, chunk):
+        """Route for a Chunk; also counted in the per-route stats."""
+        route = self.decide(chunk)
+        self.stats[route.name]["chunks"] += 1
+        self.stats[route.name]["tokens"] += chunk.tokens
+        inc("routed_chunks_total", route=route.name, model=route.model)
+        return route
+
+    def decide(self, chunk):
+        """Route for a Chunk without counting it; stable while the player roster does not change."""
+        text = " ".join(cue.text for cue in chunk.cues)
+        density = 100 * score_text(text) / max(chunk.tokens, 1)
+        minutes = max(chunk.end - chunk.start, self.fps) / (60 * self.fps)
+        cue_rate = len(chunk.cues) / minutes
+        players = 100 * self.count_players(text) / max(chunk.tokens, 1)
+
+        complexity = (density / self.dense_density
+                      + cue_rate / self.dense_cue_rate
+                      + players / self.dense_players)
+        dense = complexity >= self.dense_score or _DENSE_RE.search(text) is not None
+        name = "dense" if dense else "cheap"
+        return Route(name, self.dense_model if dense else self.cheap_model,
+                     round(complexity, 3), round(density, 3), round(cue_rate, 1), round(players, 3))
+
+    @property
+    def models(self):
+        """The deployments a chunk may be sent to."""
+        return self.dense_model, self.cheap_model
+
+    def record(self, route, seconds, response):
+        """Adds one finished request's latency, token usage and cost to its route."""
+        stats = self.stats[route.name]
+        usage = getattr(response, "usage", None)
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        stats["requests"] += 1
+        if getattr(response, "cached", False):
+            # Answered locally: no spend, and no model latency worth comparing
+            stats["cached"] += 1
+            return
+        stats["latencies"].append(seconds)
+        stats["prompt_tokens"] += prompt
+        stats["completion_tokens"] += completion
+        stats["cost_usd"] += estimate_cost(route.model, prompt, completion)
+        observe("route_request_seconds", seconds, route=route.name)
+
+    def report(self):
+        """Per-route summary: chunk share, median/p95 latency, tokens and cost."""
+        total = sum(stats["chunks"] for stats in self.stats.values())
+        report = {}
+        for name, stats in self.stats.items():
+            latencies = stats["latencies"]
+            report[name] = {
+                "model": self.dense_model if name == "dense" else self.cheap_model,
+                "chunks": stats["chunks"],
+                "share": round(stats["chunks"] / total, 3) if total else 0.0,
+                "tokens": stats["tokens"],
+                "requests": stats["requests"],
+                "cached": stats["cached"],
+                "latency_median": round(statistics.median(latencies), 3) if latencies else None,
+                "latency_p95": round(_percentile(latencies, 0.95), 3) if latencies else None,
+                "prompt_tokens": stats["prompt_tokens"],
+                "completion_tokens": stats["completion_tokens"],
+                "cost_usd": round(stats["cost_usd"], 4),
+            }
+        return report
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """USD cost of a request from MODEL_PRICES (0 for unknown deployments)."""
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def main():
+    """Dry run: how the bundled matches would be routed, without calling any model."""
+    from SubtitleRules.chunker import chunk_cues
+    from SubtitleRules.relevance import filter_chunks
+    from SubtitleRules.stl_parser import iter_stl_cues
+
+    parser = argparse.ArgumentParser(description="Show how chunks of .stl files would be routed.")
+    parser.add_argument("stl_files", nargs="+")
+    parser.add_argument("--dense-score", type=float, default=DEFAULT_DENSE_SCORE)
+    parser.add_argument("--verbose", action="store_true", help="print every routing decision")
+    args = parser.parse_args()
+
+    for stl_file in args.stl_files:
+        router = ChunkRouter(dense_score=args.dense_score)
+        chunks, _ = filter_chunks(chunk_cues(iter_stl_cues(stl_file)))
+        for chunk in chunks:
+            route = router.route(chunk)
+            if args.verbose:
+                print(f"  {chunk.index:4d} {route.name:5s} complexity={route.complexity} "
+                      f"density={route.density} cue_rate={route.cue_rate} players={route.players}")
+
+        report = router.report()
+        all_dense = estimate_cost(router.dense_model, sum(s["tokens"] for s in router.stats.values()), 0)
+        routed = sum(estimate_cost(r["model"], r["tokens"], 0) for r in report.values())
+        print(f"🔀 {Path(stl_file).name}: {report['dense']['chunks']} dense / {report['cheap']['chunks']} cheap chunks, "
+              f"prompt spend ~${routed:.4f} instead of ${all_dense:.4f}")
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
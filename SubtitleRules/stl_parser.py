@@ -0,0 +1,134 @@
+import mmap
+import os
+import re
+from typing import Iterator, NamedTuple
+
+from SubtitleRules.timecode import FPS, detect_fps, fields_to_frames, frames_to_timecode, timecode_to_frames
+
+# Matches "HH:MM:SS:FF,HH:MM:SS:FF,text" as well as the block style
+# "HH:MM:SS:FF , HH:MM:SS:FF" header followed by text lines
+CUE_LINE_RE = re.compile(
+    r"^\s*(\d{1,2}):(\d{2}):(\d{2}):(\d{2})\s*,\s*(\d{1,2}):(\d{2}):(\d{2}):(\d{2})\s*(?:,(.*))?$"
+)
+# Frame fields of every timecode in a file, for frame rate detection
+FRAME_FIELD_RE = re.compile(rb"\d{1,2}:\d{2}:\d{2}:(\d{2})\s*,")
+
+
+class Cue(NamedTuple):
+    """
+    A single subtitle cue with start/end as integer frame counts. The
+    timecodes as written in the file are kept in start_timecode /
+    end_timecode ("" when a cue was built from frames only).
+    """
+    start: int
+    end: int
+    text: str
+    start_timecode: str = ""
+    end_timecode: str = ""
+
+    def timecodes(self, fps: int = FPS):
+        """(start, end) 'HH:MM:SS:FF' strings: the source's own where known."""
+        return (self.start_timecode or frames_to_timecode(self.start, fps),
+                self.end_timecode or frames_to_timecode(self.end, fps))
+
+
+def _groups_to_frames(groups, fps, source_fps):
+    hours, minutes, seconds, frames = (int(g) for g in groups)
+    return fields_to_frames(hours, minutes, seconds, frames, fps, source_fps)
+
+
+def _groups_to_timecode(groups):
+    return f"{int(groups[0]):02d}:{groups[1]}:{groups[2]}:{groups[3]}"
+
+
+class CueAssembler:
+    """
+    Incremental cue parser: feed() takes one decoded line at a time and
+    returns the cue it completed, if any. A cue is complete once the next
+    timecode or a blank line arrives; flush() returns the pending one.
+
+    Timecodes are counted at `source_fps` (default: `fps`) and converted
+    to frames at `fps`; frame fields >= source_fps are clamped with a
+    FrameOverflowWarning (see timecode.fields_to_frames).
+    """
+
+    def __init__(self, fps: int = FPS, source_fps: int = None):
+        self.fps = fps
+        self.source_fps = source_fps or fps
+        self.start = self.end = None
+        self.timecodes = ("", "")
+        self.text_parts = []
+
+    def flush(self):
+        cue = None
+        if self.start is not None and self.text_parts:
+            cue = Cue(self.start, self.end, " ".join(self.text_parts), *self.timecodes)
+        self.start = self.end = None
+        self.timecodes = ("", "")
+        self.text_parts = []
+        return cue
+
+    def feed(self, line: str):
+        line = line.lstrip("\ufeff").strip()
+        match = CUE_LINE_RE.match(line)
+        done = None
+
+        if match or not line:
+            # A new timecode or a blank line closes the pending cue
+            done = self.flush()
+
+        if match:
+            groups = match.groups()
+            self.start = _groups_to_frames(groups[0:4], self.fps, self.source_fps)
+            self.end = _groups_to_frames(groups[4:8], self.fps, self.source_fps)
+            self.timecodes = (_groups_to_timecode(groups[0:4]), _groups_to_timecode(groups[4:8]))
+            if groups[8] and groups[8].strip():
+                self.text_parts.append(groups[8].strip())
+        elif line and self.start is not None:
+            self.text_parts.append(line)
+        return done
+
+
+def detect_source_fps(mm) -> int:
+    """Frame rate (25 or 30) of a text .stl file, from the frame fields of its timecodes."""
+    return detect_fps(int(match.group(1)) for match in FRAME_FIELD_RE.finditer(mm))
+
+
+def iter_stl_cues(file_path, fps: int = FPS, source_fps: int = None) -> Iterator[Cue]:
+    """
+    Lazily yields Cue records from a text .stl file.
+
+    The file is memory-mapped and decoded line by line, so memory use stays
+    constant regardless of the match length. Continuation lines (block style
+    files) are joined onto the cue they belong to. Binary EBU STL files are
+    handed to SubtitleRules/ebu_stl.py.
+
+    Text feeds do not declare their frame rate: unless `source_fps` is
+    given it is detected from the frame fields (see detect_source_fps).
+    Cue frames are always counted at `fps`; the original timecode strings
+    are kept on the cue for display and storage.
+    """
+    if os.path.getsize(file_path) == 0:
+        return
+
+    from SubtitleRules.ebu_stl import is_ebu_stl, iter_ebu_cues
+    if is_ebu_stl(file_path):
+        yield from iter_ebu_cues(file_path, fps)
+        return
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        assembler = CueAssembler(fps, source_fps or detect_source_fps(mm))
+        for raw_line in iter(mm.readline, b""):
+            cue = assembler.feed(raw_line.decode("utf-8", errors="replace"))
+            if cue is not None:
+                yield cue
+
+        cue = assembler.flush()
+        if cue is not None:
+            yield cue
+
+
+def format_cue(cue: Cue, fps: int = FPS) -> str:
+    """Render a cue back into the 'HH:MM:SS:FF,HH:MM:SS:FF,text' line format."""
+    start, end = cue.timecodes(fps)
+    return f"{start},{end},{cue.text}"
@@ -7,6 +7,10 @@ import weaviate
 
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from SubtitleRules.llm_cache import CachedChatClient
+from SubtitleRules.event_store import append_events, iter_events
+from SubtitleRules.json_extract import events_from_record, parse_llm_content
+from Weaviate_db.insert import commentary_properties, ingest_objects
 
 # -------------------- Load environment --------------------
 load_dotenv()
@@ -28,6 +32,8 @@ client = AzureOpenAI(
     api_key=azure_api_key,
     api_version="2025-01-01-preview",
 )
+# Reruns with identical prompts are served from gpt_outputs/llm_cache.sqlite
+client = CachedChatClient(client)
 
 # -------------------- Connect to Weaviate Cloud --------------------
 wv_client = weaviate.connect_to_weaviate_cloud(
@@ -37,6 +43,21 @@ wv_client = weaviate.connect_to_weaviate_cloud(
 )
 print("Connected to Weaviate Cloud:", wv_client.is_ready())
 
+# -------------------- Event log --------------------
+OUTPUT_FILE = "gpt_outputs/event_extraction_output.jsonl"
+# JSON array written by earlier versions
+LEGACY_OUTPUT_FILE = "gpt_outputs/event_extraction_output.json"
+
+
+def event_log_path():
+    """
+    The JSONL event log, or the legacy JSON file while no JSONL log exists;
+    event_store reads it and converts it to JSONL on the first append.
+    """
+    if not os.path.exists(OUTPUT_FILE) and os.path.exists(LEGACY_OUTPUT_FILE):
+        return LEGACY_OUTPUT_FILE
+    return OUTPUT_FILE
+
 # -------------------- Send chunk to LLM to extract football events --------------------
 def extract_events(chunk):
     """
@@ -58,35 +79,14 @@ def extract_events(chunk):
     )
     content = resp.choices[0].message.content
 
-    # Save content to JSON file
-    output_dir = "gpt_outputs"
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, "event_extraction_output.json")
-
-    # Load existing data if available
-    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-        with open(output_file, "r", encoding="utf-8") as f:
-            try:
-                existing_data = json.load(f)
-                if not isinstance(existing_data, list):
-                    existing_data = [existing_data]
-            except json.JSONDecodeError:
-                existing_data = []
-    else:
-        existing_data = []
-
-    # Parse GPT content as JSON
-    try:
-        new_data = json.loads(content)
-        if isinstance(new_data, dict):
-            new_data = [new_data]
-    except json.JSONDecodeError:
-        new_data = [{"raw_text": content}]
-
-    existing_data.extend(new_data)
-
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, indent=2, ensure_ascii=False)
+    # Save content to the JSONL event log
+    output_file = event_log_path()
+
+    # Parse GPT content as JSON (raw_text record if nothing usable is found)
+    new_data = parse_llm_content(content)
+
+    # Append only the new records instead of rewriting the whole file
+    append_events(output_file, new_data)
 
 # -------------------- Helper functions --------------------
 def chunk_text(text, chunk_size=500):
@@ -115,30 +115,20 @@ else:
     print("Collection already exists.")
 
 # -------------------- Load saved GPT response --------------------
-output_file = "gpt_outputs/event_extraction_output.json"
+output_file = event_log_path()
 
 if os.path.exists(output_file):
-    with open(output_file, "r", encoding="utf-8") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            print("Error: GPT output JSON is invalid")
-            data = []
+    data = iter_events(output_file)
 else:
     print("No GPT output found")
     data = []
 
 # -------------------- Insert data into Weaviate --------------------
-collection = wv_client.collections.get("Commentary")
-
-for item in data:
-    collection.data.insert({
-        "event_type": item.get("event_type") or "",
-        "player": item.get("player") or "",
-        "team": item.get("team") or "",
-    })
+# Batch upsert under deterministic ids; also drops cached 'Commentary' query results
+events = (event for item in data for event in events_from_record(item))
+report = ingest_objects("Commentary", (commentary_properties(event) for event in events), wv_client=wv_client)
 
-print("Data successfully saved to Weaviate!")
+print(f"Data saved to Weaviate: {report['inserted']} inserted, {report['failed']} failed.")
 
 # -------------------- Close Weaviate client --------------------
 wv_client.close()
@@ -0,0 +1,128 @@
+import re
+
+from GCP.sports_terms import football_terms
+from SubtitleRules.relevance import GERMAN_TERMS
+
+# Event types the extraction model reports that are not rule terms in GCP/sports_terms.py
+EXTRA_TYPES = {
+    "Goal": ["goal", "goals", "own goal", "equaliser", "equalizer", "tor", "treffer",
+             "eigentor", "ausgleich", "ausgleichstreffer", "führungstreffer"],
+    "Injury": ["injury", "injured", "verletzung", "verletzt"],
+    "Shot": ["shot", "shot on target", "shot off target", "schuss", "torschuss"],
+    "Save": ["save", "goalkeeper save", "parade", "gehalten"],
+    "VAR Review": ["var", "var review", "video review", "videobeweis", "var check"],
+}
+
+# Extra spellings for the terms in GCP/sports_terms.py
+EXTRA_ALIASES = {
+    "Yellow Card": ["yellow", "booking", "caution", "yellow card suspension", "second yellow card"],
+    "Red Card": ["red", "sending off", "sent off", "straight red", "gelb rot", "gelbrote karte"],
+    "Corner Kick": ["corner", "corners"],
+    "Penalty": ["penalty kick", "penalty shot", "spot kick", "penalty awarded"],
+    "Free Kick": ["freekick", "free kicks"],
+    "Substitution": ["sub", "substitute", "player change", "spielerwechsel"],
+    "Foul": ["fouls", "foul play"],
+    "Offside": ["off side", "offside position"],
+    "Handball": ["hand ball"],
+    "Kick-off": ["kickoff", "kick off"],
+    "Throw-In": ["throw in", "throwin"],
+    "Goal Kick": ["goalkick"],
+}
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize_alias(text):
+    """Lowercase, punctuation/underscores/hyphens to single spaces."""
+    return _NON_WORD_RE.sub(" ", str(text or "").lower()).strip()
+
+
+def to_canonical_id(name):
+    """'Corner Kick' → 'corner_kick'"""
+    return normalize_alias(name).replace(" ", "_")
+
+
+class AliasIndex:
+    """
+    Character trie over normalized aliases. lookup() walks the text once
+    from every word start and returns the id of the longest alias that
+    ends on a word boundary, in O(length of text × longest alias).
+    """
+
+    _END = object()
+
+    def __init__(self):
+        self._root = {}
+        self._max_len = 0
+
+    def add(self, alias, canonical):
+        alias = normalize_alias(alias)
+        if not alias:
+            return
+        node = self._root
+        for char in alias:
+            node = node.setdefault(char, {})
+        node[self._END] = canonical
+        self._max_len = max(self._max_len, len(alias))
+
+    def lookup(self, text):
+        text = normalize_alias(text)
+        best, best_len = None, 0
+        length = len(text)
+        for start in range(length):
+            if start and text[start - 1] != " ":
+                continue
+            node = self._root
+            for pos in range(start, min(length, start + self._max_len)):
+                node = node.get(text[pos])
+                if node is None:
+                    break
+                end = pos + 1
+                if self._END in node and (end == length or text[end] == " "):
+                    if end - start > best_len:
+                        best, best_len = node[self._END], end - start
+        return best
+
+
+def build_taxonomy(terms=football_terms):
+    """Returns (canonical id → display name, AliasIndex) for English and German aliases."""
+    canonical = {}
+    index = AliasIndex()
+    for name, aliases in [(term, []) for term in terms] + list(EXTRA_TYPES.items()):
+        cid = to_canonical_id(name)
+        canonical[cid] = name
+        for alias in [name, cid] + aliases + GERMAN_TERMS.get(name, []) + EXTRA_ALIASES.get(name, []):
+            index.add(alias, cid)
+    return canonical, index
+
+
+CANONICAL_TYPES, ALIAS_INDEX = build_taxonomy()
+
+_ALIASES_BY_ID = {}
+
+
+def canonical_id(raw_type):
+    """Canonical event type id ('yellow_card') for any raw type, or None."""
+    return ALIAS_INDEX.lookup(raw_type)
+
+
+def display_name(cid):
+    """Human-readable name of a canonical id, as used for output/ folders."""
+    return CANONICAL_TYPES.get(cid, cid)
+
+
+def raw_variants(cid):
+    """
+    Spellings an event of this type may be stored under in Weaviate
+    (display name and aliases, lowercase and title case).
+    """
+    if cid not in _ALIASES_BY_ID:
+        name = CANONICAL_TYPES.get(cid, cid)
+        aliases = [name] + EXTRA_TYPES.get(name, []) + EXTRA_ALIASES.get(name, []) + GERMAN_TERMS.get(name, [])
+        variants = []
+        for alias in aliases:
+            for variant in (alias, alias.lower(), alias.title()):
+                if variant not in variants:
+                    variants.append(variant)
+        _ALIASES_BY_ID[cid] = variants
+    return _ALIASES_BY_ID[cid]
@@ -0,0 +1,243 @@
+import re
+import warnings
+from collections import Counter
+from typing import Iterable, Optional
+
+import numpy as np
+
+# Broadcast subtitles are timed in HH:MM:SS:FF at 25 frames per second
+FPS = 25
+
+# Frame rates of the STL disk formats (STL25.01 / STL30.01)
+SOURCE_RATES = (25, 30)
+# Share of frame fields >= 25 above which a file counts as 30 fps rather than a 25 fps file with typos
+DETECT_30FPS_SHARE = 0.01
+
+# Lenient form for LLM 'timestamp' strings: HH:MM:SS, HH:MM:SS:FF or HH:MM:SS.mmm anywhere in the text
+_LOOSE_TIMECODE_RE = re.compile(r"(\d{1,2}):(\d{2}):(\d{2})(?:([:.,])(\d{1,3}))?")
+
+_DIGIT_COLUMNS = [0, 1, 3, 4, 6, 7, 9, 10]
+_COLON_COLUMNS = [2, 5, 8]
+
+
+class FrameOverflowWarning(UserWarning):
+    """A timecode's frame field was >= the frame rate and has been clamped."""
+
+
+def fields_to_frames(hours: int, minutes: int, seconds: int, frames: int,
+                     fps: int = FPS, source_fps: Optional[int] = None, clamp: bool = True) -> int:
+    """
+    Absolute frame count at `fps` of a timecode counted at `source_fps`
+    (default: `fps`).
+
+    A frame field >= source_fps would silently roll over into the next
+    second; it is clamped to the last frame of its second with a
+    FrameOverflowWarning, or raises ValueError when `clamp` is false.
+    Minutes or seconds >= 60 always raise ValueError.
+    """
+    source_fps = source_fps or fps
+    if minutes >= 60 or seconds >= 60:
+        raise ValueError(f"Invalid timecode {hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}")
+    if frames >= source_fps:
+        if not clamp:
+            raise ValueError(f"Frame field of {hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d} "
+                             f"is out of range at {source_fps} fps")
+        # One message per frame rate, so the warning is shown once and not for every cue
+        warnings.warn(f"Frame fields >= {source_fps} clamped to {source_fps - 1}",
+                      FrameOverflowWarning, stacklevel=2)
+        frames = source_fps - 1
+    if source_fps != fps:
+        frames = min(round(frames * fps / source_fps), fps - 1)
+    return ((hours * 60 + minutes) * 60 + seconds) * fps + frames
+
+
+def timecode_to_frames(timecode: str, fps: int = FPS, clamp: bool = False) -> int:
+    """
+    Convert 'HH:MM:SS:FF' to an absolute frame count. Raises ValueError
+    for malformed timecodes and frame fields >= fps (see fields_to_frames).
+    """
+    parts = timecode.strip().split(":")
+    if len(parts) != 4 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Not a HH:MM:SS:FF timecode: {timecode!r}")
+    hours, minutes, seconds, frames = (int(part) for part in parts)
+    return fields_to_frames(hours, minutes, seconds, frames, fps, clamp=clamp)
+
+
+def frames_to_timecode(frames: int, fps: int = FPS) -> str:
+    """Convert an absolute frame count back to 'HH:MM:SS:FF'."""
+    if frames < 0:
+        raise ValueError(f"Negative frame count {frames}")
+    seconds, ff = divmod(int(frames), fps)
+    minutes, ss = divmod(seconds, 60)
+    hh, mm = divmod(minutes, 60)
+    return f"{hh:02d}:{mm:02d}:{ss:02d}:{ff:02d}"
+
+
+def parse_timecode(text, fps: int = FPS) -> Optional[int]:
+    """
+    Frame number of the first timecode in a free-form string ('00:12:03:10',
+    'at 00:12:03', '00:12:03.400'), or None if there is none. Frame fields
+    >= fps are clamped with a FrameOverflowWarning; minutes or seconds
+    >= 60 do not count as a timecode.
+    """
+    match = _LOOSE_TIMECODE_RE.search(str(text or ""))
+    if not match:
+        return None
+    hours, minutes, seconds, separator, fraction = match.groups()
+    if int(minutes) >= 60 or int(seconds) >= 60:
+        return None
+    frames = 0
+    if fraction:
+        if separator == ":":
+            frames = int(fraction)
+        else:
+            frames = int(int(fraction.ljust(3, "0")) * fps / 1000)
+    return fields_to_frames(int(hours), int(minutes), int(seconds), frames, fps)
+
+
+def detect_fps(frame_fields: Iterable[int]) -> int:
+    """
+    Frame rate of a subtitle file from the frame fields of its timecodes:
+    30 if more than DETECT_30FPS_SHARE of them are >= 25, otherwise 25.
+    """
+    counts = Counter(int(f) for f in frame_fields)
+    total = sum(counts.values())
+    high = sum(n for frame, n in counts.items() if frame >= SOURCE_RATES[0])
+    return SOURCE_RATES[1] if total and high / total > DETECT_30FPS_SHARE else SOURCE_RATES[0]
+
+
+def normalize_timecode(text, fps: int = FPS) -> Optional[str]:
+    """
+    The first timecode in a free-form string as 'HH:MM:SS:FF', or None.
+    Cue timecodes are returned as written (frame fields are not re-counted
+    at `fps`); 'HH:MM:SS' and 'HH:MM:SS.mmm' forms are converted.
+    """
+    match = _LOOSE_TIMECODE_RE.search(str(text or ""))
+    if not match or int(match.group(2)) >= 60 or int(match.group(3)) >= 60:
+        return None
+    hours, minutes, seconds, separator, fraction = match.groups()
+    if separator == ":" and len(fraction) == 2:
+        return f"{int(hours):02d}:{minutes}:{seconds}:{fraction}"
+    return frames_to_timecode(parse_timecode(match.group(0), fps), fps)
+
+
+def timecode_minute(timecode: str) -> int:
+    """Minute (hours * 60 + minutes) of an 'HH:MM:SS:FF' timecode, independent of the frame rate."""
+    hours, minutes = timecode.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_timecodes(timecodes: Iterable, fps: int = FPS) -> np.ndarray:
+    """
+    Frame numbers of many timecodes at once, -1 where a string has none.
+
+    Strict 'HH:MM:SS:FF' strings (the cue format) are decoded together as
+    one uint8 matrix; anything else, including out-of-range fields, goes
+    through parse_timecode().
+    """
+    texts = [str(t).strip() if t is not None else "" for t in timecodes]
+    frames = np.full(len(texts), -1, dtype=np.int64)
+    if not texts:
+        return frames
+
+    fixed = np.fromiter((len(t) == 11 for t in texts), dtype=bool, count=len(texts))
+    positions = np.flatnonzero(fixed)
+    valid = np.zeros(len(texts), dtype=bool)
+    if len(positions):
+        raw = "".join(texts[i] for i in positions).encode("ascii", "replace")
+        if len(raw) == 11 * len(positions):
+            matrix = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 11)
+            digits = matrix[:, _DIGIT_COLUMNS].astype(np.int64) - ord("0")
+            ok = ((digits >= 0) & (digits <= 9)).all(axis=1) & (matrix[:, _COLON_COLUMNS] == ord(":")).all(axis=1)
+            hours = digits[:, 0] * 10 + digits[:, 1]
+            minutes = digits[:, 2] * 10 + digits[:, 3]
+            seconds = digits[:, 4] * 10 + digits[:, 5]
+            ff = digits[:, 6] * 10 + digits[:, 7]
+            ok &= (minutes < 60) & (seconds < 60) & (ff < fps)
+            values = ((hours * 60 + minutes) * 60 + seconds) * fps + ff
+            frames[positions[ok]] = values[ok]
+            valid[positions[ok]] = True
+
+    for i in np.flatnonzero(~valid):
+        frame = parse_timecode(texts[i], fps)
+        if frame is not None:
+            frames[i] = frame
+    return frames
+
+
+def minute_to_frames(minute: float, kickoff_frame: int = 0, fps: int = FPS) -> int:
+    """Frame at match minute `minute` (0 = kick-off at kickoff_frame)."""
+    return int(kickoff_frame + minute * 60 * fps)
+
+
+class CueIndex:
+    """
+    Sorted interval index over cues (anything with .start/.end frames).
+
+    Lookups are binary searches over NumPy arrays. Overlapping cues are
+    handled through a running maximum of the end frames, so
+    between() never scans cues that end before the range.
+    """
+
+    def __init__(self, cues, fps: int = FPS):
+        self.fps = fps
+        self.cues = sorted(cues, key=lambda cue: (cue.start, cue.end))
+        n = len(self.cues)
+        self.starts = np.fromiter((cue.start for cue in self.cues), dtype=np.int64, count=n)
+        self.ends = np.fromiter((cue.end for cue in self.cues), dtype=np.int64, count=n)
+        self._max_end = np.maximum.accumulate(self.ends) if n else self.ends
+
+    def __len__(self):
+        return len(self.cues)
+
+    def covering(self, frame: int):
+        """Index of the last-starting cue that covers `frame`, or -1."""
+        i = int(np.searchsorted(self.starts, frame, side="right")) - 1
+        while i >= 0 and self._max_end[i] > frame:
+            if self.ends[i] > frame:
+                return i
+            i -= 1
+        return -1
+
+    def at(self, frame: int):
+        """The cue on screen at `frame`, or None."""
+        i = self.covering(frame)
+        return self.cues[i] if i >= 0 else None
+
+    def preceding(self, frame: int):
+        """Index of the last cue starting at or before `frame` (or the first cue), -1 if empty."""
+        if not len(self.cues):
+            return -1
+        return max(int(np.searchsorted(self.starts, frame, side="right")) - 1, 0)
+
+    def between(self, start_frame: int, end_frame: int):
+        """All cues overlapping [start_frame, end_frame), in start order."""
+        lo = int(np.searchsorted(self._max_end, start_frame, side="right"))
+        hi = int(np.searchsorted(self.starts, end_frame, side="left"))
+        if lo >= hi:
+            return []
+        keep = np.flatnonzero(self.ends[lo:hi] > start_frame) + lo
+        return [self.cues[i] for i in keep]
+
+    def between_minutes(self, from_minute: float, to_minute: float, kickoff_frame: int = 0):
+        """Cues between two match minutes, e.g. between_minutes(60, 75, kickoff_frame)."""
+        return self.between(minute_to_frames(from_minute, kickoff_frame, self.fps),
+                            minute_to_frames(to_minute, kickoff_frame, self.fps))
+
+    def locate(self, timestamps: Iterable) -> np.ndarray:
+        """
+        Cue index for each timestamp string: the cue covering it, else the
+        last cue starting before it; -1 for strings without a timecode.
+        """
+        frames = parse_timecodes(timestamps, self.fps)
+        if not len(self.cues):
+            return np.full(len(frames), -1, dtype=np.int64)
+        positions = np.searchsorted(self.starts, frames, side="right") - 1
+        positions = np.clip(positions, 0, None)
+        positions[frames < 0] = -1
+        # Cues are mostly disjoint; only fix up the rare hits inside an overlap
+        for i in np.flatnonzero((positions >= 0) & (self.ends[np.clip(positions, 0, None)] <= frames)):
+            covering = self.covering(int(frames[i]))
+            if covering >= 0:
+                positions[i] = covering
+        return positions
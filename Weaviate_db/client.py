@@ -2,6 +2,7 @@ import os
 import weaviate
 from weaviate.auth import AuthApiKey
 from dotenv import load_dotenv
+from Instrumentation.metrics import span
 
 
 load_dotenv()
@@ -15,11 +16,12 @@ def get_client_cloud():
     openai_key = os.getenv("OPENAI_API_KEY")  # Optional: if you plan to use OpenAI module
 
     # Connect to your Weaviate Cloud instance
-    client = weaviate.connect_to_weaviate_cloud(
-        cluster_url=cluster_url,
-        auth_credentials=AuthApiKey(api_key),
-        headers={"X-OpenAI-Api-Key": openai_key} if openai_key else None
-    )
+    with span("weaviate_connect", target="cloud"):
+        client = weaviate.connect_to_weaviate_cloud(
+            cluster_url=cluster_url,
+            auth_credentials=AuthApiKey(api_key),
+            headers={"X-OpenAI-Api-Key": openai_key} if openai_key else None
+        )
 
     print("Connected to Weaviate Cloud!")
     return client
@@ -27,17 +29,18 @@ def get_client_cloud():
 
 
 def get_client_local():
-    # For local instance at http://localhost:8080
-    client = weaviate.connect_to_local(
-        host="localhost",
-        port=8080
-    )
+    # For local instance at http://localhost:8080 (docker-compose.yml);
+    # WEAVIATE_HOST / WEAVIATE_PORT point it elsewhere
+    with span("weaviate_connect", target="local"):
+        client = weaviate.connect_to_local(
+            host=os.getenv("WEAVIATE_HOST", "localhost"),
+            port=int(os.getenv("WEAVIATE_PORT", "8080"))
+        )
 
     return client
 
 
-
-
-with get_client_cloud() as c:
-    print(c.is_ready())  # Should return True
+if __name__ == "__main__":
+    with get_client_cloud() as c:
+        print(c.is_ready())  # Should return True
 
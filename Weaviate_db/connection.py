@@ -0,0 +1,87 @@
+import atexit
+import os
+import threading
+
+from Weaviate_db.client import get_client_cloud, get_client_local
+from Instrumentation.metrics import inc
+
+# WEAVIATE_TARGET=local uses the instance from docker-compose.yml, "cloud" (default) Weaviate Cloud
+TARGET_ENV = "WEAVIATE_TARGET"
+DEFAULT_TARGET = "cloud"
+
+CONNECTORS = {
+    "cloud": get_client_cloud,
+    "local": get_client_local,
+}
+
+
+class ConnectionManager:
+    """
+    One Weaviate client per process, connected on first use.
+
+    The client (and its gRPC channel) is shared by every schema, insert and
+    query call instead of connecting per call. A forked child process gets
+    a connection of its own; close() runs at interpreter exit.
+    """
+
+    def __init__(self, target=None):
+        self.target = target
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def resolve_target(self):
+        target = (self.target or os.getenv(TARGET_ENV) or DEFAULT_TARGET).lower()
+        if target not in CONNECTORS:
+            raise ValueError(f"Unknown Weaviate target {target!r}, expected one of {sorted(CONNECTORS)}")
+        return target
+
+    def get_client(self):
+        client = self._client
+        if client is not None and self._pid == os.getpid() and client.is_connected():
+            return client
+
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                if not self._client.is_connected():
+                    # Closed by a caller or dropped: reopen the same client
+                    self._client.connect()
+                    inc("weaviate_connections_total", target=self.resolve_target(), reason="reconnect")
+                return self._client
+
+            # First use, or a forked child: the parent's gRPC channel cannot be shared
+            target = self.resolve_target()
+            self._client = CONNECTORS[target]()
+            self._pid = os.getpid()
+            inc("weaviate_connections_total", target=target, reason="connect")
+            return self._client
+
+    def configure(self, target):
+        """Switches to another target ('local' / 'cloud'); the next call reconnects."""
+        self.close()
+        self.target = target
+
+    def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+            owned = self._pid == os.getpid()
+            self._pid = None
+        if client is not None and owned:
+            client.close()
+
+
+MANAGER = ConnectionManager()
+atexit.register(MANAGER.close)
+
+
+def get_client():
+    """The shared client of this process. Callers must not close it."""
+    return MANAGER.get_client()
+
+
+def configure(target):
+    MANAGER.configure(target)
+
+
+def close_client():
+    MANAGER.close()
@@ -0,0 +1,92 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Add the project root directory to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from weaviate.classes.query import Filter
+
+from Weaviate_db.connection import configure, get_client
+from Weaviate_db.insert import UUID_FUNCTIONS, ingest_objects
+from Weaviate_db.query import QUERY_CACHE
+from Instrumentation.metrics import inc, span
+
+DELETE_CHUNK_SIZE = 1000
+
+
+def plan_dedup(collection, uuid_for):
+    """
+    Streams every object of `collection` once and groups them by their
+    deterministic id. Returns (keep, delete): the objects to write under
+    their deterministic id (oldest copy of each group that does not have
+    it yet) and the ids of every other copy.
+    """
+    groups = {}
+    for obj in collection.iterator():
+        key = str(uuid_for(obj.properties))
+        group = groups.get(key)
+        if group is None:
+            groups[key] = group = {"ids": [], "properties": obj.properties}
+        elif str(obj.properties.get("inserted_at") or "") < str(group["properties"].get("inserted_at") or ""):
+            group["properties"] = obj.properties
+        group["ids"].append(str(obj.uuid))
+
+    keep = [group["properties"] for key, group in groups.items() if key not in group["ids"]]
+    delete = [object_id for key, group in groups.items() for object_id in group["ids"] if object_id != key]
+    return keep, delete
+
+
+def dedup_collection(collection_name, dry_run=False, wv_client=None):
+    """
+    Migrates `collection_name` to deterministic ids: one object per id
+    remains, older random-id copies are removed. The new copies are
+    written before anything is deleted, so an interrupted run can simply
+    be repeated.
+    """
+    wv_client = wv_client or get_client()
+    collection = wv_client.collections.get(collection_name)
+    uuid_for = UUID_FUNCTIONS[collection_name]
+
+    with span("weaviate_dedup_scan", collection=collection_name):
+        keep, delete = plan_dedup(collection, uuid_for)
+    print(f"🧹 '{collection_name}': {len(keep)} objects to rewrite, {len(delete)} duplicates / old ids to delete")
+    if dry_run or not (keep or delete):
+        return {"collection": collection_name, "rewritten": 0, "deleted": 0, "planned_deletes": len(delete)}
+
+    report = ingest_objects(collection_name, keep, uuid_for=uuid_for, wv_client=wv_client)
+    if report["failed"]:
+        # Deleting now could drop the only copy of an object
+        print(f"⚠️ {report['failed']} objects could not be rewritten, nothing deleted")
+        return {"collection": collection_name, "rewritten": report["inserted"], "deleted": 0,
+                "planned_deletes": len(delete)}
+
+    deleted = 0
+    with span("weaviate_dedup_delete", collection=collection_name):
+        for start in range(0, len(delete), DELETE_CHUNK_SIZE):
+            ids = delete[start:start + DELETE_CHUNK_SIZE]
+            result = collection.data.delete_many(where=Filter.by_id().contains_any(ids))
+            deleted += result.successful
+    QUERY_CACHE.invalidate(collection_name)
+    inc("weaviate_objects_total", deleted, collection=collection_name, status="deduplicated")
+    print(f"✓ '{collection_name}': {report['inserted']} rewritten, {deleted} deleted")
+    return {"collection": collection_name, "rewritten": report["inserted"], "deleted": deleted,
+            "planned_deletes": len(delete)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove duplicate objects and switch collections to deterministic ids.")
+    parser.add_argument("collections", nargs="*", default=sorted(UUID_FUNCTIONS), choices=sorted(UUID_FUNCTIONS))
+    parser.add_argument("--dry-run", action="store_true", help="only count what would change")
+    parser.add_argument("--target", choices=["cloud", "local"], help="Weaviate instance (default: $WEAVIATE_TARGET)")
+    args = parser.parse_args()
+
+    if args.target:
+        configure(args.target)
+    for collection_name in args.collections:
+        dedup_collection(collection_name, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
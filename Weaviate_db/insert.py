@@ -1,14 +1,222 @@
-from Weaviate_db.client import get_client_cloud
+import argparse
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
 
-def insert_events(events):
+from weaviate.classes.query import Filter
+from weaviate.util import generate_uuid5
+
+from Weaviate_db.connection import get_client
+from Weaviate_db.query import QUERY_CACHE
+from Instrumentation.metrics import inc, span
+from SubtitleRules.dedup import canonical_event_type, normalize_person
+from SubtitleRules.timecode import normalize_timecode, timecode_minute
+
+# batch_size=None lets the client size batches from the server's load (dynamic batching)
+DEFAULT_BATCH_SIZE = None
+DEFAULT_CONCURRENT_REQUESTS = 2
+DEFAULT_MAX_RETRIES = 2
+MAX_REPORTED_ERRORS = 20
+LOOKUP_CHUNK_SIZE = 200
+
+
+def _first(value):
+    return str(value[0] if isinstance(value, list) and value else value or "")
+
+
+def match_id_for(path):
+    """Match id of an event log: the match directory of a batch run (<run>/<match>/events.jsonl) or the file stem."""
+    path = Path(path)
+    return path.parent.name if path.stem == "events" else path.stem
+
+
+def commentary_properties(event, match_id=""):
+    """
+    'Commentary' object for an extracted event; None/list values are normalized.
+    The timestamp is stored as the cue timecode the event was reported at.
+    'inserted_at' is filled in by ingest_objects(), which keeps the time of
+    the first ingest when an event is loaded again.
+    """
+    timestamp = normalize_timecode(event.get("timestamp"))
+    return {
+        "event_type": _first(event.get("event_type")),
+        "player": _first(event.get("player")),
+        "team": _first(event.get("team")),
+        "match_id": str(match_id or event.get("match_id") or ""),
+        "timestamp": timestamp or "",
+        "minute": timecode_minute(timestamp) if timestamp else None,
+    }
+
+
+def commentary_uuid(properties):
     """
-    events: List of dicts with keys: event_type, explanation, image
+    Deterministic id of a 'Commentary' object: match, canonical event type,
+    timecode and player surname. Re-inserting an event overwrites it.
+    Objects without timecode (older rows) also key on the team.
     """
-    wv_client = get_client_cloud()
-    collection = wv_client.collections.get("ImageData")
+    key = [properties.get("match_id") or "",
+           canonical_event_type(properties.get("event_type")),
+           properties.get("timestamp") or "",
+           normalize_person(properties.get("player"))]
+    if not key[2]:
+        key.append(normalize_person(properties.get("team")))
+    return generate_uuid5("|".join(key), "Commentary")
+
+
+def image_data_uuid(properties):
+    """Deterministic id of an 'ImageData' object: event type and image path."""
+    key = [canonical_event_type(properties.get("event_type")), str(properties.get("image") or "")]
+    return generate_uuid5("|".join(key), "ImageData")
+
+
+# Objects of these collections are upserted under their deterministic id
+UUID_FUNCTIONS = {
+    "Commentary": commentary_uuid,
+    "ImageData": image_data_uuid,
+}
+
+# Date property holding the first ingest time; an upsert keeps the stored value
+INGEST_TIME_PROPERTIES = {
+    "Commentary": "inserted_at",
+}
+
+
+def _with_ingest_time(collection, objects, name):
+    """
+    Sets property `name` of each (properties, uuid) pair to the value
+    already stored under that id, else the object's own value, else now.
+    Stored values are looked up LOOKUP_CHUNK_SIZE ids at a time.
+    """
+    objects = iter(objects)
+    while True:
+        group = list(islice(objects, LOOKUP_CHUNK_SIZE))
+        if not group:
+            return
+        ids = list({str(uuid) for _, uuid in group})
+        with span("weaviate_ingest_time_lookup", collection=collection.name):
+            existing = collection.query.fetch_objects(filters=Filter.by_id().contains_any(ids),
+                                                      return_properties=[name], limit=len(ids))
+        stored = {str(obj.uuid): obj.properties.get(name) for obj in existing.objects}
+        now = datetime.now(timezone.utc)
+        for properties, uuid in group:
+            yield {**properties, name: stored.get(str(uuid)) or properties.get(name) or now}, uuid
+
+
+def _batch(collection, batch_size, concurrent_requests):
+    if batch_size is None:
+        return collection.batch.dynamic()
+    return collection.batch.fixed_size(batch_size=batch_size, concurrent_requests=concurrent_requests)
+
+
+def _send(collection, objects, batch_size, concurrent_requests):
+    """Adds (properties, uuid) pairs through one batch context; returns (sent, failed objects)."""
+    sent = 0
+    with _batch(collection, batch_size, concurrent_requests) as batch:
+        for properties, uuid in objects:
+            batch.add_object(properties=properties, uuid=uuid)
+            sent += 1
+    return sent, list(collection.batch.failed_objects)
+
+
+def ingest_objects(collection_name, objects, batch_size=DEFAULT_BATCH_SIZE,
+                   concurrent_requests=DEFAULT_CONCURRENT_REQUESTS, max_retries=DEFAULT_MAX_RETRIES,
+                   wv_client=None, uuid_for=None, ingest_time_property=None):
+    """
+    Loads property dicts into `collection_name` through the batch API.
+
+    `objects` may be any iterable or generator; it is consumed once, so
+    memory use does not depend on its length. batch_size=None uses dynamic
+    batching, an int a fixed batch size with `concurrent_requests` batches
+    in flight. Objects the server rejects are sent again up to
+    `max_retries` times. Returns a summary dict with the counts and the
+    first MAX_REPORTED_ERRORS error messages.
+
+    Each object gets the id `uuid_for(properties)` (default: the
+    collection's entry in UUID_FUNCTIONS), so loading the same data again
+    overwrites the existing objects instead of adding duplicates. The
+    `ingest_time_property` (default: the collection's entry in
+    INGEST_TIME_PROPERTIES) keeps the time the object was first written.
+    """
+    collection = (wv_client or get_client()).collections.get(collection_name)
+    uuid_for = uuid_for or UUID_FUNCTIONS.get(collection_name)
+    ingest_time_property = ingest_time_property or INGEST_TIME_PROPERTIES.get(collection_name)
+    if uuid_for is not None:
+        objects = ((properties, uuid_for(properties)) for properties in objects)
+        if ingest_time_property:
+            objects = _with_ingest_time(collection, objects, ingest_time_property)
+    elif ingest_time_property:
+        # Random ids: every object is new
+        now = datetime.now(timezone.utc)
+        objects = (({**properties, ingest_time_property: properties.get(ingest_time_property) or now}, None)
+                   for properties in objects)
+    else:
+        objects = ((properties, None) for properties in objects)
+    started = time.perf_counter()
+
+    with span("weaviate_insert", collection=collection_name) as insert_span:
+        sent, failed = _send(collection, objects, batch_size, concurrent_requests)
+        retried = 0
+        for attempt in range(max_retries):
+            if not failed:
+                break
+            retried += len(failed)
+            inc("weaviate_batch_retries_total", len(failed), collection=collection_name)
+            print(f"⚠️ {len(failed)} objects rejected by '{collection_name}', retrying ({attempt + 1}/{max_retries})...")
+            _, failed = _send(collection, [(error.object_.properties, error.object_.uuid) for error in failed],
+                              batch_size, concurrent_requests)
+        insert_span.set(inserted=sent - len(failed), failed=len(failed))
+    if sent:
+        # Cached query results of this collection are stale now
+        QUERY_CACHE.invalidate(collection_name)
+
+    report = {
+        "collection": collection_name,
+        "sent": sent,
+        "inserted": sent - len(failed),
+        "failed": len(failed),
+        "retried": retried,
+        "seconds": round(time.perf_counter() - started, 3),
+        "errors": [{"message": error.message, "properties": error.object_.properties}
+                   for error in failed[:MAX_REPORTED_ERRORS]],
+    }
+    inc("weaviate_objects_total", report["inserted"], collection=collection_name, status="inserted")
+    inc("weaviate_objects_total", report["failed"], collection=collection_name, status="failed")
+
+    print(f"✓ {report['inserted']} objects written to '{collection_name}' in {report['seconds']}s"
+          + (f", {report['failed']} failed (e.g. {report['errors'][0]['message']})" if report["failed"] else ""))
+    return report
+
+
+def insert_events(events, **batch_options):
+    """
+    events: Iterable of dicts with keys: event_type, explanation, image
+    """
+    return ingest_objects("ImageData", events, **batch_options)
+
+
+def main():
+    """Streams event logs (e.g. a batch run's */events.jsonl) into the 'Commentary' collection."""
+    from SubtitleRules.event_store import iter_events
+    from SubtitleRules.json_extract import events_from_record
+
+    parser = argparse.ArgumentParser(description="Batch-load extracted events into Weaviate.")
+    parser.add_argument("event_files", nargs="+")
+    parser.add_argument("--batch-size", type=int, help="fixed batch size (default: dynamic)")
+    parser.add_argument("--concurrent-requests", type=int, default=DEFAULT_CONCURRENT_REQUESTS)
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES)
+    args = parser.parse_args()
+
+    def objects():
+        for path in args.event_files:
+            match_id = match_id_for(path)
+            for record in iter_events(path):
+                for event in events_from_record(record):
+                    yield commentary_properties(event, match_id)
+
+    ingest_objects("Commentary", objects(), batch_size=args.batch_size,
+                   concurrent_requests=args.concurrent_requests, max_retries=args.max_retries)
 
-    for event in events:
-        collection.data.insert(event)
 
-    print(f"✓ {len(events)} events inserted into 'ImageData' collection.")
-    wv_client.close()
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,386 @@
-from Weaviate_db.client import get_client_cloud
-from weaviate.classes.query import Filter
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
 
-def fetch_events_by_type(event_type, limit=20):
+from Weaviate_db.connection import get_client
+from weaviate.classes.query import Filter, MetadataQuery, Sort
+from SubtitleRules.taxonomy import canonical_id, raw_variants
+from Instrumentation.metrics import inc, span
+
+DEFAULT_PAGE_SIZE = 500
+COMMENTARY_PROPERTIES = ["event_type", "player", "team", "match_id", "timestamp", "minute", "inserted_at"]
+
+# Query cache settings: WEAVIATE_QUERY_CACHE_TTL=<seconds>, WEAVIATE_QUERY_CACHE_PATH=<sqlite file>
+# shares results between processes (e.g. Streamlit workers), WEAVIATE_QUERY_CACHE_DISABLED=1 turns it off
+CACHE_TTL_ENV = "WEAVIATE_QUERY_CACHE_TTL"
+CACHE_PATH_ENV = "WEAVIATE_QUERY_CACHE_PATH"
+CACHE_DISABLED_ENV = "WEAVIATE_QUERY_CACHE_DISABLED"
+DEFAULT_CACHE_TTL = 300
+DEFAULT_CACHE_ENTRIES = 256
+MAX_CACHED_OBJECTS = 1000   # larger results are not kept
+
+
+def _encode_value(value):
+    """JSON for a cached result; datetimes (e.g. 'inserted_at') are tagged so they come back as datetimes."""
+    def default(item):
+        if isinstance(item, datetime):
+            return {"__datetime__": item.isoformat()}
+        return str(item)
+    return json.dumps(value, default=default)
+
+
+def _decode_value(text):
+    def object_hook(item):
+        if len(item) == 1 and "__datetime__" in item:
+            return datetime.fromisoformat(item["__datetime__"])
+        return item
+    return json.loads(text, object_hook=object_hook)
+
+
+class QueryCache:
+    """
+    TTL + LRU cache of query results, keyed by collection, filter and limit.
+
+    Every collection has a generation number that invalidate() bumps; the
+    ingestion functions in insert.py call it after writing, so the next
+    query reads fresh data. With `path`, results and generations are also
+    kept in SQLite and shared by every process using the same file.
+    Results are stored as JSON in memory and on disk alike, so every hit
+    (and the miss that filled it) returns the same types: JSON values
+    plus datetimes; other values become strings.
+    """
+
+    def __init__(self, ttl=None, max_entries=DEFAULT_CACHE_ENTRIES, path=None, enabled=None):
+        if enabled is None:
+            enabled = os.getenv(CACHE_DISABLED_ENV, "").lower() not in ("1", "true", "yes")
+        self.enabled = enabled
+        self.ttl = float(ttl if ttl is not None else os.getenv(CACHE_TTL_ENV, DEFAULT_CACHE_TTL))
+        self.max_entries = max_entries
+        self.path = path if path is not None else os.getenv(CACHE_PATH_ENV)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (collection, generation, expires_at, JSON value)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled and self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    collection TEXT,
+                    generation INTEGER,
+                    expires_at REAL,
+                    value TEXT
+                )"""
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS generations (collection TEXT PRIMARY KEY, generation INTEGER)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(collection, **params):
+        return json.dumps([collection, params], sort_keys=True, default=str)
+
+    def generation(self, collection):
+        if self._conn is None:
+            return self._generations.get(collection, 0)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generation FROM generations WHERE collection = ?", (collection,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def _count(self, collection, result):
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        inc("weaviate_query_cache_total", collection=collection, result=result)
+
+    def get(self, collection, key):
+        """Cached result (a fresh copy) or None."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        generation = self.generation(collection)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] == generation and entry[2] > now:
+                    self._entries.move_to_end(key)
+                    self._count(collection, "hit")
+                    return _decode_value(entry[3])
+                del self._entries[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT generation, expires_at, value FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[0] == generation and row[1] > now:
+                    self._store(key, (collection, generation, row[1], row[2]))
+                    self._count(collection, "hit")
+                    return _decode_value(row[2])
+
+        self._count(collection, "miss")
+        return None
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, collection, key, value, generation):
+        """
+        Stores `value` for the collection `generation` read before the query
+        ran: if a write invalidated the collection meanwhile, the entry is
+        already stale and never served. Returns the stored JSON, or None
+        if the result is not cached.
+        """
+        if not self.enabled or len(value) > MAX_CACHED_OBJECTS:
+            return None
+        encoded = _encode_value(value)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, (collection, generation, expires_at, encoded))
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, collection, generation, expires_at, encoded),
+                )
+                self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+                self._conn.execute(
+                    "DELETE FROM results WHERE key NOT IN "
+                    "(SELECT key FROM results ORDER BY expires_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+                self._conn.commit()
+        return encoded
+
+    def get_or_fetch(self, collection, fetch, **params):
+        """Result of `fetch()` for these query parameters, from the cache when possible."""
+        key = self.make_key(collection, **params)
+        value = self.get(collection, key)
+        if value is not None:
+            return value
+        generation = self.generation(collection)
+        value = fetch()
+        encoded = self.put(collection, key, value, generation)
+        # Same representation as the hits that follow
+        return value if encoded is None else _decode_value(encoded)
+
+    def invalidate(self, collection):
+        """Drops every cached result of `collection` (called after writes)."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] == collection]:
+                del self._entries[key]
+            self._generations[collection] = self._generations.get(collection, 0) + 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT INTO generations VALUES (?, 1) "
+                    "ON CONFLICT(collection) DO UPDATE SET generation = generation + 1",
+                    (collection,),
+                )
+                self._conn.execute("DELETE FROM results WHERE collection = ?", (collection,))
+                self._conn.commit()
+        inc("weaviate_query_cache_invalidations_total", collection=collection)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM results")
+                self._conn.commit()
+
+
+QUERY_CACHE = QueryCache()
+
+
+def event_type_filter(event_type):
+    """
+    Filter matching every stored spelling of the event type's canonical
+    taxonomy id ("Gelbe Karte", "yellow card", ...), or the raw type if unknown.
+    """
+    event_id = canonical_id(event_type)
+    variants = raw_variants(event_id) if event_id else [event_type]
+    return Filter.any_of([Filter.by_property("event_type").equal(v) for v in variants])
+
+
+def event_filters(event_type=None, match_id=None, from_timestamp=None, to_timestamp=None,
+                  from_minute=None, to_minute=None):
+    """
+    Combined 'Commentary' filter, or None. Timestamps are 'HH:MM:SS:FF'
+    strings (compared as text, which orders them correctly), minutes are
+    broadcast minutes; ranges include both ends.
+    """
+    filters = []
+    if event_type:
+        filters.append(event_type_filter(event_type))
+    if match_id:
+        filters.append(Filter.by_property("match_id").equal(match_id))
+    if from_timestamp:
+        filters.append(Filter.by_property("timestamp").greater_or_equal(from_timestamp))
+    if to_timestamp:
+        filters.append(Filter.by_property("timestamp").less_or_equal(to_timestamp))
+    if from_minute is not None:
+        filters.append(Filter.by_property("minute").greater_or_equal(from_minute))
+    if to_minute is not None:
+        filters.append(Filter.by_property("minute").less_or_equal(to_minute))
+    if not filters:
+        return None
+    return filters[0] if len(filters) == 1 else Filter.all_of(filters)
+
+
+def _key_filter(sort_by, value, ascending):
+    """Filter for the rest of a keyset scan: everything at or after `value` in sort order."""
+    target = Filter.by_creation_time() if sort_by is None else Filter.by_property(sort_by)
+    return target.greater_or_equal(value) if ascending else target.less_or_equal(value)
+
+
+def stream_objects(collection_name, filters=None, sort_by=None, ascending=True, properties=None,
+                   page_size=DEFAULT_PAGE_SIZE, wv_client=None):
+    """
+    Yields every object of `collection_name` matching `filters` as a dict
+    of the requested `properties` (all if None) plus its "uuid".
+
+    Objects are sorted on the server by `sort_by` (creation time if None)
+    and read page by page with keyset pagination: each page asks for the
+    objects at or after the last sort value seen, so memory stays at one
+    page however large the collection, and the order holds across pages.
+    Objects sharing the boundary value are skipped by id. Objects without
+    the sort property are only reached in ascending scans (they sort first).
+    Sorting by creation time needs a collection created with timestamp
+    indexing (schema.inverted_index_config()); older collections must pass
+    an indexed `sort_by` property.
+    """
+    collection = (wv_client or get_client()).collections.get(collection_name)
+    if properties is not None and sort_by is not None and sort_by not in properties:
+        properties = list(properties) + [sort_by]
+    sort = (Sort.by_creation_time(ascending=ascending) if sort_by is None
+            else Sort.by_property(sort_by, ascending=ascending))
+
+    boundary = None
+    seen_at_boundary = set()
+    offset = 0
+    pages = 0
+    while True:
+        page_filters = filters
+        if boundary is not None:
+            key_filter = _key_filter(sort_by, boundary, ascending)
+            page_filters = key_filter if filters is None else Filter.all_of([filters, key_filter])
+        limit = page_size + len(seen_at_boundary)
+
+        with span("weaviate_query", collection=collection_name, page=pages):
+            results = collection.query.fetch_objects(
+                filters=page_filters,
+                sort=sort,
+                limit=limit,
+                offset=offset or None,
+                return_properties=properties,
+                return_metadata=MetadataQuery(creation_time=True) if sort_by is None else None,
+            )
+        pages += 1
+        inc("weaviate_query_pages_total", collection=collection_name)
+
+        fresh = [obj for obj in results.objects if str(obj.uuid) not in seen_at_boundary]
+        for obj in fresh:
+            yield {**obj.properties, "uuid": str(obj.uuid)}
+        if not fresh or len(results.objects) < limit:
+            return
+
+        def key(obj):
+            return obj.metadata.creation_time if sort_by is None else obj.properties.get(sort_by)
+
+        last = key(fresh[-1])
+        if last is None:
+            # Objects without the sort property (sorted first) cannot bound a page: go on by offset
+            offset += len(fresh)
+            continue
+        if last != boundary:
+            seen_at_boundary = set()
+        boundary = last
+        offset = 0
+        seen_at_boundary.update(str(obj.uuid) for obj in fresh if key(obj) == last)
+
+
+def stream_events(sort_by="timestamp", ascending=True, properties=COMMENTARY_PROPERTIES,
+                  page_size=DEFAULT_PAGE_SIZE, wv_client=None, **filters):
+    """
+    Streams 'Commentary' events, e.g.
+    stream_events(match_id="FB_BULI_...", from_minute=60, to_minute=75, event_type="goal").
+    `filters` are the keyword arguments of event_filters().
+    """
+    return stream_objects("Commentary", filters=event_filters(**filters), sort_by=sort_by,
+                          ascending=ascending, properties=properties, page_size=page_size,
+                          wv_client=wv_client)
+
+
+def fetch_events_by_type(event_type, limit=20, use_cache=True):
     """
     Fetch events from the 'Commentary' collection filtered by event_type.
     Returns a list of dicts with keys: event_type, explanation, image.
+    Results are served from QUERY_CACHE until they expire or the
+    collection is written to.
     """
-    wv_client = get_client_cloud()
-    collection = wv_client.collections.get("ImageData")
+    def fetch():
+        collection = get_client().collections.get("ImageData")
 
-    # Use Weaviate filter with Filter class
-    results = collection.query.fetch_objects(
-        filters=Filter.by_property("event_type").equal(event_type),
-        limit=limit
-    )
+        # Use Weaviate filter with Filter class
+        with span("weaviate_query", collection="ImageData"):
+            results = collection.query.fetch_objects(
+                filters=event_type_filter(event_type),
+                limit=limit
+            )
 
-    output = []
-    for obj in results.objects:
-        output.append({
-            "event_type": obj.properties.get("event_type"),
-            "explanation": obj.properties.get("explanation"),
-            "image": obj.properties.get("image"),
-        })
+        output = []
+        for obj in results.objects:
+            output.append({
+                "event_type": obj.properties.get("event_type"),
+                "explanation": obj.properties.get("explanation"),
+                "image": obj.properties.get("image"),
+            })
+        return output
 
-    wv_client.close()
-    return output
+    if not use_cache:
+        return fetch()
+    # All spellings of a type share one filter, so they share one entry too
+    return QUERY_CACHE.get_or_fetch("ImageData", fetch, query="events_by_type",
+                                    event_type=canonical_id(event_type) or event_type, limit=limit)
 
 
-def fetch_all_events(limit=50):
+def fetch_all_events(limit=50, use_cache=True, **filters):
     """
-    Fetch all events from the 'Commentary' collection.
+    Fetch events from the 'Commentary' collection in timecode order, at
+    most `limit` (limit=None: all of them), streamed page by page.
     """
-    wv_client = get_client_cloud()
-    collection = wv_client.collections.get("Commentary")
-
-    results = collection.query.fetch_objects(limit=limit)
+    page_size = min(limit, DEFAULT_PAGE_SIZE) if limit else DEFAULT_PAGE_SIZE
 
-    output = []
-    for obj in results.objects:
-        output.append({
-            "event_type": obj.properties.get("event_type"),
-            "explanation": obj.properties.get("explanation"),
-            "image": obj.properties.get("image"),
-        })
+    def fetch():
+        return list(islice(stream_events(page_size=page_size, **filters), limit))
 
-    wv_client.close()
-    return output
+    # A caller's own client may point at another instance: not cached
+    if not use_cache or "wv_client" in filters:
+        return fetch()
+    return QUERY_CACHE.get_or_fetch("Commentary", fetch, query="all_events", filters=filters, limit=limit)
 
 
 # Example usage
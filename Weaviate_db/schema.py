@@ -1,22 +1,31 @@
-from . import client
-from weaviate.classes.config import Property, DataType
+from Weaviate_db.connection import get_client
+from weaviate.classes.config import Configure, Property, DataType
+from Instrumentation.metrics import span
+
+
+def inverted_index_config():
+    """
+    Inverted index settings for new collections: creation/update times are
+    indexed, so stream_objects() can sort and page by creation time.
+    """
+    return Configure.inverted_index(index_timestamps=True)
 
 
 def create_commentary_schema():
-    wv_client = client.get_client_cloud()
-    print("Connected to Weaviate Cloud:", wv_client.is_ready())
+    wv_client = get_client()
+    print("Connected to Weaviate:", wv_client.is_ready())
 
     if "ImageData" not in [c for c in wv_client.collections.list_all()]:
-        wv_client.collections.create(
-            name="ImageData",
-            properties=[
-                Property(name="event_type", data_type=DataType.TEXT),
-                Property(name="explanation", data_type=DataType.TEXT),
-                Property(name="image", data_type=DataType.TEXT),
-            ]
-        )
+        with span("weaviate_create_collection", collection="ImageData"):
+            wv_client.collections.create(
+                name="ImageData",
+                inverted_index_config=inverted_index_config(),
+                properties=[
+                    Property(name="event_type", data_type=DataType.TEXT),
+                    Property(name="explanation", data_type=DataType.TEXT),
+                    Property(name="image", data_type=DataType.TEXT),
+                ]
+            )
         print("✓ Created 'ImageData' collection with properties: event_type, explanation, image")
     else:
-        print("✓ 'ImageData' collection already exists.")
-
-    wv_client.close()
\ No newline at end of file
+        print("✓ 'ImageData' collection already exists.")
\ No newline at end of file
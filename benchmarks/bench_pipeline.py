@@ -0,0 +1,217 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root directory to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from openai import AsyncAzureOpenAI
+
+from benchmarks.mock_llm_server import DEFAULT_RESPONSES_PATH, MockLLMServer, load_canned_responses
+from SubtitleRules.ad_segmenter import strip_ads
+from SubtitleRules.chunker import DEFAULT_MAX_TOKENS, chunk_cues
+from SubtitleRules.dedup import dedup_events
+from SubtitleRules.extraction import run_async_extraction
+from SubtitleRules.json_extract import parse_llm_content
+from SubtitleRules.relevance import filter_chunks
+from SubtitleRules.stl_parser import iter_stl_cues
+
+DEFAULT_DATA_GLOB = str(project_root / "SubtitleRules" / "Data" / "*.stl")
+DEFAULT_RESULTS_DIR = str(project_root / "benchmarks" / "results")
+STAGES = ["parse", "ad_filter", "chunk", "prefilter", "extraction", "json_repair", "dedup", "weaviate_insert"]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class StageTimer:
+    """Accumulates wall time and processed items per stage across all files."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        record = {"items": 0}
+        started = time.perf_counter()
+        yield record
+        seconds = time.perf_counter() - started
+        total = self.stages.setdefault(name, {"seconds": 0.0, "items": 0})
+        total["seconds"] += seconds
+        total["items"] += record["items"]
+        total["peak_rss_mb"] = peak_rss_mb()
+
+    def report(self):
+        report = {}
+        for name in STAGES:
+            if name in self.stages:
+                stage = dict(self.stages[name])
+                stage["seconds"] = round(stage["seconds"], 4)
+                stage["items_per_second"] = round(stage["items"] / stage["seconds"], 1) if stage["seconds"] else None
+                report[name] = stage
+        return report
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def benchmark_file(stl_file, timer, server_url, concurrency, max_tokens, wv_client=None):
+    """Runs every pipeline stage on one subtitle file."""
+    with timer.stage("parse") as record:
+        cues = list(iter_stl_cues(stl_file))
+        record["items"] = len(cues)
+
+    with timer.stage("ad_filter") as record:
+        cues, _ = strip_ads(cues)
+        record["items"] = len(cues)
+
+    with timer.stage("chunk") as record:
+        chunks = list(chunk_cues(cues, max_tokens=max_tokens))
+        record["items"] = len(chunks)
+
+    with timer.stage("prefilter") as record:
+        record["items"] = len(chunks)
+        chunks, _ = filter_chunks(chunks)
+
+    # A fresh client per file: its connection pool belongs to the event loop of this run
+    client = AsyncAzureOpenAI(azure_endpoint=server_url, api_key="benchmark",
+                              api_version="2025-01-01-preview", max_retries=0)
+    with timer.stage("extraction") as record:
+        responses = run_async_extraction(client, chunks, concurrency=concurrency, base_delay=0.05)
+        record["items"] = len(responses)
+
+    with timer.stage("json_repair") as record:
+        events = []
+        for chunk, response in zip(chunks, responses):
+            events.extend({**r, "chunk_span": [chunk.start, chunk.end]}
+                          for r in parse_llm_content(response.choices[0].message.content) if "event_type" in r)
+        record["items"] = len(responses)
+
+    with timer.stage("dedup") as record:
+        record["items"] = len(events)
+        unique = dedup_events(events)
+
+    if wv_client is not None:
+        from SubtitleRules.Subtitle_preprocessinf import insert_to_weaviate
+
+        with timer.stage("weaviate_insert") as record:
+            insert_to_weaviate(wv_client, unique, match_id=Path(stl_file).stem)
+            record["items"] = len(unique)
+
+    return {"stl_file": os.path.basename(stl_file), "cues": len(cues), "chunks": len(chunks),
+            "events": len(events), "unique_events": len(unique)}
+
+
+def run_benchmark(stl_files, latency=0.5, jitter=0.1, error_rate=0.0, concurrency=8,
+                  max_tokens=DEFAULT_MAX_TOKENS, responses_path=DEFAULT_RESPONSES_PATH,
+                  weaviate_host=None, seed=0):
+    """Benchmarks the pipeline over `stl_files` against a local mock LLM server; returns the result dict."""
+    timer = StageTimer()
+    files = []
+    wv_client = None
+    if weaviate_host:
+        import weaviate
+        host, _, port = weaviate_host.partition(":")
+        wv_client = weaviate.connect_to_local(host=host, port=int(port or 8080))
+
+    server = MockLLMServer(responses=load_canned_responses(responses_path), latency=latency,
+                           jitter=jitter, error_rate=error_rate, seed=seed)
+    started = time.perf_counter()
+    try:
+        with server:
+            for stl_file in stl_files:
+                print(f"⏱️ {os.path.basename(stl_file)}")
+                files.append(benchmark_file(stl_file, timer, server.url, concurrency, max_tokens, wv_client))
+    finally:
+        if wv_client is not None:
+            wv_client.close()
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"latency": latency, "jitter": jitter, "error_rate": error_rate, "concurrency": concurrency,
+                   "max_tokens": max_tokens, "weaviate": weaviate_host, "seed": seed},
+        "wall_seconds": round(wall_seconds, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "requests": server.stats,
+        "stages": timer.report(),
+        "files": files,
+    }
+
+
+def compare(results, baseline):
+    """Prints per-stage wall time changes against a baseline result file."""
+    print(f"📊 Against baseline {baseline.get('created_at')} ({baseline.get('git_commit')}):")
+    for name, stage in results["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or not before["seconds"]:
+            print(f"   {name:16s} {stage['seconds']:9.4f}s   (new)")
+            continue
+        change = 100 * (stage["seconds"] - before["seconds"]) / before["seconds"]
+        print(f"   {name:16s} {stage['seconds']:9.4f}s   {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the subtitle-to-events pipeline offline.")
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_DATA_GLOB], help=".stl files or glob patterns")
+    parser.add_argument("--latency", type=float, default=0.5, help="mock LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 429/500")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS)
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES_PATH, help="event log with canned responses")
+    parser.add_argument("--weaviate", metavar="HOST[:PORT]",
+                        help="also time insertion into a local Weaviate (docker-compose.yml)")
+    parser.add_argument("--output", help=f"result file (default: {DEFAULT_RESULTS_DIR}/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    stl_files = sorted({f for pattern in args.paths for f in glob.glob(pattern)})
+    if not stl_files:
+        print(f"⚠️ No .stl files found in {args.paths}")
+        return
+
+    results = run_benchmark(stl_files, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            concurrency=args.concurrency, max_tokens=args.max_tokens,
+                            responses_path=args.responses, weaviate_host=args.weaviate)
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'stage':16s} {'seconds':>10s} {'items':>8s} {'items/s':>10s} {'peak RSS MB':>12s}")
+    for name, stage in results["stages"].items():
+        print(f"{name:16s} {stage['seconds']:10.4f} {stage['items']:8d} "
+              f"{stage['items_per_second'] or 0:10.1f} {stage['peak_rss_mb']:12.1f}")
+    print(f"🤖 LLM requests: {results['requests']}")
+    print(f"✅ {len(stl_files)} files in {results['wall_seconds']}s, results saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
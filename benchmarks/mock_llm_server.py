@@ -0,0 +1,177 @@
+import argparse
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the project root directory to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from SubtitleRules.event_store import iter_events
+
+DEFAULT_RESPONSES_PATH = str(project_root / "SubtitleRules" / "match_events.json")
+_CHAT_PATH_RE = re.compile(r"^/openai/deployments/([^/]+)/chat/completions")
+
+
+def load_canned_responses(path=DEFAULT_RESPONSES_PATH, events_per_response=5):
+    """
+    Response bodies taken from a saved event log: every legacy raw_text
+    record is replayed verbatim (free text with embedded JSON, exercising the
+    repair path), structured events are grouped as {"events": [...]}.
+    """
+    responses, events = [], []
+    for record in iter_events(path):
+        if isinstance(record.get("raw_text"), str):
+            responses.append(record["raw_text"])
+        elif "event_type" in record:
+            events.append({key: record.get(key, "") for key in ("timestamp", "event_type", "player", "team")})
+    for start in range(0, len(events), events_per_response):
+        responses.append(json.dumps({"events": events[start:start + events_per_response]}, ensure_ascii=False))
+    return responses or [json.dumps({"events": []})]
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Azure OpenAI chat completions endpoint
+    (POST /openai/deployments/<deployment>/chat/completions). Every request
+    sleeps `latency` ± `jitter` seconds, fails with 429/500 at `error_rate`,
+    and otherwise answers with the next canned response. GET /stats returns
+    the request counters.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, responses=None, latency=0.5, jitter=0.1,
+                 error_rate=0.0, seed=None):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._responses = itertools.cycle(responses or load_canned_responses())
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "completed": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def next_answer(self, prompt_chars):
+        """(status, delay, content) for the next request; updates the counters."""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            if self._random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return self._random.choice((429, 500)), delay / 10, None
+            content = next(self._responses)
+            self.stats["completed"] += 1
+            self.stats["prompt_tokens"] += prompt_chars // 4
+            self.stats["completion_tokens"] += len(content) // 4
+            return 200, delay, content
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.startswith("/stats"):
+            with self.server._lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        match = _CHAT_PATH_RE.match(self.path)
+        if not match:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        request = json.loads(body or b"{}")
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        status, delay, content = self.server.next_answer(prompt_chars)
+        time.sleep(delay)
+
+        if status != 200:
+            self._send_json(status, {"error": {"code": str(status), "message": "mock server error"}},
+                            headers={"Retry-After": "0"} if status == 429 else None)
+            return
+
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": match.group(1),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_chars // 4 + len(content) // 4,
+            },
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock Azure OpenAI chat endpoint.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES_PATH)
+    args = parser.parse_args()
+
+    server = MockLLMServer(port=args.port, responses=load_canned_responses(args.responses),
+                           latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    print(f"🤖 Mock Azure OpenAI endpoint on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import pytest
+
+from SubtitleRules.ad_segmenter import cue_features, detect_ad_blocks
+from SubtitleRules.stl_parser import FPS, Cue
+
+COMMENTARY = [
+    "Leverkusen will in die Europa League.",
+    "Die Europameisterschaft ist noch weit weg.",
+    "Und jetzt kommt Wirtz über links.",
+    "Der Abonnent auf die Rote Karte heute: Xhaka.",
+    "Der Ball geht ins Aus, Einwurf für Dortmund.",
+]
+
+ADS = [
+    "Sicher dir bis zu 600 Euro Cashback",
+    "Jetzt starten unter datif.de",
+    "Die Bundesliga auf Sky wird präsentiert von",
+    "Neukunden-Bonus: 100 € für deine Sportwette bei Tipico",
+    "Mehr auf www.sky.de",
+]
+
+
+def cues(texts, seconds=3):
+    return [Cue(i * seconds * FPS, (i + 1) * seconds * FPS - 1, text) for i, text in enumerate(texts)]
+
+
+def ad_marker_scores(texts):
+    return cue_features(cues(texts))[:, 1]
+
+
+@pytest.mark.parametrize("text", COMMENTARY)
+def test_commentary_has_no_ad_markers(text):
+    assert ad_marker_scores([text])[0] == 0
+
+
+@pytest.mark.parametrize("text", ADS)
+def test_ads_have_ad_markers(text):
+    assert ad_marker_scores([text])[0] > 0
+
+
+def test_play_by_play_is_not_flagged():
+    texts = [
+        "Jetzt kommt Wirtz über links.",
+        "Und jetzt wieder Leverkusen im Vorwärtsgang.",
+        "Das Spiel ist jetzt völlig offen.",
+        "Die Europa League wäre für Freiburg zu wenig.",
+        "Jetzt flankt Grimaldo, aber zu weit.",
+        "Kane steht jetzt ganz allein im Zentrum.",
+        "Europas beste Abwehr hat jetzt Probleme.",
+        "Da ist jetzt viel Platz auf der rechten Seite.",
+        "Musiala jetzt mit dem Dribbling.",
+        "Und jetzt der Ball zurück zu Neuer.",
+    ]
+    mask, blocks = detect_ad_blocks(cues(texts))
+    assert not mask.any() and blocks == []
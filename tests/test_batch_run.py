@@ -0,0 +1,15 @@
+import os
+
+from SubtitleRules.batch_run import match_dir_names
+
+
+def test_files_of_one_directory_keep_their_stem():
+    names = match_dir_names([os.path.join("Data", "match1.stl"), os.path.join("Data", "match2.stl")])
+    assert sorted(names.values()) == ["match1", "match2"]
+
+
+def test_same_name_in_different_subfolders_gets_separate_folders():
+    files = [os.path.join("Data", "a", "feed.stl"), os.path.join("Data", "b", "feed.stl"),
+             os.path.join("Data", "feed.stl")]
+    names = match_dir_names(files)
+    assert names == {files[0]: "a__feed", files[1]: "b__feed", files[2]: "feed"}
@@ -0,0 +1,53 @@
+import shutil
+from pathlib import Path
+
+from SubtitleRules.checkpoint import RunCheckpoint, checkpoint_path
+from SubtitleRules.event_store import append_events, read_events
+
+BUNDLED_EVENTS = Path(__file__).parent.parent / "SubtitleRules" / "match_events.json"
+
+
+def test_prune_leaves_legacy_log_alone(tmp_path):
+    output = tmp_path / "match_events.json"
+    shutil.copy(BUNDLED_EVENTS, output)
+    before = read_events(str(output))
+
+    checkpoint = RunCheckpoint(checkpoint_path(str(output)), "match.stl")
+    assert checkpoint.prune(str(output), live_hashes=[]) == 0
+    assert read_events(str(output)) == before
+
+
+def test_prune_drops_only_this_files_stale_chunks(tmp_path):
+    output = str(tmp_path / "events.jsonl")
+    manifest = checkpoint_path(output)
+    append_events(output, [
+        {"event_type": "corner"},                                                      # legacy, untagged
+        {"event_type": "foul", "chunk_hash": "unknown"},                                # hash not in manifest
+        {"event_type": "goal", "chunk_hash": "m1-a", "stl_file": "match1.stl"},        # other match
+        {"event_type": "goal", "chunk_hash": "old", "stl_file": "match2.stl"},          # stale
+        {"event_type": "save", "chunk_hash": "live", "stl_file": "match2.stl"},         # live
+        {"event_type": "foul", "chunk_hash": "merged", "stl_file": "match2.stl"},       # merged into "old"
+        {"event_type": "offside", "chunk_hash": "legacy-entry"},                        # untagged manifest entry
+    ])
+    append_events(manifest, [{"chunk_hash": "legacy-entry"}])
+
+    match1 = RunCheckpoint(manifest, "data/match1.stl")
+    match1.mark_done("m1-a")
+    match2 = RunCheckpoint(manifest, "data/match2.stl")
+    match2.mark_done("old")
+    match2.mark_done("live")
+    match2.mark_done("merged", merged_into={"old"})
+
+    # Match 2 is revised: only "live" and "merged" are still part of it
+    assert match2.prune(output, live_hashes=["live", "merged"]) == 2
+
+    hashes = [event.get("chunk_hash") for event in read_events(output)]
+    assert hashes == [None, "unknown", "m1-a", "live", "legacy-entry"]
+    assert not match2.is_done("merged")
+    assert match2.is_done("live") and match2.is_done("legacy-entry")
+
+    # Processing match 1 afterwards keeps match 2's events
+    match1 = RunCheckpoint(manifest, "data/match1.stl")
+    assert match1.prune(output, live_hashes=["m1-a"]) == 0
+    assert match1.is_done("m1-a") and not match1.is_done("live")
+    assert len(read_events(output)) == 5
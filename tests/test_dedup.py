@@ -0,0 +1,63 @@
+from SubtitleRules.dedup import EventDedupIndex, dedup_events
+
+FIRST_CHUNK = [0, 1500]         # 00:00:00:00 - 00:01:00:00
+SECOND_CHUNK = [1250, 3000]     # overlaps the first one from 00:00:50:00
+
+
+def event(event_type, timestamp, chunk_span, **fields):
+    return {"event_type": event_type, "timestamp": timestamp, "chunk_span": chunk_span, **fields}
+
+
+def test_overlapping_chunks_report_one_event():
+    unique = dedup_events([
+        event("corner", "00:00:55:10", FIRST_CHUNK, team="Kiel"),
+        event("Ecke", "00:00:55:10", SECOND_CHUNK, team="Holstein Kiel"),
+    ])
+    assert len(unique) == 1
+    assert unique[0]["mentions"] == 2
+
+
+def test_close_same_team_events_of_one_chunk_stay_apart():
+    unique = dedup_events([
+        event("corner", "00:00:20:00", FIRST_CHUNK, team="Kiel"),
+        event("corner", "00:00:23:00", FIRST_CHUNK, team="Kiel"),
+        event("foul", "00:00:30:00", FIRST_CHUNK, team="Augsburg"),
+        event("foul", "00:00:31:00", FIRST_CHUNK, team="Augsburg"),
+    ])
+    assert len(unique) == 4
+
+
+def test_events_outside_the_chunk_overlap_stay_apart():
+    # Both chunks report a Kiel corner, but 10s apart and before the overlap starts
+    unique = dedup_events([
+        event("corner", "00:00:40:00", FIRST_CHUNK, team="Kiel"),
+        event("corner", "00:00:52:00", SECOND_CHUNK, team="Kiel"),
+    ])
+    assert len(unique) == 2
+
+
+def test_events_without_chunk_or_identity_are_never_merged():
+    unique = dedup_events([
+        {"event_type": "corner"},
+        {"event_type": "corner"},
+        event("corner", "", FIRST_CHUNK),
+        event("corner", "", SECOND_CHUNK),
+        {"event_type": "goal", "timestamp": "00:10:00:00", "player": "Kane"},
+        {"event_type": "goal", "timestamp": "00:10:00:00", "player": "Kane"},
+    ])
+    assert len(unique) == 6
+
+
+def test_untimed_events_with_player_merge_across_overlapping_chunks():
+    unique = dedup_events([
+        event("yellow card", None, FIRST_CHUNK, player="Kane"),
+        event("Gelbe Karte", None, SECOND_CHUNK, player="Harry Kane"),
+    ])
+    assert len(unique) == 1
+
+
+def test_matches_sharing_a_log_do_not_merge():
+    index = EventDedupIndex()
+    index.add(event("goal", "00:00:55:00", FIRST_CHUNK, player="Kane", stl_file="match1.stl"))
+    _, is_new = index.add(event("goal", "00:00:55:00", SECOND_CHUNK, player="Kane", stl_file="match2.stl"))
+    assert is_new
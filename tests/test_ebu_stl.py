@@ -0,0 +1,72 @@
+import struct
+from pathlib import Path
+
+from SubtitleRules.ebu_stl import GSI_SIZE, TEXT_FIELD_SIZE, is_ebu_stl, iter_ebu_cues, read_gsi
+from SubtitleRules.stl_parser import Cue
+
+TTI_HEADER = struct.Struct("<BHBB4B4BBBB")
+
+
+def gsi(disk_format="STL25.01", blocks=0, subtitles=0):
+    header = bytearray(b" " * GSI_SIZE)
+    header[0:3] = b"850"
+    header[3:11] = disk_format.encode("ascii")
+    header[12:14] = b"00"
+    header[14:16] = b"08"
+    header[16:48] = b"Kiel - Augsburg".ljust(32)
+    header[238:243] = b"%05d" % blocks
+    header[243:248] = b"%05d" % subtitles
+    return bytes(header)
+
+
+def tti(number, text, tc_in, tc_out, ebn=0xFF, comment=0):
+    assert len(text) <= TEXT_FIELD_SIZE
+    header = TTI_HEADER.pack(0, number, ebn, 0, *tc_in, *tc_out, 22, 2, comment)
+    return header + text.ljust(TEXT_FIELD_SIZE, b"\x8f")
+
+
+def write_stl(path, blocks, disk_format="STL25.01"):
+    path.write_bytes(gsi(disk_format, len(blocks), len(blocks)) + b"".join(blocks))
+    return path
+
+
+def test_binary_file_is_parsed_into_cues(tmp_path):
+    # ISO 6937: 0xC8 is a diaeresis written before its letter, 0xFB is ß, 0x8A a line break
+    first_part = b"Eckball von der".ljust(TEXT_FIELD_SIZE)
+    path = write_stl(tmp_path / "match.stl", [
+        tti(1, b"Tor f\xc8ur\x8aKiel!", (0, 0, 1, 0), (0, 0, 3, 12)),
+        tti(2, first_part, (0, 0, 4, 0), (0, 0, 6, 0), ebn=0),
+        tti(2, b"Stra\xfbenseite", (0, 0, 4, 0), (0, 0, 6, 0)),
+        tti(3, b"user data", (0, 0, 7, 0), (0, 0, 8, 0), ebn=0xFE),
+        tti(4, b"Kommentar", (0, 0, 8, 0), (0, 0, 9, 0), comment=1),
+        tti(5, b"Gelbe Karte", (0, 1, 0, 24), (0, 1, 2, 0)),
+    ])
+
+    assert is_ebu_stl(path)
+    assert list(iter_ebu_cues(path)) == [
+        Cue(25, 87, "Tor für Kiel!", "00:00:01:00", "00:00:03:12"),
+        Cue(100, 150, "Eckball von der Straßenseite", "00:00:04:00", "00:00:06:00"),
+        Cue(1524, 1550, "Gelbe Karte", "00:01:00:24", "00:01:02:00"),
+    ]
+
+
+def test_gsi_header_fields(tmp_path):
+    path = write_stl(tmp_path / "match.stl", [tti(1, b"Anpfiff", (0, 0, 0, 0), (0, 0, 1, 0))], "STL30.01")
+    with open(path, "rb") as f:
+        header = read_gsi(memoryview(f.read()))
+    assert (header.code_page, header.disk_format, header.fps) == ("850", "STL30.01", 30)
+    assert (header.code_table, header.language, header.title) == ("00", "08", "Kiel - Augsburg")
+    assert (header.tti_blocks, header.subtitles) == (1, 1)
+
+
+def test_30fps_frames_are_converted(tmp_path):
+    path = write_stl(tmp_path / "match.stl", [tti(1, b"Anpfiff", (0, 0, 0, 29), (0, 0, 1, 15))], "STL30.01")
+    cue, = iter_ebu_cues(path)
+    # Frame 29 of 30 is frame 24 of 25, frame 15 of 30 is frame 12 (rounded half to even)
+    assert (cue.start, cue.end) == (24, 37)
+    assert (cue.start_timecode, cue.end_timecode) == ("00:00:00:29", "00:00:01:15")
+
+
+def test_text_stl_files_are_not_binary_stl():
+    data = Path(__file__).parent.parent / "SubtitleRules" / "Data"
+    assert not any(is_ebu_stl(path) for path in data.glob("*.stl"))
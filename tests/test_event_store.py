@@ -0,0 +1,37 @@
+import gzip
+import json
+from pathlib import Path
+
+from SubtitleRules.event_store import append_events, compact, iter_events, read_events, write_events
+
+EVENTS = [{"event_type": "goal", "player": "Wirtz"}, {"event_type": "corner", "team": "Kiel"}]
+
+
+def test_paths_may_be_path_objects(tmp_path):
+    log = tmp_path / "events.jsonl"
+    assert append_events(log, EVENTS[:1]) == 1
+    assert append_events(log, EVENTS[1:]) == 1
+    assert read_events(log) == EVENTS
+
+    assert write_events(log, EVENTS[:1]) == 1
+    assert list(iter_events(log)) == EVENTS[:1]
+
+    compressed = tmp_path / "events.jsonl.gz"
+    assert compact(log, compressed) == 1
+    with gzip.open(compressed, "rt", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == EVENTS[:1]
+
+
+def test_legacy_json_is_read_and_converted_on_append(tmp_path):
+    log = tmp_path / "events.json"
+    log.write_text(json.dumps(EVENTS[:1]), encoding="utf-8")
+    assert read_events(log) == EVENTS[:1]
+
+    append_events(log, EVENTS[1:])
+    assert log.read_text(encoding="utf-8").splitlines()[0].startswith("{")
+    assert read_events(log) == EVENTS
+
+
+def test_bundled_legacy_log_reads_from_a_path():
+    events = read_events(Path(__file__).parent.parent / "SubtitleRules" / "match_events.json")
+    assert events and all(isinstance(event, dict) for event in events)
@@ -0,0 +1,56 @@
+import time
+
+from SubtitleRules.json_extract import extract_json_events, iter_json_values, parse_llm_content
+
+GOAL = {"timestamp": "00:12:03:10", "event_type": "goal", "player": "Kane", "team": "Bayern"}
+CORNER = {"timestamp": "00:14:40:00", "event_type": "corner", "player": "", "team": "Leverkusen"}
+
+
+def test_fenced_output():
+    text = 'Here are the events:\n```json\n[{"timestamp": "00:12:03:10", "event_type": "goal", ' \
+           '"player": "Kane", "team": "Bayern"}]\n```'
+    assert extract_json_events(text) == [GOAL]
+
+
+def test_trailing_prose_and_several_blocks():
+    text = ('{"events": [{"timestamp": "00:12:03:10", "event_type": "goal", "player": "Kane", "team": "Bayern"}]}'
+            ' Also: {"timestamp": "00:14:40:00", "event_type": "corner", "player": "", "team": "Leverkusen"}'
+            ' That is all (no more [events] here).')
+    assert extract_json_events(text) == [GOAL, CORNER]
+
+
+def test_truncated_last_object_keeps_the_complete_ones():
+    text = ('{"events": [{"timestamp": "00:12:03:10", "event_type": "goal", "player": "Kane", "team": "Bayern"}, '
+            '{"timestamp": "00:14:40:00", "event_type": "corner", "player": "", "team": "Leverkusen"}, '
+            '{"timestamp": "00:15:0')
+    assert extract_json_events(text) == [GOAL, CORNER]
+
+
+def test_nested_events_object():
+    assert list(iter_json_values('x {"events": [{"event_type": "goal"}]} y')) == [{"events": [{"event_type": "goal"}]}]
+    assert parse_llm_content('{"events": [{"timestamp": "00:12:03:10", "event_type": "goal", '
+                             '"player": "Kane", "team": "Bayern"}]}') == [GOAL]
+
+
+def test_braces_inside_strings():
+    text = 'Result: {"event_type": "foul", "player": "Müller {c}", "team": "Bay]ern \\"FCB\\" [x"} done'
+    assert extract_json_events(text) == [{"event_type": "foul", "player": "Müller {c}", "team": 'Bay]ern "FCB" [x'}]
+
+
+def test_invalid_block_is_scanned_inside():
+    text = '[not json, {"event_type": "goal", "player": "Kane"}]'
+    assert extract_json_events(text) == [{"event_type": "goal", "player": "Kane"}]
+
+
+def test_unparseable_text_is_kept_raw():
+    assert parse_llm_content("No events in this chunk.") == [{"raw_text": "No events in this chunk."}]
+
+
+def test_truncated_long_response_is_scanned_in_linear_time():
+    # Every unclosed opener used to rescan the text up to its end
+    events = ", ".join('{"event_type": "foul", "player": "P%d", "extra": [[[1]]]}' % i for i in range(5000))
+    truncated = '{"events": [' + events + ', {"event_type": "goal", "player": "Kan'
+    started = time.perf_counter()
+    assert len(extract_json_events(truncated)) == 5000
+    assert list(iter_json_values("[" * 50000)) == []
+    assert time.perf_counter() - started < 5
@@ -0,0 +1,61 @@
+import warnings
+from pathlib import Path
+
+from SubtitleRules.live_tail import DetectingCueAssembler, follow_stl_cues
+from SubtitleRules.stl_parser import iter_stl_cues
+from SubtitleRules.timecode import FrameOverflowWarning
+
+FEED = Path(__file__).parent.parent / "SubtitleRules" / "Data" / "FB_BULI_Kiel_Augsburg_15_Spieltag_2425_PGM.stl"
+
+
+def clamped_at_25(caught):
+    # The feed also has a few fields of 30/31, which are clamped at 30 fps as well
+    return [w for w in caught if issubclass(w.category, FrameOverflowWarning) and ">= 25" in str(w.message)]
+
+
+def assemble(lines, **kwargs):
+    assembler = DetectingCueAssembler(**kwargs)
+    cues = [cue for line in lines for cue in assembler.feed(line)]
+    return assembler, cues + assembler.flush()
+
+
+def test_30fps_feed_is_detected_from_its_first_timecodes():
+    lines = FEED.read_text(encoding="utf-8").splitlines()[:200]
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assembler, cues = assemble(lines)
+    assert not clamped_at_25(caught)
+    assert assembler.source_fps == 30
+    expected = list(iter_stl_cues(FEED, source_fps=30))[:len(cues)]
+    assert cues == expected
+
+
+def test_25fps_feed_waits_for_enough_timecodes():
+    lines = [f"00:00:{second:02d}:{second % 25:02d},00:00:{second:02d}:24,Cue {second}" for second in range(30)]
+    assembler = DetectingCueAssembler()
+    assert [cue for line in lines[:5] for cue in assembler.feed(line)] == []
+    assert assembler.flush() == []
+
+    cues = [cue for line in lines[5:] for cue in assembler.feed(line)] + assembler.flush()
+    assert assembler.source_fps == 25
+    assert [cue.text for cue in cues] == [f"Cue {second}" for second in range(30)]
+    assert cues[1].start == 25 + 1
+
+
+def test_given_rate_skips_detection():
+    assembler, cues = assemble(["00:00:01:20,00:00:02:00,Anpfiff"], source_fps=30)
+    assert cues[0].start == 25 + round(20 * 25 / 30)
+
+
+def test_follow_reads_a_growing_30fps_file(tmp_path):
+    feed = tmp_path / "live.stl"
+    feed.write_text("\n".join(FEED.read_text(encoding="utf-8").splitlines()[:100]) + "\n", encoding="utf-8")
+    polls = iter(range(3))
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        batches = list(follow_stl_cues(feed, poll_interval=0, idle_flush=0,
+                                       should_stop=lambda: next(polls, None) is None))
+    assert not clamped_at_25(caught)
+    cues = [cue for batch in batches for cue in batch]
+    assert cues == list(iter_stl_cues(feed))
@@ -0,0 +1,18 @@
+from Instrumentation.metrics import MetricsRegistry, escape_label_value
+
+
+def test_label_values_are_escaped():
+    assert escape_label_value('a\\b "c"\nd') == 'a\\\\b \\"c\\"\\nd'
+
+    registry = MetricsRegistry(enabled=True)
+    registry.inc("llm_failures_total", error='Bad "quote"\nline')
+    assert 'llm_failures_total{error="Bad \\"quote\\"\\nline"} 1' in registry.prometheus_text().splitlines()
+
+
+def test_missing_status_is_labelled_unknown():
+    registry = MetricsRegistry(enabled=True)
+    registry.inc("llm_retries_total", stage="extraction", status=None, error="APIConnectionError")
+    registry.inc("llm_retries_total", stage="extraction", status=429, error="RateLimitError")
+    lines = registry.prometheus_text().splitlines()
+    assert 'llm_retries_total{error="APIConnectionError",stage="extraction",status="unknown"} 1' in lines
+    assert 'llm_retries_total{error="RateLimitError",stage="extraction",status="429"} 1' in lines
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("weaviate.classes")
+
+from Weaviate_db.query import QueryCache
+
+INSERTED_AT = datetime(2025, 3, 1, 20, 30, tzinfo=timezone.utc)
+
+
+def fetch():
+    return [{"event_type": "goal", "player": "Kramarić", "inserted_at": INSERTED_AT}]
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_results_keep_their_types_on_every_path(tmp_path, shared):
+    path = str(tmp_path / "cache.sqlite") if shared else ""
+    cache = QueryCache(ttl=60, path=path, enabled=True)
+
+    miss = cache.get_or_fetch("Commentary", fetch, query="all_events")
+    memory_hit = cache.get_or_fetch("Commentary", fetch, query="all_events")
+    assert miss == memory_hit == fetch()
+    assert cache.stats()["hits"] == 1
+
+    if shared:
+        # Another process reading the same file
+        disk_hit = QueryCache(ttl=60, path=path, enabled=True).get_or_fetch("Commentary", fetch, query="all_events")
+        assert disk_hit == fetch()
+        assert isinstance(disk_hit[0]["inserted_at"], datetime)
+
+
+def test_invalidate_drops_cached_results(tmp_path):
+    cache = QueryCache(ttl=60, path=str(tmp_path / "cache.sqlite"), enabled=True)
+    cache.get_or_fetch("Commentary", fetch, query="all_events")
+    cache.invalidate("Commentary")
+    cache.get_or_fetch("Commentary", fetch, query="all_events")
+    assert cache.stats()["hits"] == 0
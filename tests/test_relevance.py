@@ -0,0 +1,42 @@
+import pytest
+
+from SubtitleRules.relevance import LEXICON, lexicon_term, score_text
+
+ACTION = [
+    "Und das Tor für Leverkusen!",
+    "Zwei Tore in zehn Minuten.",
+    "Kimmich bringt die Ecke herein.",
+    "Das gibt die nächste Ecken-Serie nicht her, aber Ecken gibt es genug.",
+    "Der Schiedsrichter zeigt ihm die gelbe Karte.",
+    "Das ist schon die dritte der gelben Karten heute.",
+    "Er wird im Strafraum gefoult.",
+    "Ein Freistoßtor aus zwanzig Metern!",
+    "Wirtz steht im Abseits.",
+    "Ein feiner Pass in die Tiefe.",
+]
+
+NO_ACTION = [
+    "Was ist denn da passiert?",
+    "Das passt heute einfach nicht.",
+    "Er ist in Toronto geboren.",
+    "Das war eine Tortur für alle Beteiligten.",
+    "Der Ball rollt seit zehn Minuten.",
+    "Die Torheit der Jugend.",
+    "Jetzt im besten Netz der Republik, ab 199 Euro monatlich.",
+]
+
+
+@pytest.mark.parametrize("sentence", ACTION)
+def test_action_sentences_score(sentence):
+    assert score_text(sentence) > 0
+
+
+@pytest.mark.parametrize("sentence", NO_ACTION)
+def test_sentences_without_action_do_not_score(sentence):
+    assert score_text(sentence) == 0
+
+
+def test_inflected_hits_map_back_to_their_term():
+    assert lexicon_term("gelben Karten", LEXICON) == "gelbe karte"
+    assert lexicon_term("Tores", LEXICON) == "tor"
+    assert score_text("Tor, Tore, Tores") == 3 * LEXICON["tor"]
@@ -0,0 +1,49 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from SubtitleRules.chunker import chunk_cues, format_chunk_line
+from SubtitleRules.stl_parser import format_cue, iter_stl_cues
+
+DATA_DIR = Path(__file__).parent.parent / "SubtitleRules" / "Data"
+STL_FILES = sorted(DATA_DIR.glob("*.stl"))
+CUE_RE = re.compile(r"^\s*(\d{1,2}:\d{2}:\d{2}:\d{2})\s*,\s*(\d{1,2}:\d{2}:\d{2}:\d{2})")
+
+
+def source_timecodes(path):
+    with open(path, encoding="utf-8") as f:
+        return [match.groups() for match in map(CUE_RE.match, f) if match]
+
+
+@pytest.mark.filterwarnings("ignore::SubtitleRules.timecode.FrameOverflowWarning")
+@pytest.mark.parametrize("path", STL_FILES, ids=lambda path: path.name)
+def test_round_trip_keeps_source_timecodes(path):
+    cues = list(iter_stl_cues(path))
+    expected = [(start.zfill(11), end) for start, end in source_timecodes(path)]
+    assert [tuple(format_cue(cue).split(",", 2)[:2]) for cue in cues] == expected
+    assert all(f"[{cue.start_timecode}]" in format_chunk_line(cue) for cue in cues)
+
+    # Frames stay ordered: frame fields are never carried into the next second
+    starts = [cue.start for cue in cues]
+    assert starts == sorted(starts)
+
+
+@pytest.mark.filterwarnings("ignore::SubtitleRules.timecode.FrameOverflowWarning")
+def test_chunk_prompts_quote_source_timecodes():
+    path = DATA_DIR / "TESTFeedforSTLsubtitlefile.stl"
+    prompt_timecodes = [line[1:12] for chunk in chunk_cues(iter_stl_cues(path), overlap_cues=0)
+                        for line in chunk.text.splitlines()]
+    assert prompt_timecodes == [start for start, _ in source_timecodes(path)]
+    assert "00:01:32:25" in prompt_timecodes
+
+
+def test_30fps_feed_is_detected(tmp_path):
+    path = tmp_path / "feed.stl"
+    path.write_text("".join(f"00:00:{s:02d}:{f:02d},00:00:{s:02d}:{f + 1:02d},cue {s} {f}\n"
+                            for s in range(10) for f in range(0, 29, 4)), encoding="utf-8")
+    cues = list(iter_stl_cues(path))
+    # 00:00:01:28 at 30 fps is just before 00:00:02:00, not 00:00:02:03
+    last_of_second = [cue for cue in cues if cue.start_timecode == "00:00:01:28"][0]
+    assert last_of_second.start == 25 + 23
+    assert format_cue(last_of_second) == "00:00:01:28,00:00:01:29,cue 1 28"
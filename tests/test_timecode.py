@@ -0,0 +1,64 @@
+import warnings
+
+import pytest
+
+from SubtitleRules.timecode import (FrameOverflowWarning, detect_fps, fields_to_frames, frames_to_timecode,
+                                    normalize_timecode, parse_timecode, parse_timecodes, timecode_minute,
+                                    timecode_to_frames)
+
+
+def test_timecode_round_trip():
+    for timecode in ("00:00:00:00", "00:01:32:24", "01:59:59:24"):
+        assert frames_to_timecode(timecode_to_frames(timecode)) == timecode
+
+
+def test_frame_field_at_fps_is_rejected():
+    with pytest.raises(ValueError):
+        timecode_to_frames("00:01:32:25")
+    with pytest.raises(ValueError):
+        timecode_to_frames("00:01:60:00")
+    with pytest.raises(ValueError):
+        frames_to_timecode(-1)
+
+
+def test_frame_field_at_fps_is_clamped_with_warning():
+    with pytest.warns(FrameOverflowWarning):
+        frames = timecode_to_frames("00:01:32:28", clamp=True)
+    # Stays in its own second instead of rolling over to 00:01:33:03
+    assert frames_to_timecode(frames) == "00:01:32:24"
+
+
+def test_source_fps_conversion():
+    assert fields_to_frames(0, 0, 1, 29, fps=25, source_fps=30) == 25 + 24
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert fields_to_frames(0, 0, 1, 15, fps=25, source_fps=30) == 25 + 12
+
+
+def test_parse_timecode_clamps_free_form_strings():
+    assert parse_timecode("at 00:12:03") == (12 * 60 + 3) * 25
+    assert parse_timecode("no timecode") is None
+    assert parse_timecode("00:75:00:00") is None
+    with pytest.warns(FrameOverflowWarning):
+        assert parse_timecode("00:00:10:31") == 10 * 25 + 24
+
+
+def test_parse_timecodes_matches_scalar_parser():
+    timecodes = ["00:00:01:00", "00:00:01:24", "00:00:01:27", "00:00:02", None, "junk"]
+    with pytest.warns(FrameOverflowWarning):
+        frames = parse_timecodes(timecodes).tolist()
+    assert frames == [25, 49, 49, 50, -1, -1]
+
+
+def test_detect_fps():
+    assert detect_fps(range(25)) == 25
+    assert detect_fps(list(range(25)) * 100 + [27]) == 25
+    assert detect_fps(range(30)) == 30
+
+
+def test_normalize_timecode_keeps_frame_field():
+    assert normalize_timecode("00:01:32:28") == "00:01:32:28"
+    assert normalize_timecode("at 0:01:32:05") == "00:01:32:05"
+    assert normalize_timecode("00:01:32") == "00:01:32:00"
+    assert normalize_timecode("-") is None
+    assert timecode_minute("01:02:59:28") == 62
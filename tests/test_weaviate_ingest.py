@@ -0,0 +1,89 @@
+"""
+Integration tests of ingest_objects() against the local Weaviate from
+docker-compose.yml (WEAVIATE_HOST / WEAVIATE_PORT); skipped when it is not running.
+"""
+import uuid
+
+import pytest
+
+pytest.importorskip("weaviate.classes")
+
+from weaviate.classes.config import Configure, DataType, Property
+
+from Weaviate_db.client import get_client_local
+from Weaviate_db.insert import commentary_properties, commentary_uuid, ingest_objects
+
+
+@pytest.fixture(scope="module")
+def wv_client():
+    try:
+        client = get_client_local()
+    except Exception as e:
+        pytest.skip(f"no local Weaviate reachable: {e}")
+    if not client.is_ready():
+        client.close()
+        pytest.skip("local Weaviate is not ready")
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def collection(wv_client):
+    name = f"IngestTest{uuid.uuid4().hex[:8]}"
+    collection = wv_client.collections.create(
+        name=name,
+        vectorizer_config=Configure.Vectorizer.none(),
+        properties=[
+            Property(name="event_type", data_type=DataType.TEXT),
+            Property(name="player", data_type=DataType.TEXT),
+            Property(name="team", data_type=DataType.TEXT),
+            Property(name="match_id", data_type=DataType.TEXT),
+            Property(name="timestamp", data_type=DataType.TEXT),
+            Property(name="minute", data_type=DataType.INT),
+            Property(name="inserted_at", data_type=DataType.DATE),
+        ],
+    )
+    yield collection
+    wv_client.collections.delete(name)
+
+
+def events(count):
+    for i in range(count):
+        yield commentary_properties({"event_type": "foul", "player": f"Player {i}", "team": "Kiel",
+                                     "timestamp": f"00:{i // 60:02d}:{i % 60:02d}:00"}, match_id="test")
+
+
+def count(collection):
+    return collection.aggregate.over_all(total_count=True).total_count
+
+
+def test_batch_insert_writes_every_object(wv_client, collection):
+    report = ingest_objects(collection.name, events(120), batch_size=25, wv_client=wv_client,
+                            uuid_for=commentary_uuid, ingest_time_property="inserted_at")
+    assert report["sent"] == report["inserted"] == 120
+    assert report["failed"] == report["retried"] == 0
+    assert count(collection) == 120
+
+
+def test_rejected_objects_are_retried_and_reported(wv_client, collection):
+    bad = {**next(events(1)), "player": "Broken", "minute": "not a number"}
+    report = ingest_objects(collection.name, [*events(10), bad], batch_size=5, max_retries=2,
+                            wv_client=wv_client, uuid_for=commentary_uuid, ingest_time_property="inserted_at")
+    assert report["inserted"] == 10
+    assert report["failed"] == 1
+    # Sent again once per retry before giving up
+    assert report["retried"] == 2
+    assert report["errors"][0]["properties"]["player"] == "Broken"
+    assert report["errors"][0]["message"]
+    assert count(collection) == 10
+
+
+def test_reingest_keeps_the_first_insert_time(wv_client, collection):
+    ingest_objects(collection.name, events(5), wv_client=wv_client,
+                   uuid_for=commentary_uuid, ingest_time_property="inserted_at")
+    first = {str(obj.uuid): obj.properties["inserted_at"] for obj in collection.iterator()}
+
+    report = ingest_objects(collection.name, events(5), wv_client=wv_client,
+                            uuid_for=commentary_uuid, ingest_time_property="inserted_at")
+    assert report["inserted"] == 5
+    assert {str(obj.uuid): obj.properties["inserted_at"] for obj in collection.iterator()} == first